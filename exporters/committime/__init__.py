@@ -28,7 +28,14 @@ from pelorus.utils import collect_bad_attribute_path_error, get_nested
 
 DEFAULT_PROVIDER = "git"
 PROVIDER_TYPES = {"git", "image"}
-GIT_PROVIDER_TYPES = {"github", "bitbucket", "gitea", "azure-devops", "gitlab"}
+GIT_PROVIDER_TYPES = {
+    "github",
+    "bitbucket",
+    "gitea",
+    "azure-devops",
+    "gitlab",
+    "git-mirror",
+}
 
 SUPPORTED_PROTOCOLS = {"http", "https", "ssh", "git"}
 
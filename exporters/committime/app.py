@@ -1,30 +1,67 @@
 #!/usr/bin/python3
 import logging
-import time
-from typing import Optional
+from typing import Any, Optional
 
 import attrs.converters
 import attrs.validators
 from attrs import define, field
 from openshift.dynamic import DynamicClient
-from prometheus_client import start_http_server
 from prometheus_client.core import REGISTRY
 
 import pelorus
 from committime import CommitMetric
 from committime.collector_azure_devops import AzureDevOpsCommitCollector
 from committime.collector_base import (
+    COMMIT_CACHE_SIZE_ENV,
     COMMIT_DATE_ANNOTATION_ENV,
     COMMIT_HASH_ANNOTATION_ENV,
+    COMMIT_PREFETCH_DAYS_ENV,
+    COMMIT_PREFETCH_PAGES_ENV,
     COMMIT_REPO_URL_ANNOTATION_ENV,
+    COMMIT_RESOLUTION_WORKERS_ENV,
+    COMMIT_RETRY_BACKOFF_ENV,
+    COMMIT_RETRY_MAX_BACKOFF_ENV,
+    COMMIT_TIME_SOURCES,
+    COMMIT_TIME_SOURCES_ENV,
+    DEFAULT_COMMIT_CACHE_SIZE,
+    DEFAULT_COMMIT_DATE_FORMAT,
+    DEFAULT_COMMIT_PREFETCH_DAYS,
+    DEFAULT_COMMIT_PREFETCH_PAGES,
+    DEFAULT_COMMIT_RESOLUTION_WORKERS,
+    DEFAULT_COMMIT_RETRY_BACKOFF,
+    DEFAULT_COMMIT_RETRY_MAX_BACKOFF,
+    WATCH_BUILDS_ENV,
     AbstractCommitCollector,
 )
 from committime.collector_bitbucket import BitbucketCommitCollector
-from committime.collector_containerimage import ContainerImageCommitCollector
+from committime.collector_containerimage import (
+    DEFAULT_IMAGE_LABEL_CACHE_SIZE,
+    DEFAULT_IMAGE_LABEL_REGISTRY_CONCURRENCY,
+    DEFAULT_IMAGE_LABEL_WORKERS,
+    IMAGE_LABEL_CACHE_SIZE_ENV,
+    IMAGE_LABEL_REGISTRY_CONCURRENCY_ENV,
+    IMAGE_LABEL_WORKERS_ENV,
+    ContainerImageCommitCollector,
+)
+from committime.collector_git_mirror import (
+    DEFAULT_GIT_MIRROR_DIR,
+    DEFAULT_GIT_MIRROR_FETCH_INTERVAL,
+    GIT_MIRROR_DIR_ENV,
+    GIT_MIRROR_FETCH_INTERVAL_ENV,
+    GitMirrorCommitCollector,
+)
 from committime.collector_gitea import GiteaCommitCollector
-from committime.collector_github import GitHubCommitCollector
+from committime.collector_github import (
+    DEFAULT_GITHUB_GRAPHQL_BATCH_SIZE,
+    GITHUB_GRAPHQL_BATCH_SIZE_ENV,
+    GitHubCommitCollector,
+)
 from committime.collector_gitlab import GitLabCommitCollector
-from committime.collector_image import ImageCommitCollector
+from committime.collector_image import (
+    DEFAULT_IMAGE_PAGE_SIZE,
+    IMAGE_PAGE_SIZE_ENV,
+    ImageCommitCollector,
+)
 from pelorus.config import (
     REDACT,
     env_var_names,
@@ -34,7 +71,17 @@ from pelorus.config import (
     no_env_vars,
 )
 from pelorus.config.converters import comma_separated, pass_through
+from pelorus.runtime import run_exporter
 from pelorus.utils import Url
+from provider_common.openshift import WATCH_PODS_ENV
+from provider_common.ratelimit import (
+    DEFAULT_BURST,
+    DEFAULT_MAX_PAUSE,
+    DEFAULT_THRESHOLD,
+    GITHUB_RATELIMIT_BURST_ENV,
+    GITHUB_RATELIMIT_MAX_PAUSE_ENV,
+    GITHUB_RATELIMIT_THRESHOLD_ENV,
+)
 
 PROVIDER_CLASSES_BY_NAME = {
     "github": GitHubCommitCollector,
@@ -42,13 +89,12 @@ PROVIDER_CLASSES_BY_NAME = {
     "gitea": GiteaCommitCollector,
     "azure-devops": AzureDevOpsCommitCollector,
     "gitlab": GitLabCommitCollector,
+    "git-mirror": GitMirrorCommitCollector,
 }
 
 PROVIDER_TYPES = {"git", "image", "containerimage"}
 DEFAULT_PROVIDER = "git"
 
-DEFAULT_COMMIT_DATE_FORMAT = "%a %b %d %H:%M:%S %Y %z"
-
 
 @define(kw_only=True)
 class CommittimeTypeConfig:
@@ -79,6 +125,30 @@ class ContainerImageCommittimeConfig:
         metadata=env_vars(COMMIT_HASH_ANNOTATION_ENV),
     )
 
+    watch_pods: bool = field(
+        default=False,
+        converter=attrs.converters.to_bool,
+        metadata=env_vars(WATCH_PODS_ENV),
+    )
+
+    image_label_workers: int = field(
+        default=DEFAULT_IMAGE_LABEL_WORKERS,
+        converter=int,
+        metadata=env_vars(IMAGE_LABEL_WORKERS_ENV),
+    )
+
+    registry_concurrency: int = field(
+        default=DEFAULT_IMAGE_LABEL_REGISTRY_CONCURRENCY,
+        converter=int,
+        metadata=env_vars(IMAGE_LABEL_REGISTRY_CONCURRENCY_ENV),
+    )
+
+    image_label_cache_size: int = field(
+        default=DEFAULT_IMAGE_LABEL_CACHE_SIZE,
+        converter=int,
+        metadata=env_vars(IMAGE_LABEL_CACHE_SIZE_ENV),
+    )
+
     def make_collector(self) -> AbstractCommitCollector:
         return ContainerImageCommitCollector(
             kube_client=self.kube_client,
@@ -90,6 +160,10 @@ class ContainerImageCommittimeConfig:
             app_label=self.app_label,
             date_annotation_name=self.label_commit_time,
             hash_annotation_name=self.label_commit_hash,
+            watch_pods=self.watch_pods,
+            image_label_workers=self.image_label_workers,
+            registry_concurrency=self.registry_concurrency,
+            image_label_cache_size=self.image_label_cache_size,
         )
 
 
@@ -123,6 +197,12 @@ class ImageCommittimeConfig:
         metadata=env_vars(COMMIT_REPO_URL_ANNOTATION_ENV),
     )
 
+    image_page_size: int = field(
+        default=DEFAULT_IMAGE_PAGE_SIZE,
+        converter=int,
+        metadata=env_vars(IMAGE_PAGE_SIZE_ENV),
+    )
+
     def make_collector(self) -> AbstractCommitCollector:
         # Image provider is a special case, where commit time
         # metadata is stored within image.openshift.io/v1 object
@@ -140,6 +220,7 @@ class ImageCommittimeConfig:
             date_annotation_name=self.date_annotation_name,
             hash_annotation_name=self.hash_annotation_name,
             repo_url_annotation_name=self.repo_url_annotation_name,
+            image_page_size=self.image_page_size,
         )
 
 
@@ -183,6 +264,97 @@ class GitCommittimeConfig:
         metadata=env_vars(COMMIT_REPO_URL_ANNOTATION_ENV),
     )
 
+    commit_resolution_workers: int = field(
+        default=DEFAULT_COMMIT_RESOLUTION_WORKERS,
+        converter=int,
+        metadata=env_vars(COMMIT_RESOLUTION_WORKERS_ENV),
+    )
+
+    watch_builds: bool = field(
+        default=False,
+        converter=attrs.converters.to_bool,
+        metadata=env_vars(WATCH_BUILDS_ENV),
+    )
+
+    commit_cache_size: int = field(
+        default=DEFAULT_COMMIT_CACHE_SIZE,
+        converter=int,
+        metadata=env_vars(COMMIT_CACHE_SIZE_ENV),
+    )
+
+    commit_retry_backoff: float = field(
+        default=DEFAULT_COMMIT_RETRY_BACKOFF,
+        converter=float,
+        metadata=env_vars(COMMIT_RETRY_BACKOFF_ENV),
+    )
+
+    commit_retry_max_backoff: float = field(
+        default=DEFAULT_COMMIT_RETRY_MAX_BACKOFF,
+        converter=float,
+        metadata=env_vars(COMMIT_RETRY_MAX_BACKOFF_ENV),
+    )
+
+    commit_prefetch_pages: int = field(
+        default=DEFAULT_COMMIT_PREFETCH_PAGES,
+        converter=int,
+        metadata=env_vars(COMMIT_PREFETCH_PAGES_ENV),
+    )
+
+    commit_prefetch_days: float = field(
+        default=DEFAULT_COMMIT_PREFETCH_DAYS,
+        converter=float,
+        metadata=env_vars(COMMIT_PREFETCH_DAYS_ENV),
+    )
+
+    graphql_batch_size: int = field(
+        default=DEFAULT_GITHUB_GRAPHQL_BATCH_SIZE,
+        converter=int,
+        metadata=env_vars(GITHUB_GRAPHQL_BATCH_SIZE_ENV),
+    )
+
+    ratelimit_burst: int = field(
+        default=DEFAULT_BURST,
+        converter=int,
+        metadata=env_vars(GITHUB_RATELIMIT_BURST_ENV),
+    )
+
+    ratelimit_threshold: int = field(
+        default=DEFAULT_THRESHOLD,
+        converter=int,
+        metadata=env_vars(GITHUB_RATELIMIT_THRESHOLD_ENV),
+    )
+
+    ratelimit_max_pause: float = field(
+        default=DEFAULT_MAX_PAUSE,
+        converter=float,
+        metadata=env_vars(GITHUB_RATELIMIT_MAX_PAUSE_ENV),
+    )
+
+    commit_time_sources: list[str] = field(
+        factory=lambda: list(COMMIT_TIME_SOURCES),
+        converter=comma_separated(list),
+        metadata=env_vars(COMMIT_TIME_SOURCES_ENV),
+    )
+
+    date_annotation_name: str = field(
+        default=CommitMetric._ANNOTATION_MAPPIG["commit_time"],
+        metadata=env_vars(COMMIT_DATE_ANNOTATION_ENV),
+    )
+
+    date_format: str = field(
+        default=DEFAULT_COMMIT_DATE_FORMAT, metadata=env_vars("COMMIT_DATE_FORMAT")
+    )
+
+    mirror_dir: str = field(
+        default=DEFAULT_GIT_MIRROR_DIR, metadata=env_vars(GIT_MIRROR_DIR_ENV)
+    )
+
+    mirror_fetch_interval: float = field(
+        default=DEFAULT_GIT_MIRROR_FETCH_INTERVAL,
+        converter=float,
+        metadata=env_vars(GIT_MIRROR_FETCH_INTERVAL_ENV),
+    )
+
     def __attrs_post_init__(self):
         if not (self.username and self.token):
             logging.warning(
@@ -195,75 +367,59 @@ class GitCommittimeConfig:
             self.username = ""
             self.token = ""
 
+    def _collector_args(self) -> dict[str, Any]:
+        "The arguments shared by the collectors of all Git providers."
+        return dict(
+            kube_client=self.kube_client,
+            username=self.username,
+            token=self.token,
+            namespaces=self.namespaces,
+            app_label=self.app_label,
+            hash_annotation_name=self.hash_annotation_name,
+            repo_url_annotation_name=self.repo_url_annotation_name,
+            commit_resolution_workers=self.commit_resolution_workers,
+            watch_builds=self.watch_builds,
+            commit_cache_size=self.commit_cache_size,
+            commit_retry_backoff=self.commit_retry_backoff,
+            commit_retry_max_backoff=self.commit_retry_max_backoff,
+            commit_time_sources=self.commit_time_sources,
+            date_annotation_name=self.date_annotation_name,
+            date_format=self.date_format,
+            commit_prefetch_pages=self.commit_prefetch_pages,
+            commit_prefetch_days=self.commit_prefetch_days,
+        )
+
     def make_collector(self) -> AbstractCommitCollector:
         git_provider = self.git_provider
+        args = self._collector_args()
+        if self.git_api:
+            api = dict(git_api=self.git_api)
+        else:
+            api = {}
 
         if git_provider == "gitlab":
-            return GitLabCommitCollector(
-                kube_client=self.kube_client,
-                username=self.username,
-                token=self.token,
-                namespaces=self.namespaces,
-                app_label=self.app_label,
-                hash_annotation_name=self.hash_annotation_name,
-                repo_url_annotation_name=self.repo_url_annotation_name,
-            )
+            return GitLabCommitCollector(**args)
         if git_provider == "github":
-            if self.git_api:
-                api = dict(git_api=self.git_api)
-            else:
-                api = {}
             return GitHubCommitCollector(
-                kube_client=self.kube_client,
-                username=self.username,
-                token=self.token,
-                namespaces=self.namespaces,
                 tls_verify=self.tls_verify,
-                app_label=self.app_label,
-                hash_annotation_name=self.hash_annotation_name,
-                repo_url_annotation_name=self.repo_url_annotation_name,
+                graphql_batch_size=self.graphql_batch_size,
+                ratelimit_burst=self.ratelimit_burst,
+                ratelimit_threshold=self.ratelimit_threshold,
+                ratelimit_max_pause=self.ratelimit_max_pause,
                 **api,
+                **args,
             )
         if git_provider == "bitbucket":
-            return BitbucketCommitCollector(
-                kube_client=self.kube_client,
-                username=self.username,
-                token=self.token,
-                namespaces=self.namespaces,
-                tls_verify=self.tls_verify,
-                app_label=self.app_label,
-                hash_annotation_name=self.hash_annotation_name,
-                repo_url_annotation_name=self.repo_url_annotation_name,
-            )
+            return BitbucketCommitCollector(tls_verify=self.tls_verify, **args)
         if git_provider == "gitea":
-            if self.git_api:
-                api = dict(git_api=self.git_api)
-            else:
-                api = {}
-            return GiteaCommitCollector(
-                kube_client=self.kube_client,
-                username=self.username,
-                token=self.token,
-                namespaces=self.namespaces,
-                app_label=self.app_label,
-                hash_annotation_name=self.hash_annotation_name,
-                repo_url_annotation_name=self.repo_url_annotation_name,
-                **api,
-            )
+            return GiteaCommitCollector(**api, **args)
         if git_provider == "azure-devops":
-            if self.git_api:
-                api = dict(git_api=self.git_api)
-            else:
-                api = {}
-            return AzureDevOpsCommitCollector(
-                kube_client=self.kube_client,
-                username=self.username,
-                token=self.token,
-                namespaces=self.namespaces,
-                app_label=self.app_label,
-                hash_annotation_name=self.hash_annotation_name,
-                repo_url_annotation_name=self.repo_url_annotation_name,
-                **api,
+            return AzureDevOpsCommitCollector(**api, **args)
+        if git_provider == "git-mirror":
+            return GitMirrorCommitCollector(
+                mirror_dir=self.mirror_dir,
+                mirror_fetch_interval=self.mirror_fetch_interval,
+                **args,
             )
 
         raise ValueError(
@@ -271,7 +427,7 @@ class GitCommittimeConfig:
         )  # should be unreachable
 
 
-def set_up(prod: bool = True) -> AbstractCommitCollector:
+def set_up(prod: bool = True, register: bool = True) -> AbstractCommitCollector:
     # TODO refactor: all exporters have same structure
     pelorus.setup_logging(prod=prod)
     provider_config = load_and_log(CommittimeTypeConfig)
@@ -293,14 +449,10 @@ def set_up(prod: bool = True) -> AbstractCommitCollector:
 
     collector = config.make_collector()
 
-    REGISTRY.register(collector)
+    if register:
+        REGISTRY.register(collector)
     return collector
 
 
 if __name__ == "__main__":
-    set_up()
-    # TODO refactor: create function, all exporters have same structure
-    start_http_server(8080)
-
-    while True:
-        time.sleep(1)
+    run_exporter(set_up(register=False))
@@ -1,17 +1,25 @@
 import logging
+import threading
 from datetime import datetime
 
 from attrs import converters, define, field
 from azure.devops.connection import Connection
+from azure.devops.released.git import GitClient, GitQueryCommitsCriteria
 from msrest.authentication import BasicAuthentication
 
 from committime import CommitMetric
 from pelorus.config.converters import pass_through
 from pelorus.utils import Url
 
-from .collector_base import AbstractCommitCollector, UnsupportedGITProvider
+from .collector_base import (
+    MIN_PREFETCH_COMMITS,
+    AbstractCommitCollector,
+    UnsupportedGITProvider,
+)
 
 DEFAULT_AZURE_API = Url.parse("https://dev.azure.com")
+# Number of commit ids asked for per request, to keep the URL short enough
+COMMIT_IDS_PER_REQUEST = 50
 
 
 @define(kw_only=True)
@@ -24,39 +32,136 @@ class AzureDevOpsCommitCollector(AbstractCommitCollector):
         converter=converters.optional(pass_through(Url, Url.parse)),
     )
 
-    # base class impl
-    def get_commit_time(self, metric: CommitMetric):
-        """Method called to collect data and send to Prometheus"""
-        git_server = metric.git_fqdn
+    # Git clients by organization URL, shared by all lookups
+    _git_clients: dict[str, GitClient] = field(factory=dict, init=False)
+    _git_clients_lock: threading.Lock = field(factory=threading.Lock, init=False)
 
-        if (
+    @staticmethod
+    def _is_azure_server(git_server: str) -> bool:
+        return not (
             "github" in git_server
             or "bitbucket" in git_server
             or "gitlab" in git_server
             or "gitea" in git_server
-        ):
-            raise UnsupportedGITProvider(
-                "Skipping non Azure DevOps server, found %s" % (git_server)
-            )
-        logging.debug("metric.repo_project %s" % (metric.repo_project))
-        logging.debug("metric.git_server %s" % (metric.git_server))
+        )
 
-        # Fill in with your personal access token and org URL
-        # personal_access_token = 'YOURPAT'
-        # organization_url = 'https://dev.azure.com/YOURORG'
-        personal_access_token = self.token
-        organization_url = (
+    def _organization_url(self, metric: CommitMetric) -> str:
+        return (
             self.git_api.url + "/" + metric.repo_group
             if metric.repo_group and "/" + metric.repo_group not in self.git_api.url
             else self.git_api.url
         )
 
-        # Create a connection to the org
-        credentials = BasicAuthentication("", personal_access_token)
-        connection = Connection(base_url=organization_url, creds=credentials)
+    def _get_git_client(self, organization_url: str) -> GitClient:
+        """
+        The git client of the organization, connecting on first use.
+        Each new connection looks up the location of the APIs it uses,
+        so they are kept for all lookups.
+        """
+        with self._git_clients_lock:
+            git_client = self._git_clients.get(organization_url)
+            if git_client is None:
+                logging.debug("Connecting to Azure DevOps: %s", organization_url)
+                credentials = BasicAuthentication("", self.token)
+                connection = Connection(base_url=organization_url, creds=credentials)
+                # the "git" client provides access to commits
+                git_client = connection.clients.get_git_client()
+                self._git_clients[organization_url] = git_client
+            return git_client
+
+    @staticmethod
+    def _update_metric(metric: CommitMetric, commit) -> CommitMetric:
+        timestamp: datetime = commit.committer.date
+        timestamp = timestamp.replace(microsecond=0)  # second precision
+        metric.commit_time = timestamp.isoformat("T", "auto")
+        logging.debug("metric.commit_time %s", timestamp)
+        # hopefully they haven't provided a naive datetime
+        metric.commit_timestamp = timestamp.timestamp()
+        metric.commit_link = metric.repo_url
+        return metric
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        Get the commits of the repositories with several pending commits
+        by their ids, `COMMIT_IDS_PER_REQUEST` at a time.
+        """
+        by_repo: dict[tuple[str, str, str], list[CommitMetric]] = {}
+        for metric in metrics:
+            if not self._is_azure_server(metric.git_fqdn):
+                continue
+            project = metric.azure_project or metric.repo_project
+            key = (self._organization_url(metric), project, metric.repo_project)
+            by_repo.setdefault(key, []).append(metric)
+
+        resolved = []
+        for (organization_url, project, repository), pending in by_repo.items():
+            if len(pending) < MIN_PREFETCH_COMMITS:
+                continue
+            try:
+                resolved += self._get_commits(
+                    organization_url, project, repository, pending
+                )
+            except Exception:
+                logging.warning(
+                    "Failed getting the commits of %s",
+                    pending[0].repo_url,
+                    exc_info=True,
+                )
+        return resolved
+
+    def _get_commits(
+        self,
+        organization_url: str,
+        project: str,
+        repository: str,
+        pending: list[CommitMetric],
+    ) -> list[CommitMetric]:
+        "Resolve the pending commits of a repository by asking for their ids."
+        git_client = self._get_git_client(organization_url)
+
+        unresolved: dict[str, list[CommitMetric]] = {}
+        for metric in pending:
+            unresolved.setdefault(metric.commit_hash, []).append(metric)
+        commit_hashes = list(unresolved)
+
+        resolved = []
+        for i in range(0, len(commit_hashes), COMMIT_IDS_PER_REQUEST):
+            batch = commit_hashes[i : i + COMMIT_IDS_PER_REQUEST]
+            commits = git_client.get_commits(
+                repository_id=repository,
+                search_criteria=GitQueryCommitsCriteria(ids=batch),
+                project=project,
+                top=len(batch),
+            )
+            for commit in commits:
+                for commit_hash in [
+                    h
+                    for h in batch
+                    if h in unresolved and commit.commit_id.startswith(h)
+                ]:
+                    for metric in unresolved.pop(commit_hash):
+                        resolved.append(self._update_metric(metric, commit))
+        logging.debug(
+            "Resolved %d of %d commit(s) of %s by their ids",
+            len(resolved),
+            len(pending),
+            pending[0].repo_url,
+        )
+        return resolved
+
+    # base class impl
+    def get_commit_time(self, metric: CommitMetric):
+        """Method called to collect data and send to Prometheus"""
+        git_server = metric.git_fqdn
+
+        if not self._is_azure_server(git_server):
+            raise UnsupportedGITProvider(
+                "Skipping non Azure DevOps server, found %s" % (git_server)
+            )
+        logging.debug("metric.repo_project %s" % (metric.repo_project))
+        logging.debug("metric.git_server %s" % (metric.git_server))
 
-        # Get a client (the "git" client provides access to commits)
-        git_client = connection.clients.get_git_client()
+        git_client = self._get_git_client(self._organization_url(metric))
 
         commit = git_client.get_commit(
             commit_id=metric.commit_hash,
@@ -66,10 +171,6 @@ class AzureDevOpsCommitCollector(AbstractCommitCollector):
             else metric.repo_project,
         )
 
-        timestamp: datetime = commit.committer.date
-        timestamp = timestamp.replace(microsecond=0)  # second precision
-
-        logging.debug("Commit %s", timestamp)
         if hasattr(commit, "innerExepction"):
             # This will occur when trying to make an API call to non-Github
             logging.warning(
@@ -83,12 +184,7 @@ class AzureDevOpsCommitCollector(AbstractCommitCollector):
             )
         else:
             try:
-                metric.commit_time = timestamp.isoformat("T", "auto")
-                logging.debug("metric.commit_time %s", timestamp)
-                metric.commit_timestamp = (
-                    timestamp.timestamp()
-                )  # hopefully they haven't provided a naive datetime
-                metric.commit_link = metric.repo_url
+                self._update_metric(metric, commit)
             except Exception:
                 logging.error(
                     "Failed processing commit time for build %s" % metric.build_name,
@@ -19,21 +19,29 @@ from __future__ import annotations
 
 import logging
 import re
+import threading
 from abc import abstractmethod
-from typing import ClassVar, Iterable, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from types import TracebackType
+from typing import Callable, ClassVar, Iterable, Optional, TypeVar
 
 import attrs
-from attrs import define, field
-from jsonpath_ng import parse
+from attrs import define, field, frozen
 from openshift.dynamic import DynamicClient
-from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 
 import pelorus
 from committime import CommitMetric, commit_metric_from_build
+from pelorus.cache import TTLCache
 from pelorus.config import env_vars
 from pelorus.config.converters import comma_separated, pass_through
-from pelorus.utils import Url, get_nested
+from pelorus.timeutil import parse_guessing_timezone_DYNAMIC, to_epoch_from_string
+from pelorus.utils import Url, get_nested, paginate_resource
 from provider_common import format_app_name
+from provider_common.informer import ResourceInformer
 
 # Custom annotations env for the Build
 # Default ones are in the CommitMetric._ANNOTATION_MAPPIG
@@ -41,6 +49,100 @@ COMMIT_HASH_ANNOTATION_ENV = "COMMIT_HASH_ANNOTATION"
 COMMIT_REPO_URL_ANNOTATION_ENV = "COMMIT_REPO_URL_ANNOTATION"
 COMMIT_DATE_ANNOTATION_ENV = "COMMIT_DATE_ANNOTATION"
 
+COMMIT_RESOLUTION_WORKERS_ENV = "COMMIT_RESOLUTION_WORKERS"
+# Maximum number of concurrent git provider API calls used to resolve
+# commit times that are not cached yet.
+DEFAULT_COMMIT_RESOLUTION_WORKERS = 8
+
+WATCH_BUILDS_ENV = "WATCH_BUILDS"
+# Name of the informer index grouping Builds by (namespace, app)
+BUILDS_BY_APP_INDEX = "namespace-app"
+
+# A commit is uniquely identified by the repository it lives in and its hash.
+CommitKey = tuple[str, str]
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+COMMIT_RETRY_BACKOFF_ENV = "COMMIT_RETRY_BACKOFF"
+COMMIT_RETRY_MAX_BACKOFF_ENV = "COMMIT_RETRY_MAX_BACKOFF"
+# Seconds before looking up a commit again after a transient failure,
+# doubled after each consecutive failure up to the maximum.
+DEFAULT_COMMIT_RETRY_BACKOFF = 60.0
+DEFAULT_COMMIT_RETRY_MAX_BACKOFF = 3600.0
+# Seconds before looking up a commit again after a permanent failure,
+# in case the repository or the credentials were fixed since.
+PERMANENT_FAILURE_RETRY_INTERVAL = 24 * 60 * 60
+# HTTP statuses of git provider responses that will not change by retrying:
+# the commit or repository does not exist, or is not readable with our credentials.
+PERMANENT_FAILURE_HTTP_STATUSES = frozenset({400, 401, 404, 410, 422})
+
+COMMIT_PREFETCH_PAGES_ENV = "COMMIT_PREFETCH_PAGES"
+COMMIT_PREFETCH_DAYS_ENV = "COMMIT_PREFETCH_DAYS"
+# Maximum number of pages of recent commits listed per repository,
+# to resolve many commits of the same repository at once. 0 disables listing.
+# Only the default branch is listed, by all providers but Bitbucket Cloud.
+DEFAULT_COMMIT_PREFETCH_PAGES = 3
+# Only commits of the last days are listed.
+DEFAULT_COMMIT_PREFETCH_DAYS = 90
+# Repositories with fewer pending commits have them looked up one by one,
+# as getting them together would not save any request.
+MIN_PREFETCH_COMMITS = 2
+
+COMMIT_TIME_SOURCES_ENV = "COMMIT_TIME_SOURCES"
+# Where the commit time of a Build is taken from, in order:
+# - annotations: the COMMIT_DATE_ANNOTATION annotation of the Build
+# - env: the COMMIT_DATE_ENV_VAR variable of the Build strategy environment,
+#   as set by `oc start-build --env`
+# - image_labels: the COMMIT_DATE_ANNOTATION label of the Build's output Image
+# - api: the git provider API, the only source needing a call outside the cluster
+COMMIT_TIME_SOURCES = ("annotations", "env", "image_labels", "api")
+COMMIT_DATE_ENV_VAR = "OPENSHIFT_BUILD_COMMIT_DATE"
+# Format of commit dates that are neither 10 digit EPOCH timestamps nor ISO 8601,
+# the default format of git dates
+DEFAULT_COMMIT_DATE_FORMAT = "%a %b %d %H:%M:%S %Y %z"
+
+COMMIT_CACHE_SIZE_ENV = "COMMIT_CACHE_SIZE"
+# Maximum number of commits whose time is kept, the least recently used being evicted.
+DEFAULT_COMMIT_CACHE_SIZE = 10_000
+
+
+@frozen
+class CachedCommit:
+    """
+    The part of a CommitMetric obtained from the git provider,
+    which is all that is cached about a commit.
+    """
+
+    commit_time: Optional[str]
+    commit_timestamp: Optional[float]
+    commit_link: Optional[str] = None
+
+    @classmethod
+    def from_metric(cls, metric: CommitMetric) -> CachedCommit:
+        return cls(metric.commit_time, metric.commit_timestamp, metric.commit_link)
+
+    def apply_to(self, metric: CommitMetric) -> CommitMetric:
+        metric.commit_time = self.commit_time
+        metric.commit_timestamp = self.commit_timestamp
+        if self.commit_link:
+            metric.commit_link = self.commit_link
+        return metric
+
+
+@frozen
+class FailedCommit:
+    """
+    A commit whose lookup failed, and when it may be looked up again.
+    """
+
+    errors: tuple[str, ...] = field(converter=tuple)
+    permanent: bool
+    # consecutive failures
+    attempts: int
+    retry_at: float
+
 
 class UnsupportedGITProvider(Exception):
     """
@@ -52,6 +154,115 @@ class UnsupportedGITProvider(Exception):
         super().__init__(message)
 
 
+class CommitLookupError(Exception):
+    """
+    Exception raised when the git provider did not return a commit,
+    with the HTTP status of its response, if any.
+    """
+
+    def __init__(self, message, status_code: Optional[int] = None):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    "The HTTP status of the response that caused the error, if known."
+    for status in (
+        getattr(error, "status_code", None),
+        # python-gitlab
+        getattr(error, "response_code", None),
+        # requests
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def _failure_key(metric: CommitMetric) -> str:
+    "The key of the commit in the failed commits cache."
+    return f"{metric.repo_url}@{metric.commit_hash}"
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """
+    If looking up the commit again will fail the same way,
+    as opposed to server errors, timeouts and rate limiting.
+    """
+    if isinstance(error, UnsupportedGITProvider):
+        return True
+    # Azure DevOps errors carry the type of the server exception instead of a status
+    type_key = getattr(error, "type_key", None) or ""
+    if type_key.endswith(("NotFoundException", "DoesNotExistException")):
+        return True
+    return _http_status(error) in PERMANENT_FAILURE_HTTP_STATUSES
+
+
+def _validate_commit_time_sources(instance, attribute, sources: list[str]):
+    unknown = [source for source in sources if source not in COMMIT_TIME_SOURCES]
+    if unknown:
+        raise ValueError(
+            f"Unknown {attribute.name} {unknown}, expected some of {COMMIT_TIME_SOURCES}"
+        )
+    if "api" in sources and sources[-1] != "api":
+        raise ValueError(f"The api must be the last of the {attribute.name}")
+
+
+def repo_web_url(metric: CommitMetric) -> str:
+    "The web page of the repository, from its http(s) URL or its host and path."
+    if metric.repo_url.startswith(("https://", "http://")):
+        return re.sub(r"\.git$", "", metric.repo_url)
+    return f"https://{metric.git_fqdn}/{metric.repo_group}/{metric.repo_project}"
+
+
+def parse_commit_date(value: str, date_format: str) -> datetime:
+    """
+    Parse a commit date found in cluster metadata, which may be a 10 digit EPOCH
+    timestamp, an ISO 8601 date, or a date in the given format.
+    """
+    value = value.strip()
+    try:
+        return to_epoch_from_string(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return parse_guessing_timezone_DYNAMIC(value, format=date_format)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@define
+class _BuildMetric:
+    """
+    A CommitMetric taken from a Build that is waiting for its commit time.
+    """
+
+    build: object
+    app: str
+    namespace: str
+    metric: CommitMetric
+    errors: list = field(factory=list)
+
+    @property
+    def commit_key(self) -> CommitKey:
+        return (self.metric.repo_url, self.metric.commit_hash)
+
+
+@define
+class _CommitResolution:
+    """
+    The outcome of a commit time lookup, shared by every Build
+    referencing that commit.
+    """
+
+    commit: Optional[CachedCommit] = None
+    errors: list = field(factory=list)
+    exception: Optional[Exception] = None
+    traceback: Optional[TracebackType] = None
+
+
 @define(kw_only=True)
 class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
     """
@@ -77,7 +288,114 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
 
     tls_verify: bool = field(default=True)
 
-    commit_dict: dict[str, Optional[CommitMetric]] = field(factory=dict, init=False)
+    commit_resolution_workers: int = field(
+        default=DEFAULT_COMMIT_RESOLUTION_WORKERS,
+        converter=int,
+        metadata=env_vars(COMMIT_RESOLUTION_WORKERS_ENV),
+    )
+
+    watch_builds: bool = field(
+        default=False,
+        converter=attrs.converters.to_bool,
+        metadata=env_vars(WATCH_BUILDS_ENV),
+    )
+
+    commit_cache_size: int = field(
+        default=DEFAULT_COMMIT_CACHE_SIZE,
+        converter=int,
+        metadata=env_vars(COMMIT_CACHE_SIZE_ENV),
+    )
+
+    commit_retry_backoff: float = field(
+        default=DEFAULT_COMMIT_RETRY_BACKOFF,
+        converter=float,
+        metadata=env_vars(COMMIT_RETRY_BACKOFF_ENV),
+    )
+
+    commit_retry_max_backoff: float = field(
+        default=DEFAULT_COMMIT_RETRY_MAX_BACKOFF,
+        converter=float,
+        metadata=env_vars(COMMIT_RETRY_MAX_BACKOFF_ENV),
+    )
+
+    commit_prefetch_pages: int = field(
+        default=DEFAULT_COMMIT_PREFETCH_PAGES,
+        converter=int,
+        metadata=env_vars(COMMIT_PREFETCH_PAGES_ENV),
+    )
+
+    commit_prefetch_days: float = field(
+        default=DEFAULT_COMMIT_PREFETCH_DAYS,
+        converter=float,
+        metadata=env_vars(COMMIT_PREFETCH_DAYS_ENV),
+    )
+
+    commit_time_sources: list[str] = field(
+        factory=lambda: list(COMMIT_TIME_SOURCES),
+        converter=comma_separated(list),
+        validator=_validate_commit_time_sources,
+        metadata=env_vars(COMMIT_TIME_SOURCES_ENV),
+    )
+
+    date_annotation_name: str = field(
+        default=CommitMetric._ANNOTATION_MAPPIG["commit_time"],
+        metadata=env_vars(COMMIT_DATE_ANNOTATION_ENV),
+    )
+
+    date_format: str = field(
+        default=DEFAULT_COMMIT_DATE_FORMAT, metadata=env_vars("COMMIT_DATE_FORMAT")
+    )
+
+    # Number of commits whose time was resolved, by source
+    _resolutions_by_source: Counter = field(factory=Counter, init=False)
+    _resolutions_lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    # Times of the commits already resolved, by commit hash
+    commit_dict: TTLCache[CachedCommit] = field(
+        default=attrs.Factory(
+            lambda self: TTLCache(
+                name="commits",
+                max_size=self.commit_cache_size,
+                dump=attrs.asdict,
+                load=lambda data: CachedCommit(**data),
+            ),
+            takes_self=True,
+        ),
+        init=False,
+    )
+
+    # Commits whose lookup failed, by repo URL and commit hash
+    failed_commits: TTLCache[FailedCommit] = field(
+        default=attrs.Factory(
+            lambda self: TTLCache(
+                name="failed_commits",
+                max_size=self.commit_cache_size,
+                dump=attrs.asdict,
+                load=lambda data: FailedCommit(**data),
+            ),
+            takes_self=True,
+        ),
+        init=False,
+    )
+
+    # Commit date labels of the output Images of Builds, by Image digest,
+    # "" when an Image has none or could not be read. Images do not change.
+    _image_commit_dates: TTLCache[str] = field(
+        default=attrs.Factory(
+            lambda self: TTLCache(
+                name="image_commit_dates",
+                ttl=PERMANENT_FAILURE_RETRY_INTERVAL,
+                max_size=self.commit_cache_size,
+            ),
+            takes_self=True,
+        ),
+        init=False,
+    )
+
+    # Build informers by namespace (None for all namespaces), used when watch_builds is set
+    _build_informers: dict[Optional[str], ResourceInformer] = field(
+        factory=dict, init=False
+    )
 
     # TODO hash_annotation_name and repo_url_annotation_name seem to be
     # unnecessary
@@ -92,7 +410,6 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
     )
 
     def __attrs_post_init__(self):
-        self.commit_dict = dict()
         if not (self.username and self.token):
             logging.warning(
                 "No API_USER and no TOKEN given. This is okay for public repositories only."
@@ -105,6 +422,39 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
             self.token = ""
 
     def collect(self):
+        yield from self._collect_commit_metrics()
+        yield self._collect_failed_commits()
+        yield self._collect_resolutions_by_source()
+
+    def _count_resolutions(self, source: str, count: int = 1) -> None:
+        with self._resolutions_lock:
+            self._resolutions_by_source[source] += count
+
+    def _collect_resolutions_by_source(self) -> CounterMetricFamily:
+        resolutions = CounterMetricFamily(
+            "pelorus_commit_time_resolutions",
+            "Number of commits whose time was resolved, by source",
+            labels=["source"],
+        )
+        with self._resolutions_lock:
+            for source in self.commit_time_sources:
+                resolutions.add_metric([source], self._resolutions_by_source[source])
+        return resolutions
+
+    def _collect_failed_commits(self) -> GaugeMetricFamily:
+        failures = GaugeMetricFamily(
+            "pelorus_commit_lookup_failures",
+            "Number of commits whose time could not be looked up, and are not retried yet",
+            labels=["kind"],
+        )
+        permanent = sum(
+            failure.permanent for _, failure, _ in self.failed_commits.entries()
+        )
+        failures.add_metric(["permanent"], permanent)
+        failures.add_metric(["transient"], len(self.failed_commits) - permanent)
+        return failures
+
+    def _collect_commit_metrics(self):
         commit_metric = GaugeMetricFamily(
             "commit_timestamp",
             "Commit timestamp",
@@ -145,48 +495,25 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
                 api_version="v1", kind="Namespace"
             )
             watched_namespaces = {
-                namespace.metadata.name for namespace in v1_namespaces.get().items
+                namespace.metadata.name
+                for namespace in paginate_resource(v1_namespaces, metadata_only=True)
             }
         logging.debug("Watching namespaces: %s" % (watched_namespaces))
         return watched_namespaces
 
-    def _get_openshift_obj_by_app(self, openshift_obj: str) -> Optional[dict]:
-        app_label = self.app_label
-
-        # use a jsonpath expression to find all values for the app label
-        jsonpath_str = "$['items'][*]['metadata']['labels']['" + str(app_label) + "']"
-
-        jsonpath_expr = parse(jsonpath_str)
-
-        found = jsonpath_expr.find(openshift_obj)
-
-        apps = {match.value for match in found}
-
-        if not apps:
-            return None
-
-        items_by_app = {}
-
-        for app in apps:
-            items_by_app[app] = list(
-                filter(
-                    lambda b: b.metadata.labels[app_label] == app, openshift_obj.items
-                )
-            )
-
-        return items_by_app
-
     def generate_metrics(self) -> Iterable[CommitMetric]:
         """Method called by the collect to create a list of metrics to publish"""
         # This will loop and look at OCP builds (calls get_git_commit_time)
 
+        if self.watch_builds:
+            return self._generate_metrics_from_informers()
+
         watched_namespaces = self._get_watched_namespaces()
 
         # Initialize metrics list
         metrics = []
         for namespace in watched_namespaces:
             # Initialized variables
-            builds = []
             builds_by_app = {}
             app_label = self.app_label
             logging.debug(
@@ -197,24 +524,113 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
             v1_builds = self.kube_client.resources.get(
                 api_version="build.openshift.io/v1", kind="Build"
             )
-            # only use builds that have the app label
-            builds = v1_builds.get(namespace=namespace, label_selector=app_label)
-
-            builds_by_app = self._get_openshift_obj_by_app(builds)
+            # only use builds that have the app label, listed page by page
+            for build in paginate_resource(
+                v1_builds, dict(namespace=namespace, label_selector=app_label), raw=True
+            ):
+                builds_by_app.setdefault(build.metadata.labels[app_label], []).append(
+                    build
+                )
 
             if builds_by_app:
                 metrics += self.get_metrics_from_apps(builds_by_app, namespace)
 
         return metrics
 
+    def _generate_metrics_from_informers(self) -> list[CommitMetric]:
+        """
+        Create the metrics from the Builds kept in memory by the informers,
+        instead of listing all Builds again.
+        """
+        builds_by_namespace: dict[str, dict[str, list]] = {}
+        for informer in self._get_build_informers():
+            for (namespace, app), builds in informer.index(BUILDS_BY_APP_INDEX).items():
+                builds_by_namespace.setdefault(namespace, {})[app] = builds
+
+        metrics = []
+        for namespace, builds_by_app in builds_by_namespace.items():
+            metrics += self.get_metrics_from_apps(builds_by_app, namespace)
+        return metrics
+
+    def _get_build_informers(self) -> Iterable[ResourceInformer]:
+        """
+        Get the Build informers, starting any that are missing:
+        one per namespace if namespaces are given, otherwise one for all namespaces.
+        """
+        for namespace in self.namespaces or {None}:
+            if namespace in self._build_informers:
+                continue
+            v1_builds = self.kube_client.resources.get(
+                api_version="build.openshift.io/v1", kind="Build"
+            )
+            informer = ResourceInformer(
+                resource=v1_builds,
+                namespace=namespace,
+                # only watch builds that have the app label
+                label_selector=self.app_label,
+                indexers={BUILDS_BY_APP_INDEX: self._build_app_keys},
+            )
+            informer.start()
+            self._build_informers[namespace] = informer
+        return self._build_informers.values()
+
+    def _build_app_keys(self, build) -> list[tuple[str, str]]:
+        app = get_nested(build, ["metadata", "labels", self.app_label], default=None)
+        if not app:
+            return []
+        return [(build.metadata.namespace, app)]
+
     @abstractmethod
     def get_commit_time(self, metric) -> Optional[CommitMetric]:
         # This will perform the API calls and parse out the necessary fields into metrics
         pass
 
+    def commit_link(self, metric: CommitMetric) -> Optional[str]:
+        """
+        The link to the commit, as the git provider gives it,
+        for commits whose time was found in cluster metadata.
+        """
+        return metric.repo_url
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        Look up the commit time of many commits at once, for git providers that
+        support it. Returns the metrics whose commit time was set.
+
+        The commits that are not returned are looked up one by one with
+        `get_commit_time`, so implementations may skip any commit they cannot handle.
+        """
+        return []
+
+    def _commits_to_prefetch(
+        self, metrics: list[CommitMetric]
+    ) -> dict[str, list[CommitMetric]]:
+        """
+        The pending commits by repository URL, for the repositories that have
+        enough of them to be worth listing their recent commits: since listing
+        may take up to `commit_prefetch_pages` requests, more pending commits
+        than that. Empty if listing is disabled.
+        """
+        if self.commit_prefetch_pages <= 0:
+            return {}
+        min_commits = max(MIN_PREFETCH_COMMITS, self.commit_prefetch_pages + 1)
+        by_repo: dict[str, list[CommitMetric]] = {}
+        for metric in metrics:
+            by_repo.setdefault(metric.repo_url, []).append(metric)
+        return {
+            repo_url: repo_metrics
+            for repo_url, repo_metrics in by_repo.items()
+            if len(repo_metrics) >= min_commits
+        }
+
+    @property
+    def prefetch_since(self) -> datetime:
+        "The time from which recent commits are listed."
+        return datetime.now(timezone.utc) - timedelta(days=self.commit_prefetch_days)
+
     def get_metrics_from_apps(self, apps, namespace):
         """Expects a sorted array of build data sorted by app label"""
-        metrics = []
+        build_metrics = []
         for app in apps:
             builds = apps[app]
             jenkins_builds = list(
@@ -234,20 +650,74 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
 
             for build in code_builds:
                 try:
-                    metric = self.get_metric_from_build(build, app, namespace, repo_url)
-                    if metric:
-                        logging.debug("Adding metric for app %s" % app)
-                        metrics.append(metric)
+                    build_metric = self._prepare_metric_from_build(
+                        build, app, namespace, repo_url
+                    )
+                    if build_metric:
+                        build_metrics.append(build_metric)
                 except Exception:
                     logging.error(
                         "Cannot collect metrics from build: %s" % (build.metadata.name)
                     )
 
+        resolutions = self._resolve_commit_times(build_metrics)
+
+        metrics = []
+        for build_metric in build_metrics:
+            try:
+                metric = self._finish_metric_from_build(
+                    build_metric, resolutions.get(build_metric.commit_key)
+                )
+                if metric:
+                    logging.debug("Adding metric for app %s" % build_metric.app)
+                    metrics.append(metric)
+            except Exception:
+                logging.error(
+                    "Cannot collect metrics from build: %s"
+                    % (build_metric.build.metadata.name)
+                )
+
         return metrics
 
     def get_metric_from_build(self, build, app, namespace, repo_url):
-        errors = []
+        build_metric = self._prepare_metric_from_build(build, app, namespace, repo_url)
+        if build_metric is None:
+            return None
+        resolutions = self._resolve_commit_times([build_metric])
+        return self._finish_metric_from_build(
+            build_metric, resolutions.get(build_metric.commit_key)
+        )
+
+    @contextmanager
+    def _handle_build_errors(self, build, app: str, namespace: str):
+        """
+        Log and swallow any error encountered while getting the CommitMetric of a Build,
+        so one broken Build does not prevent collecting the others.
+        """
         try:
+            yield
+        except AttributeError as e:
+            # TODO: have we removed all the spots where we could get an AttributeError?
+            logging.warning(
+                "Build %s/%s in app %s is missing required attributes to collect data. Skipping.",
+                namespace,
+                build.metadata.name,
+                app,
+            )
+            logging.debug(e, exc_info=True)
+        except Exception as e:
+            logging.error("Error encountered while getting CommitMetric info:")
+            logging.error(e, exc_info=True)
+
+    def _prepare_metric_from_build(
+        self, build, app: str, namespace: str, repo_url
+    ) -> Optional[_BuildMetric]:
+        """
+        Gather everything needed for the CommitMetric of the Build, except for its commit time.
+        Returns None if the Build is not ready or is missing required data.
+        """
+        with self._handle_build_errors(build, app, namespace):
+            errors = []
             metric = commit_metric_from_build(app, build, errors)
 
             if not self._is_metric_ready(namespace, metric, build):
@@ -255,14 +725,45 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
 
             # Populate annotations and labels required by
             # subsequent _set_ functions.
-            metric.annotations = vars(build.metadata.annotations)
-            metric.labels = vars(build.metadata.labels)
+            metric.annotations = dict(build.metadata.annotations)
+            metric.labels = dict(build.metadata.labels)
 
             metric = self._set_repo_url(metric, repo_url, build, errors)
 
             metric = self._set_commit_hash_from_annotations(metric, errors)
 
-            metric = self._set_commit_timestamp(metric, errors)
+            return _BuildMetric(build, app, namespace, metric, errors)
+        return None
+
+    def _finish_metric_from_build(
+        self,
+        build_metric: _BuildMetric,
+        resolution: Optional[_CommitResolution] = None,
+    ) -> Optional[CommitMetric]:
+        """
+        Set the commit time of the Build's CommitMetric, from the resolution of its
+        commit or the cache when possible. If resolving the commit already failed,
+        the failure is reported for this Build without calling the git provider again.
+        Returns None if any data is missing.
+        """
+        build, app, namespace = (
+            build_metric.build,
+            build_metric.app,
+            build_metric.namespace,
+        )
+        with self._handle_build_errors(build, app, namespace):
+            errors = build_metric.errors
+            metric = build_metric.metric
+
+            if resolution is None:
+                metric = self._set_commit_timestamp(metric, errors)
+            elif resolution.exception is not None:
+                # restore the original traceback, so each Build logs the same one
+                raise resolution.exception.with_traceback(resolution.traceback)
+            elif resolution.errors:
+                errors.extend(resolution.errors)
+            else:
+                metric = resolution.commit.apply_to(metric)
 
             if errors:
                 msg = (
@@ -274,20 +775,267 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
                 return None
 
             return metric
-        except AttributeError as e:
-            # TODO: have we removed all the spots where we could get an AttributeError?
-            logging.warning(
-                "Build %s/%s in app %s is missing required attributes to collect data. Skipping.",
-                namespace,
-                build.metadata.name,
-                app,
+        return None
+
+    def _resolve_commit_times(
+        self, build_metrics: list[_BuildMetric]
+    ) -> dict[CommitKey, _CommitResolution]:
+        """
+        Resolve the commit time of every distinct commit referenced by the Builds
+        that is not cached yet, making up to `commit_resolution_workers` concurrent
+        calls to the git provider, starting with the commits of the newest Builds.
+        Resolved commits are added to `commit_dict`.
+
+        Returns the lookups by commit, so every Build referencing them gets
+        their outcome, even if the commit was evicted from the cache since.
+        """
+        unresolved: dict[CommitKey, _BuildMetric] = {}
+        # newest Builds first, so their commits are resolved first
+        # when the git provider rate limits the lookups
+        newest_first = sorted(
+            build_metrics,
+            key=lambda build_metric: get_nested(
+                build_metric.build, "metadata.creationTimestamp", default=None
             )
-            logging.debug(e, exc_info=True)
+            or "",
+            reverse=True,
+        )
+        for build_metric in newest_first:
+            metric = build_metric.metric
+            if not metric.commit_hash or metric.commit_hash in self.commit_dict:
+                continue
+            unresolved.setdefault(build_metric.commit_key, build_metric)
+
+        if not unresolved:
+            return {}
+
+        # commits backing off from a failure are not looked up at all,
+        # not even in the Images of their Builds
+        resolutions = {}
+        for key, build_metric in list(unresolved.items()):
+            failure = self._get_pending_failure(build_metric.metric)
+            if failure is not None:
+                logging.debug(
+                    "sha: %s, lookup failed %d time(s), not retrying yet",
+                    build_metric.metric.commit_hash,
+                    failure.attempts,
+                )
+                resolutions[key] = _CommitResolution(errors=list(failure.errors))
+                del unresolved[key]
+        if not unresolved:
+            return resolutions
+
+        local_resolutions = self._resolve_commit_times_locally(unresolved)
+        for key in local_resolutions:
+            del unresolved[key]
+        resolutions.update(local_resolutions)
+        if not unresolved:
+            return resolutions
+
+        if "api" not in self.commit_time_sources:
+            errors = [
+                "Couldn't get commit time from %s" % ", ".join(self.commit_time_sources)
+            ]
+            for key in unresolved:
+                resolutions[key] = _CommitResolution(errors=list(errors))
+            return resolutions
+
+        unresolved_metrics = {
+            key: build_metric.metric for key, build_metric in unresolved.items()
+        }
+        batch_resolutions = self._resolve_commit_batch(unresolved_metrics)
+        for key in batch_resolutions:
+            del unresolved_metrics[key]
+        resolutions.update(batch_resolutions)
+        if not unresolved_metrics:
+            return resolutions
+
+        logging.debug("Resolving %d uncached commit(s)", len(unresolved_metrics))
+        resolutions.update(
+            self._run_concurrently(self._resolve_commit_time, unresolved_metrics)
+        )
+        return resolutions
+
+    def _run_concurrently(
+        self, resolve: Callable[[T], R], pending: dict[CommitKey, T]
+    ) -> dict[CommitKey, R]:
+        "Resolve the pending commits with up to `commit_resolution_workers` threads."
+        workers = max(1, min(self.commit_resolution_workers, len(pending)))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="commit-resolver"
+        ) as executor:
+            futures = {
+                executor.submit(resolve, value): key for key, value in pending.items()
+            }
+            return {
+                futures[future]: future.result() for future in as_completed(futures)
+            }
+
+    def _resolve_commit_times_locally(
+        self, unresolved: dict[CommitKey, _BuildMetric]
+    ) -> dict[CommitKey, _CommitResolution]:
+        """
+        Resolve the commits whose time is found in cluster metadata,
+        following the `commit_time_sources` before the git provider API,
+        adding them to the cache.
+        Reading Images calls the cluster API, so they are read concurrently.
+        """
+        if "image_labels" in self.commit_time_sources:
+            found = self._run_concurrently(
+                self._resolve_commit_time_locally, unresolved
+            )
+        else:
+            found = {
+                key: self._resolve_commit_time_locally(build_metric)
+                for key, build_metric in unresolved.items()
+            }
+        resolutions = {
+            key: resolution for key, resolution in found.items() if resolution
+        }
+        if resolutions:
+            logging.debug(
+                "Resolved %d commit(s) from cluster metadata", len(resolutions)
+            )
+        return resolutions
+
+    def _resolve_commit_time_locally(
+        self, build_metric: _BuildMetric
+    ) -> Optional[_CommitResolution]:
+        "Resolve a commit from the first source of the Build that has its time."
+        for source in self.commit_time_sources:
+            if source == "api":
+                break
+            commit = self._get_commit_time_from(source, build_metric)
+            if commit is None:
+                continue
+            self.commit_dict.set(build_metric.metric.commit_hash, commit)
+            self._count_resolutions(source)
+            return _CommitResolution(commit=commit)
+        return None
+
+    def _get_commit_time_from(
+        self, source: str, build_metric: _BuildMetric
+    ) -> Optional[CachedCommit]:
+        "The commit time found in the given source of the Build, if any."
+        build, metric = build_metric.build, build_metric.metric
+        if source == "annotations":
+            value = (metric.annotations or {}).get(self.date_annotation_name)
+        elif source == "env":
+            value = self._get_commit_date_from_env(build)
+        else:
+            value = self._get_commit_date_from_image_labels(build, metric)
+        if not value:
             return None
-        except Exception as e:
-            logging.error("Error encountered while getting CommitMetric info:")
-            logging.error(e, exc_info=True)
+        try:
+            timestamp = parse_commit_date(value, self.date_format)
+        except ValueError:
+            logging.debug(
+                "Build %s has an unreadable commit date in its %s: %s",
+                metric.build_name,
+                source,
+                value,
+            )
             return None
+        return CachedCommit(value, timestamp.timestamp(), self.commit_link(metric))
+
+    @staticmethod
+    def _get_commit_date_from_env(build) -> Optional[str]:
+        strategy = get_nested(build, "spec.strategy", default=None)
+        if strategy is None:
+            return None
+        for strategy_name in ("sourceStrategy", "dockerStrategy", "customStrategy"):
+            env = getattr(strategy, strategy_name, None)
+            for variable in getattr(env, "env", None) or ():
+                if variable.name == COMMIT_DATE_ENV_VAR:
+                    return variable.value
+        return None
+
+    def _get_commit_date_from_image_labels(
+        self, build, metric: CommitMetric
+    ) -> Optional[str]:
+        """
+        The commit date label of the Build's output Image. Only Builds pushing
+        to an ImageStreamTag have their Image in the cluster.
+        """
+        output_kind = get_nested(build, "spec.output.to.kind", default=None)
+        if output_kind != "ImageStreamTag" or not metric.image_hash:
+            return None
+        commit_date = self._image_commit_dates.get(metric.image_hash)
+        if commit_date is not None:
+            return commit_date or None
+        try:
+            v1_images = self.kube_client.resources.get(
+                api_version="image.openshift.io/v1", kind="Image"
+            )
+            image = v1_images.get(name=metric.image_hash)
+            commit_date = get_nested(
+                image,
+                ["dockerImageMetadata", "Config", "Labels", self.date_annotation_name],
+                default=None,
+            )
+        except Exception as e:
+            logging.debug("No Image %s: %s", metric.image_hash, e)
+            commit_date = None
+        self._image_commit_dates.set(metric.image_hash, commit_date or "")
+        return commit_date
+
+    def _resolve_commit_batch(
+        self, unresolved: dict[CommitKey, CommitMetric]
+    ) -> dict[CommitKey, _CommitResolution]:
+        """
+        Resolve the commits that are not backing off from a failure with
+        `get_commit_times`, adding them to the cache.
+        If that fails, the commits are left to be resolved one by one.
+        """
+        due = [
+            metric
+            for metric in unresolved.values()
+            if self._get_pending_failure(metric) is None
+        ]
+        if not due:
+            return {}
+        try:
+            resolved = self.get_commit_times(due)
+        except Exception:
+            logging.warning(
+                "Failed to look up %d commit(s) at once, looking them up one by one",
+                len(due),
+                exc_info=True,
+            )
+            return {}
+
+        resolutions = {}
+        for metric in resolved:
+            if metric.commit_time is None:
+                continue
+            commit = CachedCommit.from_metric(metric)
+            self.commit_dict.set(metric.commit_hash, commit)
+            self.failed_commits.pop(_failure_key(metric))
+            resolutions[(metric.repo_url, metric.commit_hash)] = _CommitResolution(
+                commit=commit
+            )
+        if resolutions:
+            logging.debug("Resolved %d commit(s) at once", len(resolutions))
+            self._count_resolutions("api", len(resolutions))
+        return resolutions
+
+    def _get_pending_failure(self, metric: CommitMetric) -> Optional[FailedCommit]:
+        "The failure of the last lookup of the commit, if it is not over yet."
+        failure = self.failed_commits.get(_failure_key(metric))
+        if failure is not None and self.failed_commits.timer() < failure.retry_at:
+            return failure
+        return None
+
+    def _resolve_commit_time(self, metric: CommitMetric) -> _CommitResolution:
+        "Resolve a single commit time, catching any failure."
+        errors = []
+        try:
+            metric = self._set_commit_timestamp(metric, errors)
+        except Exception as e:
+            return _CommitResolution(exception=e, traceback=e.__traceback__)
+        if errors:
+            return _CommitResolution(errors=errors)
+        return _CommitResolution(commit=CachedCommit.from_metric(metric))
 
     def _set_commit_hash_from_annotations(
         self, metric: CommitMetric, errors: list
@@ -380,9 +1128,27 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
     ) -> Optional[CommitMetric]:
         """
         Check the cache for the commit_time.
-        If absent, call the API implemented by the subclass.
+        If absent, call the API implemented by the subclass,
+        unless looking it up failed recently.
         """
-        if metric.commit_hash and metric.commit_hash not in self.commit_dict:
+        if not metric.commit_hash:
+            return metric
+        # a single lookup, as the commit may be evicted at any time
+        cached = self.commit_dict.get(metric.commit_hash)
+        if cached is not None:
+            metric = cached.apply_to(metric)
+            logging.debug(f"Returning metric from cache {metric}")
+        else:
+            failure_key = _failure_key(metric)
+            failure = self.failed_commits.get(failure_key)
+            if failure is not None and self.failed_commits.timer() < failure.retry_at:
+                logging.debug(
+                    "sha: %s, lookup failed %d time(s), not retrying yet",
+                    metric.commit_hash,
+                    failure.attempts,
+                )
+                errors.extend(failure.errors)
+                return None
             logging.debug(
                 "sha: %s, commit_timestamp not found in cache, executing API call.",
                 metric.commit_hash,
@@ -390,21 +1156,66 @@ class AbstractCommitCollector(pelorus.AbstractPelorusExporter):
             try:
                 metric = self.get_commit_time(metric)
                 logging.debug(f"Metric returned from git provider: {metric}")
-            except UnsupportedGITProvider as ex:
+            except (UnsupportedGITProvider, CommitLookupError) as ex:
                 errors.append(ex.message)
+                self._record_failed_commit(failure_key, failure, ex, errors)
                 return None
+            except Exception as ex:
+                self._record_failed_commit(failure_key, failure, ex, [str(ex)])
+                raise
             # If commit time is None, then we could not get the value from the API
-            if metric.commit_time is None:
+            if metric is None or metric.commit_time is None:
                 errors.append("Couldn't get commit time")
+                self._record_failed_commit(failure_key, failure, None, errors)
             else:
                 # Add the timestamp to the cache
-                self.commit_dict[metric.commit_hash] = metric
-        elif metric.commit_hash:
-            metric = self.commit_dict[metric.commit_hash]
-            logging.debug(f"Returning metric from cache {metric}")
+                self.commit_dict.set(
+                    metric.commit_hash, CachedCommit.from_metric(metric)
+                )
+                self._count_resolutions("api")
+                if failure is not None:
+                    self.failed_commits.pop(failure_key)
 
         return metric
 
+    def _record_failed_commit(
+        self,
+        key: str,
+        previous: Optional[FailedCommit],
+        error: Optional[Exception],
+        errors: list,
+    ):
+        """
+        Remember that looking up the commit failed, so it is not looked up again
+        until its backoff is over.
+        Transient failures back off exponentially; permanent ones are retried daily.
+        """
+        permanent = error is not None and is_permanent_failure(error)
+        attempts = previous.attempts + 1 if previous is not None else 1
+        if permanent:
+            backoff = PERMANENT_FAILURE_RETRY_INTERVAL
+        else:
+            backoff = min(
+                self.commit_retry_backoff * 2 ** (attempts - 1),
+                self.commit_retry_max_backoff,
+            )
+        logging.debug(
+            "Lookup of commit %s failed %d time(s) (%s), retrying in %ss",
+            key,
+            attempts,
+            "permanent" if permanent else "transient",
+            backoff,
+        )
+        self.failed_commits.set(
+            key,
+            FailedCommit(
+                errors=[str(e) for e in errors],
+                permanent=permanent,
+                attempts=attempts,
+                retry_at=self.failed_commits.timer() + backoff,
+            ),
+        )
+
     def get_repo_from_jenkins(self, jenkins_builds):
         if jenkins_builds:
             # First, check for cases where the source url is in pipeline params
@@ -1,7 +1,8 @@
 import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional, cast
+from typing import Iterator, Optional, cast
 
 import requests
 import requests.exceptions
@@ -9,7 +10,13 @@ from attrs import define, field
 
 import pelorus
 from committime import CommitMetric
-from committime.collector_base import AbstractCommitCollector, UnsupportedGITProvider
+from committime.collector_base import (
+    AbstractCommitCollector,
+    CommitLookupError,
+    UnsupportedGITProvider,
+    repo_web_url,
+)
+from pelorus.cache import TTLCache
 from pelorus.timeutil import parse_tz_aware
 from pelorus.utils import set_up_requests_session
 
@@ -32,6 +39,33 @@ class APIVersion(ABC):
         "Update the metric's timestamp info from the API response."
         ...
 
+    @abstractmethod
+    def commits_url(self, metric: CommitMetric) -> str:
+        "Get the API URL listing the commits of the metric's repository"
+        ...
+
+    @abstractmethod
+    def commit_pages(
+        self, session: requests.Session, url: str, max_pages: int
+    ) -> Iterator[list[dict]]:
+        "The pages of commits listed at the URL, newest first, up to `max_pages`."
+        ...
+
+    @abstractmethod
+    def commit_id(self, api_response: dict) -> str:
+        "The full hash of a commit from the API response."
+        ...
+
+    @abstractmethod
+    def commit_timestamp(self, api_response: dict) -> float:
+        "The commit time of a commit from the API response, in seconds."
+        ...
+
+    @abstractmethod
+    def commit_link(self, metric: CommitMetric) -> str:
+        "The link to the commit, as `update_metric_from_api` sets it."
+        ...
+
     def __str__(self):
         return type(self).__name__
 
@@ -39,6 +73,7 @@ class APIVersion(ABC):
 class Version1(APIVersion):
     root = "rest/api"
     pattern = "1.0/projects/{group}/repos/{project}/commits/{commit}"
+    list_pattern = "1.0/projects/{group}/repos/{project}/commits"
     test_path = "1.0/projects"
 
     def test_url(self, server: str) -> str:
@@ -46,10 +81,49 @@ class Version1(APIVersion):
 
     def commit_url(self, metric: CommitMetric) -> str:
         "Handle the URL for v1 specially."
+        group, project_name = self._group_and_project(metric)
+        return pelorus.url_joiner(
+            metric.git_server,
+            self.root,
+            self.pattern.format(
+                group=group, project=project_name, commit=metric.commit_hash
+            ),
+        )
 
-        git_server = metric.git_server
-        sha = metric.commit_hash
+    def commits_url(self, metric: CommitMetric) -> str:
+        group, project_name = self._group_and_project(metric)
+        return pelorus.url_joiner(
+            metric.git_server,
+            self.root,
+            self.list_pattern.format(group=group, project=project_name),
+        )
 
+    def commit_pages(
+        self, session: requests.Session, url: str, max_pages: int
+    ) -> Iterator[list[dict]]:
+        start = 0
+        for _ in range(max_pages):
+            response = session.get(
+                url, params=dict(limit=COMMITS_PER_PAGE, start=start)
+            )
+            response.raise_for_status()
+            page = response.json()
+            yield page.get("values") or []
+            if page.get("isLastPage", True) or page.get("nextPageStart") is None:
+                return
+            start = page["nextPageStart"]
+
+    def commit_id(self, api_response: dict) -> str:
+        return api_response["id"]
+
+    def commit_timestamp(self, api_response: dict) -> float:
+        return api_response["committerTimestamp"] / 1000
+
+    def commit_link(self, metric: CommitMetric) -> str:
+        return "unknown"
+
+    @staticmethod
+    def _group_and_project(metric: CommitMetric) -> tuple[str, str]:
         # URL munging copied from original code.
         # TODO: this is messy. We should investigate the parsing that CommitMetric is doing.
 
@@ -66,11 +140,7 @@ class Version1(APIVersion):
         # set the URL back to the original
         metric.repo_url = old_url
 
-        return pelorus.url_joiner(
-            git_server,
-            self.root,
-            self.pattern.format(group=group, project=project_name, commit=sha),
-        )
+        return group, project_name
 
     def update_metric_from_api(self, metric: CommitMetric, api_response: dict):
         # API V1 uses unix time
@@ -93,12 +163,13 @@ class Version1(APIVersion):
         # convert the time stamp to datetime and set in metric
         metric.commit_time = timestamp.isoformat()
         # since the v1 api is deprecated, just set link to unknown
-        metric.commit_link = "unknown"
+        metric.commit_link = self.commit_link(metric)
 
 
 class Version2(APIVersion):
     root = "api"
     pattern = "2.0/repositories/{group}/{project}/commit/{commit}"
+    list_pattern = "2.0/repositories/{group}/{project}/commits"
     test_path = "2.0/repositories"
 
     def test_url(self, server: str) -> str:
@@ -135,8 +206,48 @@ class Version2(APIVersion):
         metric.commit_timestamp = timestamp.timestamp()
         metric.commit_link = commit_link
 
+    def commits_url(self, metric: CommitMetric) -> str:
+        return pelorus.url_joiner(
+            metric.git_server,
+            self.root,
+            self.list_pattern.format(
+                group=metric.repo_group, project=metric.repo_project
+            ),
+        )
+
+    def commit_pages(
+        self, session: requests.Session, url: str, max_pages: int
+    ) -> Iterator[list[dict]]:
+        next_url: Optional[str] = url
+        params: Optional[dict] = dict(pagelen=COMMITS_PER_PAGE)
+        for _ in range(max_pages):
+            if next_url is None:
+                return
+            response = session.get(next_url, params=params)
+            response.raise_for_status()
+            page = response.json()
+            yield page.get("values") or []
+            # the next page URL has the parameters already
+            next_url, params = page.get("next"), None
+
+    def commit_id(self, api_response: dict) -> str:
+        return api_response["hash"]
+
+    def commit_timestamp(self, api_response: dict) -> float:
+        return parse_tz_aware(api_response["date"], _DATETIME_FORMAT).timestamp()
+
+    def commit_link(self, metric: CommitMetric) -> str:
+        return f"{repo_web_url(metric)}/commits/{metric.commit_hash}"
+
 
 _SUPPORTED_API_VERSIONS = (Version2(), Version1())
+_API_VERSIONS_BY_NAME = {str(version): version for version in _SUPPORTED_API_VERSIONS}
+
+# Number of commits per page when listing recent commits
+COMMITS_PER_PAGE = 100
+# Seconds the API version of a server is kept, persisted with the other caches,
+# after which it is tested again in case the server was upgraded.
+API_VERSION_CACHE_TTL = 7 * 24 * 60 * 60
 
 _DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
 
@@ -146,7 +257,16 @@ class BitbucketCommitCollector(AbstractCommitCollector):
     # Default http headers needed for API calls
     DEFAULT_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
 
-    cached_server_api_versions: dict[str, APIVersion] = field(factory=dict, init=False)
+    # API versions by server, so they are tested once, even across restarts
+    cached_server_api_versions: TTLCache[APIVersion] = field(
+        factory=lambda: TTLCache(
+            name="bitbucket_api_versions",
+            ttl=API_VERSION_CACHE_TTL,
+            dump=str,
+            load=_API_VERSIONS_BY_NAME.__getitem__,
+        ),
+        init=False,
+    )
 
     session: requests.Session = field(factory=requests.Session, init=False)
 
@@ -157,16 +277,108 @@ class BitbucketCommitCollector(AbstractCommitCollector):
         )
         self.session.headers.update(self.DEFAULT_HEADERS)
 
-    def get_commit_time(self, metric: CommitMetric):
-        git_server = metric.git_server
-
+    @staticmethod
+    def _is_bitbucket_server(git_server: str) -> bool:
         # do a simple check for hosted Git services.
-        if (
+        return not (
             "github" in git_server
             or "gitea" in git_server
             or "gitlab" in git_server
             or "azure" in git_server
+        )
+
+    def commit_link(self, metric: CommitMetric) -> Optional[str]:
+        api_version = self.cached_server_api_versions.get(metric.git_server)
+        if api_version is None:
+            return super().commit_link(metric)
+        return api_version.commit_link(metric)
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        Test the API versions of all the servers that were not tested yet,
+        concurrently, then list the recent commits of the repositories with
+        more pending commits than `commit_prefetch_pages`, up to that many pages
+        per repository.
+        """
+        bitbucket_metrics = [
+            metric for metric in metrics if self._is_bitbucket_server(metric.git_server)
+        ]
+        self._test_api_versions({metric.git_server for metric in bitbucket_metrics})
+
+        since = self.prefetch_since.timestamp()
+        resolved = []
+        for repo_url, pending in self._commits_to_prefetch(bitbucket_metrics).items():
+            api_version = self.cached_server_api_versions.get(pending[0].git_server)
+            if api_version is None:
+                continue
+            try:
+                resolved += self._list_recent_commits(api_version, pending, since)
+            except Exception:
+                logging.warning(
+                    "Failed listing recent commits of %s", repo_url, exc_info=True
+                )
+        return resolved
+
+    def _test_api_versions(self, servers: set[str]) -> None:
+        "Find the API versions of the servers that were not tested yet."
+        untested = [
+            server
+            for server in servers
+            if server not in self.cached_server_api_versions
+        ]
+        if not untested:
+            return
+        workers = max(1, min(self.commit_resolution_workers, len(untested)))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bitbucket-api-version"
+        ) as executor:
+            for server, future in [
+                (server, executor.submit(self.get_api_version, server))
+                for server in untested
+            ]:
+                try:
+                    future.result()
+                except Exception:
+                    logging.warning(
+                        "Failed testing the API version of %s", server, exc_info=True
+                    )
+
+    def _list_recent_commits(
+        self, api_version: APIVersion, pending: list[CommitMetric], since: float
+    ) -> list[CommitMetric]:
+        """
+        Resolve the pending commits of a repository from its recent commits,
+        stopping at the first commit older than `since`.
+        """
+        url = api_version.commits_url(pending[0])
+        unresolved = {metric.commit_hash: metric for metric in pending}
+        resolved = []
+        for commits in api_version.commit_pages(
+            self.session, url, self.commit_prefetch_pages
         ):
+            for commit in commits:
+                commit_id = api_version.commit_id(commit)
+                for commit_hash in [h for h in unresolved if commit_id.startswith(h)]:
+                    metric = unresolved.pop(commit_hash)
+                    api_version.update_metric_from_api(metric, commit)
+                    resolved.append(metric)
+                if api_version.commit_timestamp(commit) < since:
+                    unresolved.clear()
+                    break
+            if not unresolved:
+                break
+        logging.debug(
+            "Resolved %d of %d commit(s) of %s by listing its recent commits",
+            len(resolved),
+            len(pending),
+            pending[0].repo_url,
+        )
+        return resolved
+
+    def get_commit_time(self, metric: CommitMetric):
+        git_server = metric.git_server
+
+        if not self._is_bitbucket_server(git_server):
             raise UnsupportedGITProvider(
                 "Skipping non BitBucket server, found %s" % (git_server)
             )
@@ -184,6 +396,9 @@ class BitbucketCommitCollector(AbstractCommitCollector):
             api_version.update_metric_from_api(metric, api_dict)
 
             return metric
+        except CommitLookupError:
+            # already logged
+            raise
         except requests.exceptions.SSLError as e:
             logging.error(
                 "TLS error talking to %s for build %s: %s",
@@ -208,8 +423,9 @@ class BitbucketCommitCollector(AbstractCommitCollector):
         """
         Call the bitbucket API to get commit information.
 
+        Raises CommitLookupError if the response status code was not a success.
+
         Returns None if any of the following occur:
-        - the response status code was not a success
         - the response body was not valid JSON
         - the response body was JSON, but not a dictionary
 
@@ -259,6 +475,10 @@ class BitbucketCommitCollector(AbstractCommitCollector):
                     http_err=e,
                 ),
             )
+            raise CommitLookupError(
+                "Couldn't get commit time, got http code %s" % e.response.status_code,
+                status_code=e.response.status_code,
+            ) from e
         except requests.exceptions.JSONDecodeError as e:
             logging.error(
                 (
@@ -289,7 +509,7 @@ class BitbucketCommitCollector(AbstractCommitCollector):
         for potential_api_version in _SUPPORTED_API_VERSIONS:
             if self.check_api_verison(server, potential_api_version):
                 api_version = potential_api_version
-                self.cached_server_api_versions[server] = potential_api_version
+                self.cached_server_api_versions.set(server, potential_api_version)
                 break
 
         if api_version is None:
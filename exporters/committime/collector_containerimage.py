@@ -15,54 +15,125 @@
 #    under the License.
 #
 
+import heapq
+import itertools
 import json
 import logging
 import queue
+import random
+import re
 import subprocess
 import threading
 import time
-from typing import Dict, Iterable, Optional, Tuple
+from pathlib import Path
+from typing import Counter, Dict, Iterable, Optional, Tuple
 
-from attr import define
+import attrs.converters
+from attr import define, field, frozen
 from openshift.dynamic.resource import ResourceField
+from prometheus_client.core import GaugeMetricFamily, SummaryMetricFamily
 
 from committime import CommitMetric
 from committime.collector_base import AbstractCommitCollector
-from pelorus.timeutil import parse_guessing_timezone_DYNAMIC, to_epoch_from_string
+from pelorus.cache import TTLCache
+from pelorus.certificates import set_up_requests_certs
+from pelorus.config import env_vars
+from pelorus.timeutil import (
+    parse_assuming_utc,
+    parse_guessing_timezone_DYNAMIC,
+    to_epoch_from_string,
+)
 from provider_common.openshift import (
+    WATCH_PODS_ENV,
+    PodInformerCache,
     filter_pods_by_replica_uid,
     get_and_log_namespaces,
     get_images_from_pod,
     get_running_pods,
 )
+from provider_common.registry import ImageReference, RegistryClient, RegistryError
+
+_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+IMAGE_LABEL_WORKERS_ENV = "IMAGE_LABEL_WORKERS"
+IMAGE_LABEL_REGISTRY_CONCURRENCY_ENV = "IMAGE_LABEL_REGISTRY_CONCURRENCY"
+# Number of threads reading image labels from the registries.
+DEFAULT_IMAGE_LABEL_WORKERS = 8
+# Number of images read at the same time from each registry.
+DEFAULT_IMAGE_LABEL_REGISTRY_CONCURRENCY = 2
 
 skopeo_lock = threading.Lock()
 
-# A queue to store image URI values to be processed
-image_shas_uris_queue = queue.Queue()
-# Use to track if the image is already in the queue
+# A queue to store image URI values to be processed, as
+# (priority, sequence, sha, image URI, time queued) entries.
+# The images of the newest pods come first.
+image_shas_uris_queue: queue.PriorityQueue = queue.PriorityQueue()
+_queue_sequence = itertools.count()
+# Use to track if the image is already in the queue, or being processed
 sha_in_queue = set()
 
-# Cache threshold in seconds, used by our in memory cache or storing image labels.
-# The cache may expire only when the image is not in use by running Pod anymore,
-# so we don't waste the skopeo calls to the external registries, but we still allow
-# pods to be not running for a while before we expire it's metric.
-CACHE_THRESHOLD_1_DAYS = 60 * 60 * 24
-
-# We store skopeo failures and we re-try maximum SKOPEO_MAX_RETRY times per
-# one image URI. This is to prevent too many calls to the external container
-# registries. We have a timeout here, so after some time the failed image URI
-# will be retried anyway. If the pod is not Running anymore the cache expires
-# right away.
-skopeo_failures_lock = threading.Lock()
-# The dictionary where the key is an uuid and the value a Tuple
-# where we store number of retries and the time of last check
-skopeo_failures: Dict[str, Tuple[int, float]] = {}
-SKOPEO_MAX_RETRY = 3
-CACHE_SKOPEO_FAILURE_THRESHOLD_2_DAYS = 60 * 60 * 24 * 2
+# Workers started, and the number of images read from each registry at once
+_label_workers: list[threading.Thread] = []
+_registry_concurrency = DEFAULT_IMAGE_LABEL_REGISTRY_CONCURRENCY
+_registry_slots_lock = threading.Lock()
+# Images being read by registry
+_registry_busy: Counter[str] = Counter()
+# Queue entries waiting for a registry to have a free slot, by registry
+_registry_waiting: Dict[str, list] = {}
+
+# Total time spent by images in the queue, and reading their labels, in seconds
+_label_stats_lock = threading.Lock()
+_label_wait_seconds = 0.0
+_label_lookup_seconds = 0.0
+_label_lookups = 0
+
+IMAGE_LABEL_CACHE_SIZE_ENV = "IMAGE_LABEL_CACHE_SIZE"
+# Number of images whose labels are kept in memory.
+DEFAULT_IMAGE_LABEL_CACHE_SIZE = 10_000
+
+# Images whose labels could not be read are retried with a jittered exponential
+# backoff, in seconds. Registries refusing access are retried less often than
+# network and server errors, since credentials do not fix themselves quickly.
+LABEL_RETRY_BACKOFF = 60
+LABEL_RETRY_MAX_BACKOFF = 60 * 60 * 6
+AUTH_FAILURE_RETRY_BACKOFF = 60 * 60
+AUTH_FAILURE_RETRY_MAX_BACKOFF = 60 * 60 * 24
+# skopeo errors of registries refusing access, or hiding the image
+_SKOPEO_AUTH_ERRORS = re.compile(
+    r"unauthorized|authentication required|denied|manifest unknown|name unknown",
+    re.IGNORECASE,
+)
+
+
+@frozen
+class LabelFailure:
+    """
+    An image whose labels could not be read, and when it may be read again.
+    """
+
+    auth: bool
+    # consecutive failures
+    attempts: int
+    retry_at: float
+
+
+# Images whose labels could not be read, by sha. They are forgotten
+# with the labels once no running Pod uses them.
+image_label_failures_lock = threading.Lock()
+image_label_failures: TTLCache[LabelFailure] = TTLCache(
+    name="image_label_failures",
+    max_size=DEFAULT_IMAGE_LABEL_CACHE_SIZE,
+    dump=attrs.asdict,
+    load=lambda data: LabelFailure(**data),
+)
 
 image_label_cache_lock = threading.Lock()
-image_label_cache: Dict[str, Tuple[Dict, float]] = {}
+# The image labels by sha. Labels of a digest never change, so they are kept
+# as long as a running Pod uses the image, the least recently used ones being
+# evicted past the cache size.
+image_label_cache: TTLCache[Dict] = TTLCache(
+    name="image_labels", max_size=DEFAULT_IMAGE_LABEL_CACHE_SIZE
+)
 
 # Store pods that are running, needed for cleanup
 running_pods_shas_lock = threading.Lock()
@@ -77,6 +148,43 @@ class SkopeoDataException(Exception):
     pass
 
 
+_registry_client: Optional[RegistryClient] = None
+_registry_client_lock = threading.Lock()
+
+
+def _get_registry_client() -> RegistryClient:
+    """
+    The client reading labels from the registries, trusting the CA certificates
+    in CA_CRT_DIR like skopeo does.
+    """
+    global _registry_client
+    with _registry_client_lock:
+        if _registry_client is None:
+            _registry_client = RegistryClient.with_verify(
+                set_up_requests_certs(
+                    extra_certs=sorted(Path(CA_CRT_DIR).glob("*.crt"))
+                )
+            )
+        return _registry_client
+
+
+def _get_labels_from_registry(
+    image_uri: str,
+) -> Tuple[Optional[Dict[str, str]], Optional[RegistryError]]:
+    """
+    The labels of the image read from its registry, or the error
+    if the registry could not be read, to fall back to skopeo.
+    """
+    reference = ImageReference.parse(image_uri)
+    if reference is None:
+        return None, None
+    try:
+        return _get_registry_client().get_labels(reference), None
+    except RegistryError as e:
+        logging.debug(f"Reading {image_uri} from its registry failed: {e}")
+        return None, e
+
+
 def _add_to_cleanup_set(sha_256: str) -> None:
     with running_pods_shas_lock:
         running_pods_shas.add(sha_256)
@@ -91,72 +199,92 @@ def _cache_container_images_labels(sha_256: str, labels: Dict) -> None:
     with image_label_cache_lock:
         if sha_256 not in image_label_cache:
             logging.debug(f"Adding SHA256 to the cache: {sha_256} ")
-            image_label_cache[sha_256] = (labels, time.time())
+            image_label_cache.set(sha_256, labels)
 
 
 def _cleanup_cache() -> None:
+    "Forget the images that no running Pod uses anymore."
     with running_pods_shas_lock, image_label_cache_lock:
-        current_time = time.time()
-
-        expired_shas = [
-            sha
-            for sha, (_, insertion_time) in image_label_cache.items()
-            if current_time - insertion_time > CACHE_THRESHOLD_1_DAYS
-            and sha not in running_pods_shas
-        ]
-        for sha_256 in expired_shas:
-            image_label_cache.pop(sha_256, None)
-
-
-def _add_skopeo_failure(sha_256: str) -> None:
-    with skopeo_failures_lock:
-        logging.debug(f"Adding SHA256 to the failures: {sha_256} ")
-        if sha_256 not in skopeo_failures:
-            skopeo_failures[sha_256] = (1, time.time())
+        for sha_256 in image_label_cache:
+            if sha_256 not in running_pods_shas:
+                image_label_cache.pop(sha_256, None)
+        with image_label_failures_lock:
+            for sha_256 in image_label_failures:
+                if sha_256 not in running_pods_shas:
+                    image_label_failures.pop(sha_256, None)
+
+
+def _is_auth_failure(
+    registry_error: Optional[RegistryError], skopeo_error: str = ""
+) -> bool:
+    "If the registry refused access to the image, to the client or to skopeo."
+    return bool(
+        (registry_error is not None and registry_error.is_auth_failure)
+        or _SKOPEO_AUTH_ERRORS.search(skopeo_error)
+    )
+
+
+def _add_label_failure(sha_256: str, auth: bool) -> None:
+    """
+    Remember that the labels of the image could not be read, so it is not
+    read again until its backoff is over.
+    """
+    with image_label_failures_lock:
+        previous = image_label_failures.get(sha_256)
+        attempts = previous.attempts + 1 if previous is not None else 1
+        if auth:
+            backoff, max_backoff = (
+                AUTH_FAILURE_RETRY_BACKOFF,
+                AUTH_FAILURE_RETRY_MAX_BACKOFF,
+            )
         else:
-            skopeo_failures[sha_256] = (skopeo_failures[sha_256][0] + 1, time.time())
+            backoff, max_backoff = LABEL_RETRY_BACKOFF, LABEL_RETRY_MAX_BACKOFF
+        # jittered, so images of the same registry are not all retried at once
+        backoff = min(backoff * 2 ** (attempts - 1), max_backoff)
+        backoff *= random.uniform(0.5, 1.0)
+        logging.debug(
+            "Reading the labels of %s failed %d time(s) (%s), retrying in %.0fs",
+            sha_256,
+            attempts,
+            "auth" if auth else "transient",
+            backoff,
+        )
+        image_label_failures.set(
+            sha_256,
+            LabelFailure(auth=auth, attempts=attempts, retry_at=time.time() + backoff),
+        )
 
 
-def _remove_from_skopeo_failure(sha_256: str) -> None:
-    with skopeo_failures_lock:
-        if sha_256 in skopeo_failures:
+def _remove_label_failure(sha_256: str) -> None:
+    with image_label_failures_lock:
+        if image_label_failures.pop(sha_256, None) is not None:
             logging.debug(f"Removing SHA256 from the failures: {sha_256} ")
-            skopeo_failures.pop(sha_256, None)
 
 
 def _sha256_valid_to_be_checked(sha_256: str) -> bool:
     """
-    Checks if the sha256 of an image was previously in
-    failures. If it was then it checks if the number of retries
-    was above threashold.
-
-    If it was then we check if the time treshold was met.
+    Checks if the labels of the image may be read: they never failed
+    to be read, or the backoff of the last failure is over.
     """
-    with skopeo_failures_lock:
-        if sha_256 not in skopeo_failures:
-            return True
-
-        no_failures, timestamp = skopeo_failures[sha_256]
-        if no_failures < SKOPEO_MAX_RETRY:
-            return True
-
-    # Must be outside of the failures lock, otherwise we will
-    # deadlock with the _remove_from_skopeo_failure() call
-    if time.time() - timestamp > CACHE_SKOPEO_FAILURE_THRESHOLD_2_DAYS:
-        _remove_from_skopeo_failure(sha_256)
-        return True
-
-    return False
+    with image_label_failures_lock:
+        failure = image_label_failures.get(sha_256)
+    return failure is None or failure.retry_at <= time.time()
 
 
 def get_labels_from_image(sha_256: str, image_uri: str) -> Dict[str, str]:
     # Check if the sha_256 is in the failures
-    # and if we should continue based on the SKOPEO_MAX_RETRY
-    # or CACHE_SKOPEO_FAILURE_THRESHOLD_2_DAYS
+    # and if its backoff is over
     if not _sha256_valid_to_be_checked(sha_256):
         logging.debug(f"Skipping skopeo for: {sha_256}")
         raise SkopeoDataException("Sha not to be checked")
 
+    labels, registry_error = _get_labels_from_registry(image_uri)
+    if labels is not None:
+        _remove_label_failure(sha_256)
+        logging.debug(f"Found the following labels for image {image_uri}: {labels}")
+        return labels
+
+    # registries that need credentials or a configuration only skopeo knows of
     logging.debug(f"Running skopeo for: {sha_256}")
     command = f"skopeo inspect --cert-dir {CA_CRT_DIR} {image_uri}"
     logging.debug(f"Running shell command: {command}")
@@ -166,8 +294,8 @@ def get_labels_from_image(sha_256: str, image_uri: str) -> Dict[str, str]:
     output, stderr = process.communicate()
     output = output.decode("utf-8").strip()
     if process.returncode != 0:
-        _add_skopeo_failure(sha_256)
         stderr = stderr.decode().strip()
+        _add_label_failure(sha_256, _is_auth_failure(registry_error, stderr))
         logging.debug(f"Error from skopeo for {command}: {stderr}")
         raise SkopeoDataException(stderr)
 
@@ -175,89 +303,210 @@ def get_labels_from_image(sha_256: str, image_uri: str) -> Dict[str, str]:
         image_data = json.loads(output)
         labels = image_data.get("Labels", {})
     except json.JSONDecodeError as e:
-        _add_skopeo_failure(sha_256)
+        _add_label_failure(sha_256, auth=False)
         logging.debug(f"Error from decoding JSON for {sha_256}: {e.msg}")
         raise SkopeoDataException("Error: Invalid JSON output")
 
     # We got the labels, so remove them from the potential
     # existence in the failures.
-    _remove_from_skopeo_failure(sha_256)
+    _remove_label_failure(sha_256)
     logging.debug(f"Found the following labels for image {image_uri}: {labels}")
     return labels
 
 
-def _skopeo_worker() -> None:
-    loop_count = 1
-    while True:
-        logging.debug(f"Worker loop: {loop_count}")
-        loop_count += 1
-        sha_pop = image_shas_uris_queue.get()
-        try:
-            for sha_256, sha_uri in sha_pop.items():
-                labels = get_labels_from_image(sha_256, sha_uri)
-                _cache_container_images_labels(sha_256, labels)
-        except Exception:
-            # We do not care about the error, but we want to continue
-            # our daemon worker.
-            pass
+def _registry_of(image_uri: str) -> str:
+    "The registry host of a `docker://` image URI."
+    return image_uri.split("://", 1)[-1].split("/", 1)[0]
 
-        image_shas_uris_queue.task_done()
+
+def _take_registry_slot(registry: str, entry: tuple) -> bool:
+    """
+    Take a slot of the registry to read the queued image from it,
+    or keep the entry until a slot is released if they are all taken.
+    """
+    with _registry_slots_lock:
+        if _registry_busy[registry] < _registry_concurrency:
+            _registry_busy[registry] += 1
+            return True
+        heapq.heappush(_registry_waiting.setdefault(registry, []), entry)
+        return False
+
+
+def _release_registry_slot(registry: str) -> None:
+    "Release a slot of the registry, queueing the next image waiting for it."
+    with _registry_slots_lock:
+        _registry_busy[registry] -= 1
+        if _registry_busy[registry] <= 0:
+            del _registry_busy[registry]
+        waiting = _registry_waiting.get(registry)
+        if waiting:
+            image_shas_uris_queue.put(heapq.heappop(waiting))
+            if not waiting:
+                del _registry_waiting[registry]
+
+
+def _process_queued_image(entry: tuple) -> None:
+    global _label_wait_seconds, _label_lookup_seconds, _label_lookups
+    _, _, sha_256, image_uri, queued_at = entry
+    registry = _registry_of(image_uri)
+    if not _take_registry_slot(registry, entry):
+        return
+
+    started_at = time.monotonic()
+    try:
+        labels = get_labels_from_image(sha_256, image_uri)
+        _cache_container_images_labels(sha_256, labels)
+    except Exception:
+        # We do not care about the error, but we want to continue
+        # our daemon worker.
+        pass
+    finally:
+        _release_registry_slot(registry)
+        with skopeo_lock:
+            sha_in_queue.discard(sha_256)
+        with _label_stats_lock:
+            _label_wait_seconds += started_at - queued_at
+            _label_lookup_seconds += time.monotonic() - started_at
+            _label_lookups += 1
 
 
-# Start the daemon thread which checks for the queue and gathers
-# labels for the queued items.
-skopeo_cache_thread = threading.Thread(target=_skopeo_worker, daemon=True)
-skopeo_cache_thread.start()
+def _skopeo_worker() -> None:
+    while True:
+        entry = image_shas_uris_queue.get()
+        try:
+            _process_queued_image(entry)
+        finally:
+            image_shas_uris_queue.task_done()
 
 
-def _add_image_to_get_label_queue(sha_256: str, image_uri: str) -> None:
+def _start_label_workers(workers: int, registry_concurrency: int) -> None:
+    """
+    Start the daemon threads which check for the queue and gather
+    labels for the queued items, up to `workers` of them.
+    """
+    global _registry_concurrency
+    with skopeo_lock:
+        _registry_concurrency = max(registry_concurrency, 1)
+        while len(_label_workers) < workers:
+            worker = threading.Thread(
+                target=_skopeo_worker,
+                name=f"image-labels-{len(_label_workers)}",
+                daemon=True,
+            )
+            worker.start()
+            _label_workers.append(worker)
+
+
+def _add_image_to_get_label_queue(
+    sha_256: str, image_uri: str, created_at: float = 0.0
+) -> None:
     """
     Function that puts the sha and corresponding image uri to the queue
-    to be processed by our skopeo worker Thread.
+    to be processed by our skopeo workers, unless it is already there.
+    Images of the newest pods, by their creation time, are processed first.
     """
 
     with image_label_cache_lock:
         if sha_256 in image_label_cache:
             return
-    #    TODO_1: Do not add to queue if already there
-    #    with skopeo_lock:
-    #        if sha_256 in sha_in_queue:
-    #            return
+    if not _sha256_valid_to_be_checked(sha_256):
+        return
+    with skopeo_lock:
+        if sha_256 in sha_in_queue:
+            return
+        sha_in_queue.add(sha_256)
     logging.debug(f"Adding SHA256 to the SKOPEO queue: {sha_256}")
-    image_shas_uris_queue.put({sha_256: image_uri})
+    image_shas_uris_queue.put(
+        (-created_at, next(_queue_sequence), sha_256, image_uri, time.monotonic())
+    )
+
+
+def _pod_created_at(pod: ResourceField) -> float:
+    "The creation time of the pod, 0 if unknown."
+    creation_timestamp = pod.metadata.creationTimestamp
+    if not creation_timestamp:
+        return 0.0
+    try:
+        return parse_assuming_utc(creation_timestamp, _DATETIME_FORMAT).timestamp()
+    except ValueError:
+        return 0.0
 
 
-def _set_commit_metadata(
-    pod: ResourceField,
+def _collect_label_queue_metrics():
+    depth = GaugeMetricFamily(
+        "pelorus_image_label_queue_depth",
+        "Number of images waiting for their labels to be read",
+    )
+    with _registry_slots_lock:
+        waiting = sum(len(entries) for entries in _registry_waiting.values())
+    depth.add_metric([], image_shas_uris_queue.qsize() + waiting)
+    yield depth
+
+    with _label_stats_lock:
+        wait_seconds, lookup_seconds, lookups = (
+            _label_wait_seconds,
+            _label_lookup_seconds,
+            _label_lookups,
+        )
+    wait = SummaryMetricFamily(
+        "pelorus_image_label_queue_wait_seconds",
+        "Time images waited in the queue before their labels were read",
+    )
+    wait.add_metric([], count_value=lookups, sum_value=wait_seconds)
+    yield wait
+    lookup = SummaryMetricFamily(
+        "pelorus_image_label_lookup_seconds",
+        "Time spent reading the labels of images from their registries",
+    )
+    lookup.add_metric([], count_value=lookups, sum_value=lookup_seconds)
+    yield lookup
+
+
+@frozen
+class ImageCommit:
+    """
+    The commit an image was built from, as told by its labels.
+    """
+
+    commit_hash: Optional[str]
+    commit_timestamp: Optional[float]
+    repo_url: str
+
+
+def _get_image_commit(
     date_label: str,
     hash_label: str,
     repo_url_label: str,
     sha_256: str,
     date_format: str = None,
-) -> None:
+) -> Optional[ImageCommit]:
+    """
+    The commit of the image from its cached labels, None if they are not read yet.
+    Pods are left as they are, since they may be shared with an informer cache.
+    """
     with image_label_cache_lock:
         labels = image_label_cache.get(sha_256, None)
-        logging.debug(f"Got image labels for: {sha_256}")
-        if labels and isinstance(labels, Tuple) and isinstance(labels[0], dict):
-            pod.metadata.commit_hash = labels[0].get(hash_label)
-            commit_time = labels[0].get(date_label)
-            if commit_time:
-                try:
-                    pod.metadata.commit_timestamp = to_epoch_from_string(
-                        commit_time
-                    ).timestamp()
-                except (ValueError, AttributeError):
-                    try:
-                        # Do nothing here as we tried with EPOCH timestamp
-                        pod.metadata.commit_timestamp = parse_guessing_timezone_DYNAMIC(
-                            commit_time, format=date_format
-                        ).timestamp()
-                    except ValueError:
-                        logging.debug(f"Can't get commit timestamp for sha: {sha_256}")
-            repo_url = labels[0].get(repo_url_label)
-            if not repo_url:
-                repo_url = "unknown"
-            pod.metadata.repo_url = repo_url
+    logging.debug(f"Got image labels for: {sha_256}")
+    if not (labels and isinstance(labels, dict)):
+        return None
+    commit_timestamp = None
+    commit_time = labels.get(date_label)
+    if commit_time:
+        try:
+            commit_timestamp = to_epoch_from_string(commit_time).timestamp()
+        except (ValueError, AttributeError):
+            try:
+                # Do nothing here as we tried with EPOCH timestamp
+                commit_timestamp = parse_guessing_timezone_DYNAMIC(
+                    commit_time, format=date_format
+                ).timestamp()
+            except ValueError:
+                logging.debug(f"Can't get commit timestamp for sha: {sha_256}")
+    return ImageCommit(
+        commit_hash=labels.get(hash_label),
+        commit_timestamp=commit_timestamp,
+        repo_url=labels.get(repo_url_label) or "unknown",
+    )
 
 
 @define(kw_only=True)
@@ -268,9 +517,51 @@ class ContainerImageCommitCollector(AbstractCommitCollector):
     hash_annotation_name: str = CommitMetric._ANNOTATION_MAPPIG["commit_hash"]
     repo_url_annotation_name: str = CommitMetric._ANNOTATION_MAPPIG["repo_url"]
 
+    watch_pods: bool = field(
+        default=False,
+        converter=attrs.converters.to_bool,
+        metadata=env_vars(WATCH_PODS_ENV),
+    )
+
+    image_label_workers: int = field(
+        default=DEFAULT_IMAGE_LABEL_WORKERS,
+        converter=int,
+        metadata=env_vars(IMAGE_LABEL_WORKERS_ENV),
+    )
+
+    registry_concurrency: int = field(
+        default=DEFAULT_IMAGE_LABEL_REGISTRY_CONCURRENCY,
+        converter=int,
+        metadata=env_vars(IMAGE_LABEL_REGISTRY_CONCURRENCY_ENV),
+    )
+
+    image_label_cache_size: int = field(
+        default=DEFAULT_IMAGE_LABEL_CACHE_SIZE,
+        converter=int,
+        metadata=env_vars(IMAGE_LABEL_CACHE_SIZE_ENV),
+    )
+
+    _pod_cache: Optional[PodInformerCache] = field(default=None, init=False)
+
+    def __attrs_post_init__(self):
+        super().__attrs_post_init__()
+        image_label_cache.max_size = self.image_label_cache_size
+        image_label_failures.max_size = self.image_label_cache_size
+        _start_label_workers(self.image_label_workers, self.registry_concurrency)
+        if self.watch_pods:
+            self._pod_cache = PodInformerCache(
+                client=self.kube_client,
+                namespaces=self.namespaces,
+                app_label=self.app_label,
+            )
+
     def get_commit_time(self, metric) -> Optional[CommitMetric]:
         return super().get_commit_time(metric)
 
+    def collect(self):
+        yield from super().collect()
+        yield from _collect_label_queue_metrics()
+
     # overrides collector_base.generate_metric()
     def generate_metrics(self) -> Iterable[CommitMetric]:
         metrics = []
@@ -286,7 +577,10 @@ class ContainerImageCommitCollector(AbstractCommitCollector):
 
         _clear_cleanup_set()
 
-        pods = get_running_pods(self.kube_client, namespaces, self.app_label)
+        if self._pod_cache:
+            pods = self._pod_cache.get_running_pods(namespaces)
+        else:
+            pods = get_running_pods(self.kube_client, namespaces, self.app_label)
 
         # Build dictionary with controllers and retrieved pods
         replica_pods_dict = filter_pods_by_replica_uid(pods)
@@ -296,28 +590,28 @@ class ContainerImageCommitCollector(AbstractCommitCollector):
             # containers (images) per pod, we will push one metric per image/container in the
             # pod template
             images = get_images_from_pod(pod)
+            created_at = _pod_created_at(pod)
 
             for sha, image_uri in images.items():
                 _add_to_cleanup_set(sha)
-                _add_image_to_get_label_queue(sha, image_uri)
-                _set_commit_metadata(
-                    pod,
+                _add_image_to_get_label_queue(sha, image_uri, created_at)
+                commit = _get_image_commit(
                     self.date_annotation_name,
                     self.hash_annotation_name,
                     self.repo_url_annotation_name,
                     sha,
                     self.date_format,
                 )
-                if pod.metadata.commit_timestamp and pod.metadata.commit_hash:
+                if commit and commit.commit_timestamp and commit.commit_hash:
                     metric = CommitMetric(
                         name=pod.metadata.labels[self.app_label],
                         namespace=pod.metadata.namespace,
                         labels=pod.metadata.labels,
-                        commit_hash=pod.metadata.commit_hash,
-                        commit_timestamp=pod.metadata.commit_timestamp,
+                        commit_hash=commit.commit_hash,
+                        commit_timestamp=commit.commit_timestamp,
                         image_hash=sha,
                     )
-                    metric.commit_link = pod.metadata.repo_url
+                    metric.commit_link = commit.repo_url
                     yield metric
 
         _cleanup_cache()
@@ -0,0 +1,352 @@
+"""
+Commit times from local mirrors of the repositories, without any git provider API.
+
+Each repository is cloned once as a bare mirror of its commits only into `mirror_dir`,
+which should be a persistent volume so the mirrors survive restarts, and is
+fetched again at most every `mirror_fetch_interval` seconds, or when a commit
+is not found in it and it was not fetched in the last minute.
+Commits are read from a long-lived `git cat-file --batch` process per mirror,
+which answers any number of lookups without starting a new process or sending
+a request per commit.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from attrs import define, field
+
+from committime import CommitMetric
+from pelorus.config import env_vars
+
+from .collector_base import AbstractCommitCollector, CommitLookupError
+
+GIT_MIRROR_DIR_ENV = "GIT_MIRROR_DIR"
+GIT_MIRROR_FETCH_INTERVAL_ENV = "GIT_MIRROR_FETCH_INTERVAL"
+DEFAULT_GIT_MIRROR_DIR = "/var/lib/pelorus/git-mirrors"
+# Seconds between fetches of a mirror, unless a commit is missing from it.
+DEFAULT_GIT_MIRROR_FETCH_INTERVAL = 300.0
+# Seconds between fetches of a mirror for missing commits, so commits that
+# are not in the repository do not cause a fetch each,
+# and between attempts to clone a mirror.
+MIN_FORCED_FETCH_INTERVAL = 60.0
+# Seconds a clone or fetch may take.
+GIT_TIMEOUT = 30 * 60
+
+# `committer <name> <<email>> <unix timestamp> <+hhmm offset>`
+_COMMITTER_LINE = re.compile(
+    rb"^committer .* (?P<timestamp>-?\d+) (?P<offset>[+-]\d{4})$"
+)
+
+
+class GitError(Exception):
+    "A git command failed."
+
+
+def parse_committer_date(commit_object: bytes) -> Optional[datetime]:
+    """
+    The committer date of a raw commit object, in the committer's time zone.
+    None if the object has no committer line.
+    """
+    headers = commit_object.split(b"\n\n", 1)[0]
+    for line in headers.split(b"\n"):
+        match = _COMMITTER_LINE.match(line)
+        if match:
+            offset = match["offset"]
+            sign = -1 if offset.startswith(b"-") else 1
+            tz = timezone(
+                sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+            )
+            return datetime.fromtimestamp(int(match["timestamp"]), tz=tz)
+    return None
+
+
+class CatFileBatch:
+    """
+    A `git cat-file --batch` process reading objects of a repository,
+    one at a time.
+    """
+
+    def __init__(self, git_dir: Path):
+        self.process = subprocess.Popen(
+            ["git", "--git-dir", str(git_dir), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            # missing commits are fetched by the mirror, not one by one
+            env=dict(os.environ, GIT_NO_LAZY_FETCH="1"),
+        )
+
+    def read(self, revision: str) -> tuple[Optional[str], Optional[bytes]]:
+        """
+        The full hash and the content of the commit, (None, None) if missing.
+        Abbreviated hashes are accepted.
+        """
+        stdin, stdout = self.process.stdin, self.process.stdout
+        assert stdin is not None and stdout is not None
+        stdin.write(revision.encode() + b"\n")
+        stdin.flush()
+        header = stdout.readline()
+        if not header:
+            raise GitError("git cat-file exited")
+        parts = header.split()
+        if len(parts) != 3:
+            # "<revision> missing" or "<revision> ambiguous"
+            return None, None
+        object_hash, object_type, size = parts
+        content = stdout.read(int(size) + 1)[:-1]
+        if object_type != b"commit":
+            return None, None
+        return object_hash.decode(), content
+
+    def close(self) -> None:
+        if self.process.stdin:
+            self.process.stdin.close()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+@define(kw_only=True)
+class GitMirror:
+    """
+    A bare mirror of a repository, cloned on first use and fetched when due.
+    """
+
+    url: str
+    path: Path
+    fetch_interval: float
+    # git configuration given through the environment, such as credentials
+    git_config: dict[str, str] = field(factory=dict, repr=False)
+    timer: Callable[[], float] = field(default=time.monotonic, repr=False)
+
+    # last clone or fetch attempt, failed or not
+    _fetched_at: Optional[float] = field(default=None, init=False)
+    _cat_file: Optional[CatFileBatch] = field(default=None, init=False)
+    _lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    def read_commits(self, revisions: list[str]) -> dict[str, tuple[str, bytes]]:
+        """
+        The full hash and content of the commits found, by requested revision.
+        The mirror is fetched first if due, and again if some are missing,
+        unless it was fetched less than MIN_FORCED_FETCH_INTERVAL seconds ago.
+        When fetching fails, the commits are read from the mirror as it is.
+        """
+        with self._lock:
+            fetched = self._try_update(force=False)
+            if not (self.path / "HEAD").exists():
+                raise GitError(f"No mirror of {self.url} yet")
+            found = self._read(revisions)
+            # commits pushed since the last fetch
+            if (
+                len(found) < len(revisions)
+                and not fetched
+                and self._try_update(force=True)
+            ):
+                found.update(
+                    self._read(
+                        [revision for revision in revisions if revision not in found]
+                    )
+                )
+            return found
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_cat_file()
+
+    def _read(self, revisions: list[str]) -> dict[str, tuple[str, bytes]]:
+        if self._cat_file is None:
+            self._cat_file = CatFileBatch(self.path)
+        found = {}
+        for revision in revisions:
+            if not re.fullmatch(r"[0-9a-fA-F]{4,64}", revision):
+                continue
+            object_hash, content = self._cat_file.read(revision)
+            if content is not None:
+                found[revision] = (object_hash, content)
+        return found
+
+    def _try_update(self, force: bool) -> bool:
+        """
+        Clone or fetch the mirror if due, returning if it was attempted.
+        Failures are logged, and the mirror is not fetched again until due.
+        """
+        try:
+            return self._update(force)
+        except GitError:
+            logging.warning(
+                "Failed updating the mirror of %s, reading it as it is",
+                self.url,
+                exc_info=True,
+            )
+            return True
+
+    def _update(self, force: bool) -> bool:
+        """
+        Clone or fetch the mirror if due, returning if it was.
+        When forced, or when the mirror could not be cloned yet,
+        it is due MIN_FORCED_FETCH_INTERVAL seconds after the last attempt.
+        """
+        cloned = (self.path / "HEAD").exists()
+        due_after = self.fetch_interval
+        if force or not cloned:
+            due_after = min(due_after, MIN_FORCED_FETCH_INTERVAL)
+        if self._fetched_at is not None and self.timer() - self._fetched_at < due_after:
+            return False
+        # set first, so a failing remote is not tried again until due
+        self._fetched_at = self.timer()
+        if not cloned:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            logging.info("Cloning a mirror of %s into %s", self.url, self.path)
+            # commits are all that is needed, not the trees and files
+            self._git(
+                "clone",
+                "--mirror",
+                "--filter=tree:0",
+                "--quiet",
+                self.url,
+                str(self.path),
+            )
+        else:
+            logging.debug("Fetching the mirror of %s", self.url)
+            self._git("fetch", "--prune", "--quiet", git_dir=self.path)
+        # new packs are picked up by a new process
+        self._close_cat_file()
+        return True
+
+    def _close_cat_file(self) -> None:
+        if self._cat_file is not None:
+            self._cat_file.close()
+            self._cat_file = None
+
+    def _git(self, command: str, *args: str, git_dir: Optional[Path] = None) -> None:
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        # passed through the environment so credentials never show in arguments
+        env["GIT_CONFIG_COUNT"] = str(len(self.git_config))
+        for number, (key, value) in enumerate(self.git_config.items()):
+            env[f"GIT_CONFIG_KEY_{number}"] = key
+            env[f"GIT_CONFIG_VALUE_{number}"] = value
+        try:
+            subprocess.run(
+                [
+                    "git",
+                    *(["--git-dir", str(git_dir)] if git_dir else []),
+                    command,
+                    *args,
+                ],
+                env=env,
+                check=True,
+                capture_output=True,
+                timeout=GIT_TIMEOUT,
+            )
+        except subprocess.CalledProcessError as e:
+            raise GitError(
+                f"git {command} of {self.url} failed: "
+                f"{e.stderr.decode(errors='replace').strip()}"
+            ) from e
+        except subprocess.TimeoutExpired as e:
+            raise GitError(f"git {command} of {self.url} timed out") from e
+
+
+@define(kw_only=True)
+class GitMirrorCommitCollector(AbstractCommitCollector):
+    collector_name = "Git-Mirror"
+
+    mirror_dir: str = field(
+        default=DEFAULT_GIT_MIRROR_DIR, metadata=env_vars(GIT_MIRROR_DIR_ENV)
+    )
+
+    mirror_fetch_interval: float = field(
+        default=DEFAULT_GIT_MIRROR_FETCH_INTERVAL,
+        converter=float,
+        metadata=env_vars(GIT_MIRROR_FETCH_INTERVAL_ENV),
+    )
+
+    # Mirrors by repository URL
+    _mirrors: dict[str, GitMirror] = field(factory=dict, init=False)
+    _mirrors_lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    def mirror_path(self, repo_url: str) -> Path:
+        "Where the repository is mirrored, named after its URL."
+        name = re.sub(r"[^\w.-]+", "_", repo_url.split("://")[-1]).strip("_")[-64:]
+        digest = hashlib.sha256(repo_url.encode()).hexdigest()[:12]
+        return Path(self.mirror_dir) / f"{name}-{digest}.git"
+
+    def _git_config(self, repo_url: str) -> dict[str, str]:
+        if not (self.token and repo_url.startswith(("https://", "http://"))):
+            return {}
+        credentials = base64.b64encode(f"{self.username}:{self.token}".encode())
+        return {"http.extraHeader": f"Authorization: Basic {credentials.decode()}"}
+
+    def _get_mirror(self, repo_url: str) -> GitMirror:
+        with self._mirrors_lock:
+            mirror = self._mirrors.get(repo_url)
+            if mirror is None:
+                mirror = self._mirrors[repo_url] = GitMirror(
+                    url=repo_url,
+                    path=self.mirror_path(repo_url),
+                    fetch_interval=self.mirror_fetch_interval,
+                    git_config=self._git_config(repo_url),
+                )
+            return mirror
+
+    @staticmethod
+    def _update_metric(
+        metric: CommitMetric, object_hash: str, commit_object: bytes
+    ) -> Optional[CommitMetric]:
+        commit_time = parse_committer_date(commit_object)
+        if commit_time is None:
+            logging.warning("Commit %s has no committer date", object_hash)
+            return None
+        metric.commit_time = commit_time.isoformat()
+        metric.commit_timestamp = commit_time.timestamp()
+        metric.commit_link = metric.repo_url
+        return metric
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        "Read all the commits of each repository from its mirror at once."
+        by_repo: dict[str, list[CommitMetric]] = {}
+        for metric in metrics:
+            by_repo.setdefault(metric.repo_url, []).append(metric)
+
+        resolved = []
+        for repo_url, pending in by_repo.items():
+            try:
+                found = self._get_mirror(repo_url).read_commits(
+                    list({metric.commit_hash for metric in pending})
+                )
+            except Exception:
+                logging.warning(
+                    "Failed reading commits from the mirror of %s",
+                    repo_url,
+                    exc_info=True,
+                )
+                continue
+            for metric in pending:
+                if metric.commit_hash in found and self._update_metric(
+                    metric, *found[metric.commit_hash]
+                ):
+                    resolved.append(metric)
+        return resolved
+
+    # base class impl
+    def get_commit_time(self, metric: CommitMetric):
+        try:
+            found = self._get_mirror(metric.repo_url).read_commits([metric.commit_hash])
+        except GitError as e:
+            raise CommitLookupError(str(e)) from e
+        if metric.commit_hash not in found:
+            raise CommitLookupError(
+                "Commit %s not found in %s" % (metric.commit_hash, metric.repo_url)
+            )
+        return self._update_metric(metric, *found[metric.commit_hash])
@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 import attrs
 import requests
@@ -9,11 +10,19 @@ from pelorus.config.converters import pass_through
 from pelorus.timeutil import parse_assuming_utc, second_precision
 from pelorus.utils import Url, set_up_requests_session
 
-from .collector_base import AbstractCommitCollector, UnsupportedGITProvider
+from .collector_base import (
+    AbstractCommitCollector,
+    CommitLookupError,
+    UnsupportedGITProvider,
+    repo_web_url,
+)
 
 _DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
 DEFAULT_GITEA_API = Url.parse("https://try.gitea.io")
+# Number of commits per page when listing recent commits,
+# the default maximum of Gitea
+COMMITS_PER_PAGE = 50
 
 
 @define(kw_only=True)
@@ -27,6 +36,7 @@ class GiteaCommitCollector(AbstractCommitCollector):
     )
 
     _path_template = "/api/v1/repos/{group}/{project}/git/commits/{hash}"
+    _list_path_template = "/api/v1/repos/{group}/{project}/commits"
 
     def __attrs_post_init__(self):
         super().__attrs_post_init__()
@@ -34,18 +44,102 @@ class GiteaCommitCollector(AbstractCommitCollector):
             self.session, self.tls_verify, username=self.username, token=self.token
         )
 
+    @staticmethod
+    def _is_gitea_server(git_server: str) -> bool:
+        return not (
+            "github" in git_server
+            or "bitbucket" in git_server
+            or "gitlab" in git_server
+            or "azure" in git_server
+        )
+
+    def commit_link(self, metric: CommitMetric) -> Optional[str]:
+        return f"{repo_web_url(metric)}/commit/{metric.commit_hash}"
+
+    @staticmethod
+    def _update_metric(metric: CommitMetric, commit: dict) -> CommitMetric:
+        commit_time_str: str = commit["commit"]["committer"]["date"]
+        metric.commit_time = commit_time_str
+
+        commit_time = parse_assuming_utc(commit_time_str, format=_DATETIME_FORMAT)
+        commit_time = second_precision(commit_time)
+
+        logging.debug("metric.commit_time %s", commit_time)
+        metric.commit_timestamp = commit_time.timestamp()
+        metric.commit_link = commit["html_url"]
+        return metric
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        List the recent commits of the default branch of the repositories with
+        more pending commits than `commit_prefetch_pages`, up to that many pages
+        per repository.
+        """
+        gitea_metrics = [
+            metric for metric in metrics if self._is_gitea_server(metric.git_server)
+        ]
+        since = self.prefetch_since.strftime(_DATETIME_FORMAT)
+        resolved = []
+        for repo_url, pending in self._commits_to_prefetch(gitea_metrics).items():
+            try:
+                resolved += self._list_recent_commits(pending, since)
+            except Exception:
+                logging.warning(
+                    "Failed listing recent commits of %s", repo_url, exc_info=True
+                )
+        return resolved
+
+    def _list_recent_commits(
+        self, pending: list[CommitMetric], since: str
+    ) -> list[CommitMetric]:
+        "Resolve the pending commits of a repository from its recent commits."
+        path = self._list_path_template.format(
+            group=pending[0].repo_group, project=pending[0].repo_project
+        )
+        url = self.git_api._replace(path=path).url
+
+        unresolved = {metric.commit_hash: metric for metric in pending}
+        resolved = []
+        for page in range(1, self.commit_prefetch_pages + 1):
+            response = self.session.get(
+                url,
+                params=dict(
+                    since=since,
+                    limit=COMMITS_PER_PAGE,
+                    page=page,
+                    # only the commits themselves are needed
+                    stat="false",
+                    verification="false",
+                    files="false",
+                ),
+                auth=(self.username, self.token),
+            )
+            response.raise_for_status()
+            commits = response.json()
+            for commit in commits:
+                for commit_hash in [
+                    h for h in unresolved if commit["sha"].startswith(h)
+                ]:
+                    resolved.append(
+                        self._update_metric(unresolved.pop(commit_hash), commit)
+                    )
+            if not unresolved or len(commits) < COMMITS_PER_PAGE:
+                break
+        logging.debug(
+            "Resolved %d of %d commit(s) of %s by listing its recent commits",
+            len(resolved),
+            len(pending),
+            pending[0].repo_url,
+        )
+        return resolved
+
     # base class impl
     def get_commit_time(self, metric: CommitMetric):
         """Method called to collect data and send to Prometheus"""
 
         git_server = metric.git_server
 
-        if (
-            "github" in git_server
-            or "bitbucket" in git_server
-            or "gitlab" in git_server
-            or "azure" in git_server
-        ):
+        if not self._is_gitea_server(git_server):
             raise UnsupportedGITProvider(
                 "Skipping non Gitea server, found %s" % (git_server)
             )
@@ -70,20 +164,14 @@ class GiteaCommitCollector(AbstractCommitCollector):
                     str(response.status_code),
                 )
             )
+            raise CommitLookupError(
+                "Couldn't get commit time, got http code %s" % response.status_code,
+                status_code=response.status_code,
+            )
         else:
             commit = response.json()
             try:
-                commit_time_str: str = commit["commit"]["committer"]["date"]
-                metric.commit_time = commit_time_str
-
-                commit_time = parse_assuming_utc(
-                    commit_time_str, format=_DATETIME_FORMAT
-                )
-                commit_time = second_precision(commit_time)
-
-                logging.debug("metric.commit_time %s", commit_time)
-                metric.commit_timestamp = commit_time.timestamp()
-                metric.commit_link = commit["html_url"]
+                self._update_metric(metric, commit)
             except Exception:
                 logging.error(
                     "Failed processing commit time for build %s" % metric.build_name,
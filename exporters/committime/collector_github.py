@@ -1,18 +1,47 @@
 import logging
+import re
+from itertools import groupby
+from typing import Optional
 
 import attrs
 import requests
 from attrs import define, field
 
 from committime import CommitMetric
+from pelorus.config import env_vars
 from pelorus.config.converters import pass_through
 from pelorus.utils import Url, set_up_requests_session
 from provider_common.github import parse_datetime
+from provider_common.ratelimit import (
+    DEFAULT_BURST,
+    DEFAULT_MAX_PAUSE,
+    DEFAULT_THRESHOLD,
+    GITHUB_RATELIMIT_BURST_ENV,
+    GITHUB_RATELIMIT_MAX_PAUSE_ENV,
+    GITHUB_RATELIMIT_THRESHOLD_ENV,
+    RateLimitExceeded,
+    rate_limit_session,
+)
 
-from .collector_base import AbstractCommitCollector, UnsupportedGITProvider
+from .collector_base import (
+    AbstractCommitCollector,
+    CommitLookupError,
+    UnsupportedGITProvider,
+    repo_web_url,
+)
 
 DEFAULT_GITHUB_API = Url.parse("api.github.com")
 
+GITHUB_GRAPHQL_BATCH_SIZE_ENV = "GITHUB_GRAPHQL_BATCH_SIZE"
+# Maximum number of commits looked up by a single GraphQL query.
+DEFAULT_GITHUB_GRAPHQL_BATCH_SIZE = 50
+
+_COMMIT_FIELDS = "... on Commit { committedDate url }"
+# object(oid:) only takes full commit hashes, and fails the whole query otherwise
+_FULL_COMMIT_HASH = re.compile(r"[0-9a-fA-F]{40}")
+# Number of commits per page when listing recent commits
+COMMITS_PER_PAGE = 100
+
 
 @define(kw_only=True)
 class GitHubCommitCollector(AbstractCommitCollector):
@@ -24,24 +53,248 @@ class GitHubCommitCollector(AbstractCommitCollector):
         converter=attrs.converters.optional(pass_through(Url, Url.parse)),
     )
 
+    graphql_batch_size: int = field(
+        default=DEFAULT_GITHUB_GRAPHQL_BATCH_SIZE,
+        converter=int,
+        metadata=env_vars(GITHUB_GRAPHQL_BATCH_SIZE_ENV),
+    )
+
+    ratelimit_burst: int = field(
+        default=DEFAULT_BURST,
+        converter=int,
+        metadata=env_vars(GITHUB_RATELIMIT_BURST_ENV),
+    )
+
+    ratelimit_threshold: int = field(
+        default=DEFAULT_THRESHOLD,
+        converter=int,
+        metadata=env_vars(GITHUB_RATELIMIT_THRESHOLD_ENV),
+    )
+
+    ratelimit_max_pause: float = field(
+        default=DEFAULT_MAX_PAUSE,
+        converter=float,
+        metadata=env_vars(GITHUB_RATELIMIT_MAX_PAUSE_ENV),
+    )
+
+    # Set when the server has no GraphQL API, like older GitHub Enterprise versions
+    _graphql_unavailable: bool = field(default=False, init=False)
+
     _path_pattern = "/repos/{group}/{project}/commits/{hash}"
+    _list_path_pattern = "/repos/{group}/{project}/commits"
 
     def __attrs_post_init__(self):
         super().__attrs_post_init__()
         set_up_requests_session(
             self.session, self.tls_verify, username=self.username, token=self.token
         )
+        rate_limit_session(
+            self.session,
+            self.git_api.host,
+            self.token,
+            burst=self.ratelimit_burst,
+            threshold=self.ratelimit_threshold,
+            max_pause=self.ratelimit_max_pause,
+        )
 
-    def get_commit_time(self, metric: CommitMetric):
-        """Method called to collect data and send to Prometheus"""
-        git_server = metric.git_fqdn
-        # check for gitlab or bitbucket
-        if (
+    @staticmethod
+    def _is_github_server(git_server: str) -> bool:
+        return not (
             "gitea" in git_server
             or "gitlab" in git_server
             or "bitbucket" in git_server
             or "azure" in git_server
-        ):
+        )
+
+    @property
+    def graphql_url(self) -> str:
+        """
+        The GraphQL endpoint: /graphql on api.github.com,
+        and /api/graphql on GitHub Enterprise.
+        """
+        path = (self.git_api.path or "").rstrip("/")
+        if path.endswith("/v3"):
+            path = path[: -len("/v3")] + "/graphql"
+        elif self.git_api.host == DEFAULT_GITHUB_API.host:
+            path = "/graphql"
+        else:
+            path = "/api/graphql"
+        return self.git_api._replace(path=path).url
+
+    def commit_link(self, metric: CommitMetric) -> Optional[str]:
+        return f"{repo_web_url(metric)}/commit/{metric.commit_hash}"
+
+    @staticmethod
+    def _update_metric(metric: CommitMetric, commit: dict) -> CommitMetric:
+        metric.commit_time = commit["commit"]["committer"]["date"]
+        metric.commit_timestamp = parse_datetime(metric.commit_time).timestamp()
+        metric.commit_link = commit["html_url"]
+        return metric
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        List the recent commits of the default branch of the repositories with
+        more pending commits than `commit_prefetch_pages`, up to that many pages
+        per repository, then look up the remaining commits with GraphQL queries.
+
+        Listing goes first since its responses can be replayed from the HTTP
+        cache when the repository did not change, which GraphQL queries cannot.
+        """
+        metrics = [
+            metric
+            for metric in metrics
+            if self._is_github_server(metric.git_fqdn)
+            and metric.repo_group
+            and metric.repo_project
+        ]
+        resolved = self._prefetch_commits(metrics)
+        prefetched = {id(metric) for metric in resolved}
+        unresolved = [metric for metric in metrics if id(metric) not in prefetched]
+        return resolved + self._query_commit_times(unresolved)
+
+    def _prefetch_commits(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        since = self.prefetch_since.strftime("%Y-%m-%dT%H:%M:%SZ")
+        resolved = []
+        for repo_url, pending in self._commits_to_prefetch(metrics).items():
+            try:
+                resolved += self._list_recent_commits(pending, since)
+            except Exception:
+                logging.warning(
+                    "Failed listing recent commits of %s", repo_url, exc_info=True
+                )
+        return resolved
+
+    def _list_recent_commits(
+        self, pending: list[CommitMetric], since: str
+    ) -> list[CommitMetric]:
+        "Resolve the pending commits of a repository from its recent commits."
+        path = self._list_path_pattern.format(
+            group=pending[0].repo_group, project=pending[0].repo_project
+        )
+        url = self.git_api._replace(path=path).url
+
+        unresolved = {metric.commit_hash: metric for metric in pending}
+        resolved = []
+        for page in range(1, self.commit_prefetch_pages + 1):
+            response = self.session.get(
+                url, params=dict(since=since, per_page=COMMITS_PER_PAGE, page=page)
+            )
+            response.raise_for_status()
+            commits = response.json()
+            for commit in commits:
+                for commit_hash in [
+                    h for h in unresolved if commit["sha"].startswith(h)
+                ]:
+                    resolved.append(
+                        self._update_metric(unresolved.pop(commit_hash), commit)
+                    )
+            if not unresolved or len(commits) < COMMITS_PER_PAGE:
+                break
+        logging.debug(
+            "Resolved %d of %d commit(s) of %s by listing its recent commits",
+            len(resolved),
+            len(pending),
+            pending[0].repo_url,
+        )
+        return resolved
+
+    def _query_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        Look up commits with GraphQL queries, each resolving up to
+        `graphql_batch_size` commits. Commits that are not found, or have an
+        abbreviated hash, are left for the REST API, which reports why.
+        """
+        # GraphQL does not allow anonymous queries
+        if not self.token or self.graphql_batch_size <= 0 or self._graphql_unavailable:
+            return []
+        metrics = sorted(
+            (
+                metric
+                for metric in metrics
+                if _FULL_COMMIT_HASH.fullmatch(metric.commit_hash or "")
+            ),
+            key=lambda metric: (metric.repo_group, metric.repo_project),
+        )
+        resolved = []
+        for start in range(0, len(metrics), self.graphql_batch_size):
+            batch = metrics[start : start + self.graphql_batch_size]
+            commits = self._query_commits(batch)
+            if commits is None:
+                break
+            for metric, commit in zip(batch, commits):
+                if commit:
+                    metric.commit_time = commit["committedDate"]
+                    metric.commit_timestamp = parse_datetime(
+                        metric.commit_time
+                    ).timestamp()
+                    metric.commit_link = commit["url"]
+                    resolved.append(metric)
+        return resolved
+
+    def _query_commits(self, metrics: list[CommitMetric]) -> Optional[list]:
+        """
+        Query the commits of the metrics, grouped by repository, as a single
+        GraphQL query of aliased `object(oid:)` lookups.
+
+        Returns the commits in the order of the metrics, None for the ones not found.
+        Returns None if the server has no GraphQL API.
+        """
+        variables = {}
+        repositories = []
+        aliases = []
+        by_repo = groupby(
+            metrics, key=lambda metric: (metric.repo_group, metric.repo_project)
+        )
+        for repo_number, ((owner, name), repo_metrics) in enumerate(by_repo):
+            variables[f"owner{repo_number}"] = owner
+            variables[f"name{repo_number}"] = name
+            objects = []
+            for metric in repo_metrics:
+                commit_number = len(aliases)
+                variables[f"oid{commit_number}"] = metric.commit_hash
+                objects.append(
+                    f"c{commit_number}: object(oid: $oid{commit_number}) "
+                    f"{{ {_COMMIT_FIELDS} }}"
+                )
+                aliases.append((f"r{repo_number}", f"c{commit_number}"))
+            repositories.append(
+                f"r{repo_number}: repository(owner: $owner{repo_number}, "
+                f"name: $name{repo_number}) {{ {' '.join(objects)} }}"
+            )
+        declarations = ", ".join(
+            f"${variable}: {'GitObjectID' if variable.startswith('oid') else 'String'}!"
+            for variable in variables
+        )
+        query = f"query({declarations}) {{ {' '.join(repositories)} }}"
+
+        response = self.session.post(
+            self.graphql_url, json={"query": query, "variables": variables}
+        )
+        if response.status_code in (404, 405):
+            logging.info(
+                "No GraphQL API at %s, looking up commits with the REST API",
+                self.graphql_url,
+            )
+            self._graphql_unavailable = True
+            return None
+        response.raise_for_status()
+        body = response.json()
+        # errors of missing repositories or commits come with partial data
+        for error in body.get("errors") or ():
+            logging.debug("GraphQL commit lookup error: %s", error.get("message"))
+        data = body.get("data")
+        if data is None:
+            raise ValueError(f"GraphQL query returned no data: {body.get('errors')}")
+        return [
+            (data.get(repo_alias) or {}).get(commit_alias)
+            for repo_alias, commit_alias in aliases
+        ]
+
+    def get_commit_time(self, metric: CommitMetric):
+        """Method called to collect data and send to Prometheus"""
+        git_server = metric.git_fqdn
+        # check for gitlab or bitbucket
+        if not self._is_github_server(git_server):
             raise UnsupportedGITProvider(
                 "Skipping non GitHub server, found %s" % (git_server)
             )
@@ -52,7 +305,10 @@ class GitHubCommitCollector(AbstractCommitCollector):
             hash=metric.commit_hash,
         )
         url = self.git_api._replace(path=path).url
-        response = self.session.get(url)
+        try:
+            response = self.session.get(url)
+        except RateLimitExceeded as e:
+            raise CommitLookupError(str(e), status_code=e.status_code) from e
         if response.status_code != 200:
             # This will occur when trying to make an API call to non-Github
             logging.warning(
@@ -64,12 +320,14 @@ class GitHubCommitCollector(AbstractCommitCollector):
                     str(response.status_code),
                 )
             )
+            raise CommitLookupError(
+                "Couldn't get commit time, got http code %s" % response.status_code,
+                status_code=response.status_code,
+            )
         else:
             commit = response.json()
             try:
-                metric.commit_time = commit["commit"]["committer"]["date"]
-                metric.commit_timestamp = parse_datetime(metric.commit_time).timestamp()
-                metric.commit_link = commit["html_url"]
+                self._update_metric(metric, commit)
                 logging.debug(f"Set all github commit metrics: {metric}")
             except Exception:
                 logging.error(
@@ -16,24 +16,52 @@
 #
 
 import logging
+import threading
+from typing import Optional
 
 import gitlab
 import requests
 from attrs import define, field
 
 from committime import CommitMetric
+from pelorus.cache import TTLCache
 from pelorus.timeutil import parse_tz_aware
 from pelorus.utils import set_up_requests_session
 
-from .collector_base import AbstractCommitCollector, UnsupportedGITProvider
+from .collector_base import (
+    AbstractCommitCollector,
+    UnsupportedGITProvider,
+    repo_web_url,
+)
 
 _DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
 
+# Seconds a project id is kept, after which its path is looked up again
+# in case the project was moved.
+PROJECT_ID_CACHE_TTL = 24 * 60 * 60
+PROJECT_ID_CACHE_MAX_SIZE = 1_000
+# Number of commits per page when listing recent commits
+COMMITS_PER_PAGE = 100
+
 
 @define(kw_only=True)
 class GitLabCommitCollector(AbstractCommitCollector):
     session: requests.Session = field(factory=requests.Session, init=False)
 
+    # GitLab clients by server, shared by all lookups
+    _clients: dict[str, gitlab.Gitlab] = field(factory=dict, init=False)
+    _clients_lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    # Project ids by server and project path
+    project_ids: TTLCache[int] = field(
+        factory=lambda: TTLCache(
+            name="gitlab_projects",
+            ttl=PROJECT_ID_CACHE_TTL,
+            max_size=PROJECT_ID_CACHE_MAX_SIZE,
+        ),
+        init=False,
+    )
+
     def __attrs_post_init__(self):
         super().__attrs_post_init__()
         set_up_requests_session(
@@ -41,30 +69,134 @@ class GitLabCommitCollector(AbstractCommitCollector):
         )
 
     def _connect_to_gitlab(self, metric) -> gitlab.Gitlab:
-        """Method to connect to Gitlab instance."""
+        """Method to get the client of the GitLab instance, connecting on first use."""
         git_server = metric.git_server
 
-        gitlab_client = None
+        with self._clients_lock:
+            gitlab_client = self._clients.get(git_server)
+            if gitlab_client is not None:
+                return gitlab_client
+
+            if self.token:
+                # Private or personal token
+                logging.debug(
+                    "Connecting to GitLab server using token: %s" % (git_server)
+                )
+                gitlab_client = gitlab.Gitlab(
+                    git_server,
+                    private_token=self.token,
+                    api_version=4,
+                    session=self.session,
+                )
+            else:
+                # Public repo without token
+                logging.debug(
+                    "Connecting to GitLab server without token: %s" % (git_server)
+                )
+                gitlab_client = gitlab.Gitlab(
+                    git_server, api_version=4, session=self.session
+                )
+
+            self._clients[git_server] = gitlab_client
+            return gitlab_client
+
+    @staticmethod
+    def _is_gitlab_server(git_server: str) -> bool:
+        return not (
+            "github" in git_server
+            or "gitea" in git_server
+            or "bitbucket" in git_server
+            or "azure" in git_server
+        )
 
-        if self.token:
-            # Private or personal token
-            logging.debug("Connecting to GitLab server using token: %s" % (git_server))
-            gitlab_client = gitlab.Gitlab(
-                git_server,
-                private_token=self.token,
-                api_version=4,
-                session=self.session,
-            )
-        else:
-            # Public repo without token
-            logging.debug(
-                "Connecting to GitLab server without token: %s" % (git_server)
-            )
-            gitlab_client = gitlab.Gitlab(
-                git_server, api_version=4, session=self.session
+    def _get_project(self, gl: gitlab.Gitlab, metric: CommitMetric):
+        """
+        Get the project of the metric's repo. Its id is cached, so later calls
+        return a lazy project, which makes no request.
+        """
+        # namespaced project allows to get it by it's name
+        project_namespaced = "%s/%s" % (metric.repo_group, metric.repo_project)
+        key = "%s/%s" % (metric.git_server, project_namespaced)
+
+        project_id = self.project_ids.get(key)
+        if project_id is not None:
+            return gl.projects.get(project_id, lazy=True)
+
+        try:
+            logging.debug("Getting project: %s" % (project_namespaced))
+            project = gl.projects.get(project_namespaced)
+        except Exception:
+            logging.error(
+                "Failed to get project: %s, repo: %s for build %s"
+                % (metric.repo_url, metric.repo_project, metric.build_name),
+                exc_info=True,
             )
+            raise
+        self.project_ids.set(key, project.id)
+        return project
+
+    def commit_link(self, metric: CommitMetric) -> Optional[str]:
+        return f"{repo_web_url(metric)}/-/commit/{metric.commit_hash}"
+
+    @staticmethod
+    def _update_metric(metric: CommitMetric, commit) -> CommitMetric:
+        commit_time_str: str = (
+            commit.committed_date
+        )  # assumed based on `__getattr__` in RESTObject
+        metric.commit_time = commit_time_str
+        metric.commit_timestamp = parse_tz_aware(
+            commit_time_str, format=_DATETIME_FORMAT
+        ).timestamp()
+        metric.commit_link = commit.web_url
+        return metric
 
-        return gitlab_client
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        """
+        List the recent commits of the default branch of the repositories with
+        more pending commits than `commit_prefetch_pages`, up to that many pages
+        per repository.
+        """
+        gitlab_metrics = [
+            metric for metric in metrics if self._is_gitlab_server(metric.git_server)
+        ]
+        since = self.prefetch_since.isoformat()
+        resolved = []
+        for repo_url, pending in self._commits_to_prefetch(gitlab_metrics).items():
+            try:
+                resolved += self._list_recent_commits(pending, since)
+            except Exception:
+                logging.warning(
+                    "Failed listing recent commits of %s", repo_url, exc_info=True
+                )
+        return resolved
+
+    def _list_recent_commits(
+        self, pending: list[CommitMetric], since: str
+    ) -> list[CommitMetric]:
+        "Resolve the pending commits of a repository from its recent commits."
+        gl = self._connect_to_gitlab(pending[0])
+        project = self._get_project(gl, pending[0])
+
+        unresolved = {metric.commit_hash: metric for metric in pending}
+        resolved = []
+        for page in range(1, self.commit_prefetch_pages + 1):
+            commits = project.commits.list(
+                since=since, per_page=COMMITS_PER_PAGE, page=page
+            )
+            for commit in commits:
+                for commit_hash in [h for h in unresolved if commit.id.startswith(h)]:
+                    resolved.append(
+                        self._update_metric(unresolved.pop(commit_hash), commit)
+                    )
+            if not unresolved or len(commits) < COMMITS_PER_PAGE:
+                break
+        logging.debug(
+            "Resolved %d of %d commit(s) of %s by listing its recent commits",
+            len(resolved),
+            len(pending),
+            pending[0].repo_url,
+        )
+        return resolved
 
     # base class impl
     def get_commit_time(self, metric: CommitMetric):
@@ -72,12 +204,7 @@ class GitLabCommitCollector(AbstractCommitCollector):
 
         git_server = metric.git_server
 
-        if (
-            "github" in git_server
-            or "gitea" in git_server
-            or "bitbucket" in git_server
-            or "azure" in git_server
-        ):
+        if not self._is_gitlab_server(git_server):
             raise UnsupportedGITProvider(
                 "Skipping non GitLab server, found %s" % (git_server)
             )
@@ -86,37 +213,12 @@ class GitLabCommitCollector(AbstractCommitCollector):
         if not gl:
             return None
 
-        project_namespace = metric.repo_group
-        project_name = metric.repo_project
-
-        # namespaced project allows to get it by it's name
-        project_namespaced = "%s/%s" % (project_namespace, project_name)
-
-        project = None
-
-        try:
-            logging.debug("Getting project: %s" % (project_namespaced))
-            project = gl.projects.get(project_namespaced)
-        except Exception:
-            logging.error(
-                "Failed to get project: %s, repo: %s for build %s"
-                % (metric.repo_url, project_name, metric.build_name),
-                exc_info=True,
-            )
-            raise
+        project = self._get_project(gl, metric)
         try:
             # get the commit from the project using the hash
             short_hash = metric.commit_hash[:8]
             commit = project.commits.get(short_hash)
-
-            commit_time_str: str = (
-                commit.committed_date
-            )  # assumed based on `__getattr__` in RESTObject
-            metric.commit_time = commit_time_str
-            metric.commit_timestamp = parse_tz_aware(
-                commit_time_str, format=_DATETIME_FORMAT
-            ).timestamp()
-            metric.commit_link = commit.web_url
+            self._update_metric(metric, commit)
         except Exception:
             logging.error(
                 "Failed processing commit time for build %s" % metric.build_name,
@@ -18,14 +18,24 @@
 import logging
 from typing import Iterable, Optional
 
-from attrs import define
+from attrs import define, field
 
 from committime import CommitMetric
+from pelorus.config import env_vars
 from pelorus.timeutil import parse_guessing_timezone_DYNAMIC, to_epoch_from_string
-from pelorus.utils import collect_bad_attribute_path_error, get_nested
+from pelorus.utils import (
+    collect_bad_attribute_path_error,
+    get_nested,
+    paginate_resource,
+)
 
 from .collector_base import AbstractCommitCollector
 
+IMAGE_PAGE_SIZE_ENV = "IMAGE_PAGE_SIZE"
+# Number of Images listed per request. Images carry their whole
+# docker metadata, so listing them all at once can take a lot of memory.
+DEFAULT_IMAGE_PAGE_SIZE = 100
+
 
 @define(kw_only=True)
 class ImageCommitCollector(AbstractCommitCollector):
@@ -33,6 +43,19 @@ class ImageCommitCollector(AbstractCommitCollector):
 
     date_annotation_name: str = CommitMetric._ANNOTATION_MAPPIG["commit_time"]
 
+    image_page_size: int = field(
+        default=DEFAULT_IMAGE_PAGE_SIZE,
+        converter=int,
+        metadata=env_vars(IMAGE_PAGE_SIZE_ENV),
+    )
+
+    # The metric of each Image, None if it has none, by Image name, with the
+    # resourceVersion it was made from. Images are immutable, but their
+    # labels and annotations may still be changed.
+    _image_metrics: dict[str, tuple[str, Optional[CommitMetric]]] = field(
+        factory=dict, init=False
+    )
+
     # maps attributes to their location in a `image.openshift.io/v1`.
     # Similar to Build Mapping from committime.__init__.py
     _IMAGE_MAPPING = dict(
@@ -162,41 +185,47 @@ class ImageCommitCollector(AbstractCommitCollector):
             api_version="image.openshift.io/v1", kind="Image"
         )
 
-        images = v1_images.get(label_selector=app_label)
-
-        images_by_app = self._get_openshift_obj_by_app(images)
-
-        if images_by_app:
-            metrics += self._get_metrics_by_apps_from_images(images_by_app)
+        # Images are listed page by page, and only their metrics are kept,
+        # so no more than a page or two of Images are held in memory at once.
+        image_metrics = {}
+        for image in paginate_resource(
+            v1_images, dict(label_selector=app_label), limit=self.image_page_size
+        ):
+            name = image.metadata.name
+            version = image.metadata.resourceVersion
+            cached = self._image_metrics.get(name)
+            if cached is not None and cached[0] == version:
+                metric = cached[1]
+            else:
+                metric = self._get_metric_from_image(image)
+            image_metrics[name] = (version, metric)
+            if metric is not None:
+                metrics.append(metric)
 
+        # forget the Images that are gone
+        self._image_metrics = image_metrics
         return metrics
 
-    def _get_metrics_by_apps_from_images(self, images_by_app):
-        metrics = []
-        for app in images_by_app:
-            images = images_by_app[app]
-            for image in images:
-                metric = None
-                errors = []
-
-                try:
-                    metric = self.commit_metric_from_image(app, image, errors)
-                except Exception:
-                    logging.error(
-                        "Cannot collect metrics from image: %s" % (image.metadata.name)
-                    )
-                    raise
+    def _get_metric_from_image(self, image) -> Optional[CommitMetric]:
+        app = image.metadata.labels[self.app_label]
+        errors = []
 
-                if errors:
-                    msg = (
-                        f"Missing data for CommitTime metric from Image "
-                        f"{metric.image_hash} in app {app}: "
-                        f"{'.'.join(str(e) for e in errors)}"
-                    )
-                    logging.warning(msg)
-                    continue
+        try:
+            metric = self.commit_metric_from_image(app, image, errors)
+        except Exception:
+            logging.error(
+                "Cannot collect metrics from image: %s" % (image.metadata.name)
+            )
+            raise
 
-                logging.debug("Adding metric for app %s" % app)
-                metrics.append(metric)
+        if errors:
+            msg = (
+                f"Missing data for CommitTime metric from Image "
+                f"{metric.image_hash} in app {app}: "
+                f"{'.'.join(str(e) for e in errors)}"
+            )
+            logging.warning(msg)
+            return None
 
-        return metrics
+        logging.debug("Adding metric for app %s" % app)
+        return metric
@@ -1,23 +1,25 @@
 import logging
-import time
-from typing import Iterable
+from typing import Iterable, Optional
 
-from attrs import field, frozen
+import attrs.converters
+from attrs import Factory, field, frozen
 from openshift.dynamic import DynamicClient
-from prometheus_client import start_http_server
-from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from prometheus_client.core import GaugeMetricFamily
 
 import pelorus
 from deploytime import DeployTimeMetric
-from pelorus.config import load_and_log, no_env_vars
+from pelorus.config import env_vars, load_and_log, no_env_vars
 from pelorus.config.converters import comma_separated
+from pelorus.runtime import run_exporter
 from pelorus.timeutil import METRIC_TIMESTAMP_THRESHOLD_MINUTES, is_out_of_date
 from provider_common import format_app_name
 from provider_common.openshift import (
+    WATCH_PODS_ENV,
+    PodInformerCache,
     filter_pods_by_replica_uid,
     get_and_log_namespaces,
     get_images_from_pod,
-    get_owner_object_from_child,
+    get_owner_objects,
     get_running_pods,
 )
 
@@ -27,6 +29,25 @@ class DeployTimeCollector(pelorus.AbstractPelorusExporter):
     client: DynamicClient = field(metadata=no_env_vars())
     namespaces: set[str] = field(factory=set, converter=comma_separated(set))
     prod_label: str = field(default=pelorus.DEFAULT_PROD_LABEL)
+    watch_pods: bool = field(
+        default=False,
+        converter=attrs.converters.to_bool,
+        metadata=env_vars(WATCH_PODS_ENV),
+    )
+
+    _pod_cache: Optional[PodInformerCache] = field(
+        default=Factory(
+            lambda self: PodInformerCache(
+                client=self.client,
+                namespaces=self.namespaces,
+                app_label=self.app_label,
+            )
+            if self.watch_pods
+            else None,
+            takes_self=True,
+        ),
+        init=False,
+    )
 
     def __attrs_post_init__(self):
         if self.namespaces and (self.prod_label != pelorus.DEFAULT_PROD_LABEL):
@@ -87,13 +108,23 @@ class DeployTimeCollector(pelorus.AbstractPelorusExporter):
 
         logging.debug("generate_metrics: start")
 
-        pods = get_running_pods(self.client, namespaces, self.app_label)
+        if self._pod_cache:
+            pods = self._pod_cache.get_running_pods(namespaces)
+        else:
+            pods = get_running_pods(self.client, namespaces, self.app_label)
 
         # Build dictionary with controllers and retrieved pods
         replica_pods_dict = filter_pods_by_replica_uid(pods)
 
+        if self._pod_cache:
+            replicas = self._pod_cache.get_owner_objects(replica_pods_dict)
+        else:
+            replicas = get_owner_objects(self.client, replica_pods_dict)
+
         for uid, pod in replica_pods_dict.items():
-            replicas = get_owner_object_from_child(self.client, uid, pod)
+            if uid not in replicas:
+                logging.debug("Replica %s of pod %s not found", uid, pod.metadata.name)
+                continue
 
             # Since a commit will be built into a particular image and there could be multiple
             # containers (images) per pod, we will push one metric per image/container in the
@@ -104,8 +135,8 @@ class DeployTimeCollector(pelorus.AbstractPelorusExporter):
                 metric = DeployTimeMetric(
                     name=pod.metadata.labels[self.app_label],
                     namespace=pod.metadata.namespace,
-                    labels=pod.metadata.labels,
-                    deploy_time=replicas.get(uid).metadata.creationTimestamp,
+                    labels=dict(pod.metadata.labels),
+                    deploy_time=replicas[uid].metadata.creationTimestamp,
                     image_sha=sha,
                 )
                 yield metric
@@ -117,7 +148,4 @@ if __name__ == "__main__":
 
     collector = load_and_log(DeployTimeCollector, other=dict(client=dyn_client))
 
-    REGISTRY.register(collector)
-    start_http_server(8080)
-    while True:
-        time.sleep(1)
+    run_exporter(collector)
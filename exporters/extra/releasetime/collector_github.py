@@ -14,11 +14,11 @@ from prometheus_client.core import GaugeMetricFamily
 from requests import Session
 
 from pelorus import AbstractPelorusExporter
-from pelorus.certificates import set_up_requests_certs
 from pelorus.config import REDACT, env_vars, load_and_log, log
 from pelorus.config.converters import comma_or_whitespace_separated
-from pelorus.utils import TokenAuth, join_url_path_components
+from pelorus.utils import TokenAuth, join_url_path_components, set_up_requests_session
 from provider_common.github import GitHubError, paginate_github, parse_datetime
+from provider_common.ratelimit import rate_limit_session
 
 
 class Release(NamedTuple):
@@ -105,10 +105,12 @@ class GitHubReleaseCollector(AbstractPelorusExporter):
         if not self.projects:
             raise ValueError("No projects specified for GitHub deploytime collector")
 
-        self._session.verify = set_up_requests_certs()
-
-        if self.token:
-            self._session.auth = TokenAuth(self.token)
+        set_up_requests_session(
+            self._session,
+            None,
+            auth=TokenAuth(self.token) if self.token else None,
+        )
+        rate_limit_session(self._session, self.host, self.token)
 
     def collect(self) -> Iterable[GaugeMetricFamily]:
         metric = GaugeMetricFamily(
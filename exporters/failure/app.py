@@ -15,11 +15,9 @@
 #    under the License.
 #
 
-import time
 
 from attrs import field, frozen
 from attrs.validators import in_
-from prometheus_client import start_http_server
 from prometheus_client.core import REGISTRY
 
 import pelorus
@@ -30,6 +28,7 @@ from failure.collector_jira import JiraFailureCollector
 from failure.collector_pagerduty import PagerdutyFailureCollector
 from failure.collector_servicenow import ServiceNowFailureCollector
 from pelorus.config import env_vars, load_and_log
+from pelorus.runtime import run_exporter
 
 PROVIDER_TYPES = {
     "jira": JiraFailureCollector,
@@ -52,21 +51,17 @@ class FailureCollectorConfig:
         return load_and_log(PROVIDER_TYPES[self.tracker_provider])
 
 
-def set_up(prod: bool = True) -> AbstractFailureCollector:
+def set_up(prod: bool = True, register: bool = True) -> AbstractFailureCollector:
     # TODO refactor: all exporters have same structure
     pelorus.setup_logging(prod=prod)
 
     config = load_and_log(FailureCollectorConfig)
     collector = config.create()
 
-    REGISTRY.register(collector)
+    if register:
+        REGISTRY.register(collector)
     return collector
 
 
 if __name__ == "__main__":
-    set_up()
-    # TODO refactor: create function, all exporters have same structure
-    start_http_server(8080)
-
-    while True:
-        time.sleep(1)
+    run_exporter(set_up(register=False))
@@ -27,13 +27,22 @@ from pelorus.config.converters import comma_or_whitespace_separated
 from pelorus.config.log import REDACT, log
 from pelorus.errors import FailureProviderAuthenticationError
 from pelorus.utils import TokenAuth, set_up_requests_session
-from provider_common.github import parse_datetime
+from provider_common.github import RATELIMIT_REMAINING_HEADER, parse_datetime
+from provider_common.ratelimit import (
+    DEFAULT_BURST,
+    DEFAULT_MAX_PAUSE,
+    DEFAULT_THRESHOLD,
+    GITHUB_RATELIMIT_BURST_ENV,
+    GITHUB_RATELIMIT_MAX_PAUSE_ENV,
+    GITHUB_RATELIMIT_THRESHOLD_ENV,
+    RateLimitExceeded,
+    rate_limit_session,
+)
 
-# One query limit, exporter will query multiple times.
-# Do not exceed 100 results
-# TODO
-# GITHUB_SEARCH_RESULTS = 100
-# TODO Paginate results
+# Most issues GitHub returns in one page.
+GITHUB_ISSUES_PER_PAGE = 100
+# Most pages of issues read from each project, newest first.
+MAX_ISSUE_PAGES = 10
 
 DEFAULT_GITHUB_ISSUE_LABEL = "bug"
 
@@ -68,6 +77,24 @@ class GithubFailureCollector(AbstractFailureCollector):
         default=DEFAULT_GITHUB_ISSUE_LABEL, metadata=env_vars("GITHUB_ISSUE_LABEL")
     )
 
+    ratelimit_burst: int = field(
+        default=DEFAULT_BURST,
+        converter=int,
+        metadata=env_vars(GITHUB_RATELIMIT_BURST_ENV),
+    )
+
+    ratelimit_threshold: int = field(
+        default=DEFAULT_THRESHOLD,
+        converter=int,
+        metadata=env_vars(GITHUB_RATELIMIT_THRESHOLD_ENV),
+    )
+
+    ratelimit_max_pause: float = field(
+        default=DEFAULT_MAX_PAUSE,
+        converter=float,
+        metadata=env_vars(GITHUB_RATELIMIT_MAX_PAUSE_ENV),
+    )
+
     def __attrs_post_init__(self):
         # disable .netrc
         self.session.trust_env = False
@@ -76,6 +103,14 @@ class GithubFailureCollector(AbstractFailureCollector):
             set_up_requests_session(
                 self.session, self.tls_verify, auth=TokenAuth(self.token)
             )
+        rate_limit_session(
+            self.session,
+            self.tracker_api,
+            self.token,
+            burst=self.ratelimit_burst,
+            threshold=self.ratelimit_threshold,
+            max_pause=self.ratelimit_max_pause,
+        )
 
         try:
             self.user = self._get_github_user()
@@ -96,11 +131,19 @@ class GithubFailureCollector(AbstractFailureCollector):
         params: Optional[dict[str, str]],
         url: str,
     ) -> Union[list, dict[str, Any]]:
+        return self._get(headers, params, url).json()
+
+    def _get(
+        self,
+        headers: Optional[dict[str, str]],
+        params: Optional[dict[str, str]],
+        url: str,
+    ) -> requests.Response:
         resp = self.session.get(url, headers=headers, params=params)
         try:
             resp.raise_for_status()
             logging.debug("GitHub successfully returned %s", resp.text)
-            return resp.json()
+            return resp
         except requests.HTTPError as e:
             if resp.status_code == requests.codes.unauthorized:
                 raise FailureProviderAuthenticationError from e
@@ -116,12 +159,41 @@ class GithubFailureCollector(AbstractFailureCollector):
             headers = {
                 "Accept": "application/vnd.github.v3+json",
             }
-            params = {"state": "all"}
+            params = {"state": "all", "per_page": str(GITHUB_ISSUES_PER_PAGE)}
 
-            issues = self._make_request(headers, params, url)
-            all_issues.extend(issues)
+            all_issues.extend(self._get_issue_pages(headers, params, url))
         return all_issues
 
+    def _get_issue_pages(
+        self, headers: dict[str, str], params: dict[str, str], url: str
+    ) -> list[dict]:
+        """
+        Read up to MAX_ISSUE_PAGES pages of issues, which GitHub returns newest
+        first. When the rate limit is exceeded after the first page, the newest
+        issues already read are kept, and older ones are left out.
+        """
+        issues: list[dict] = []
+        next_url: Optional[str] = url
+        for page in range(MAX_ISSUE_PAGES):
+            if next_url is None:
+                break
+            try:
+                resp = self._get(headers, params if page == 0 else None, next_url)
+            except (RateLimitExceeded, requests.HTTPError) as e:
+                if not issues or not _is_rate_limited(e):
+                    raise
+                logging.warning(
+                    "Rate limit exceeded after %d pages of issues from %s: %s",
+                    page,
+                    url,
+                    e,
+                )
+                break
+            issues.extend(resp.json())
+            # the next page's URL already carries the query parameters
+            next_url = resp.links.get("next", {}).get("url")
+        return issues
+
     def search_issues(self) -> list[TrackerIssue]:
         critical_issues = []
         all_issues = self.get_issues()
@@ -175,3 +247,13 @@ class GithubFailureCollector(AbstractFailureCollector):
         # default to repo name if app_label is not set
         else:
             return issue["repository_url"].split("/")[-1:][0]
+
+
+def _is_rate_limited(error: requests.RequestException) -> bool:
+    "If the request failed because the GitHub rate limit was exceeded."
+    if isinstance(error, RateLimitExceeded):
+        return True
+    response = error.response
+    if response is None or response.status_code not in (403, 429):
+        return False
+    return response.headers.get(RATELIMIT_REMAINING_HEADER) == "0"
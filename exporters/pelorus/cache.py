@@ -0,0 +1,420 @@
+"""
+Caches with expiry and a size bound, reporting their own usage.
+
+Entries expire a fixed time after they were stored. Since that time is the same
+for every entry, entries expire in the order they were stored, so expired entries
+are found by looking only at the oldest ones instead of scanning the whole cache.
+When the cache is full, in number of entries or in total weight of its values,
+the least recently used entries are evicted.
+
+Caches live in memory, and may also be written through to a `CacheBackend`
+that persists them, such as `SQLiteBackend`. Persisted entries are loaded
+back when the backend is set, so the caches start warm after a restart.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+from attrs import define, field
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.metrics_core import Metric
+from prometheus_client.registry import Collector
+
+V = TypeVar("V")
+
+CACHE_DIR_ENV = "CACHE_DIR"
+CACHE_FILE_NAME = "pelorus-cache.sqlite3"
+
+
+class CacheBackend(ABC):
+    """
+    Storage for the entries of caches, identified by the cache name.
+    Values are JSON-serializable.
+    """
+
+    # if values need to be converted to be stored
+    persistent = True
+
+    @abstractmethod
+    def load(self, cache: str) -> Iterable[tuple[str, Any, float]]:
+        "The stored keys, values and storage times of the cache."
+
+    @abstractmethod
+    def store(self, cache: str, key: str, value: Any, stored_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, cache: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, cache: str) -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Keeps nothing outside of the caches themselves: entries are lost on restart.
+    """
+
+    persistent = False
+
+    def load(self, cache: str) -> Iterable[tuple[str, Any, float]]:
+        return ()
+
+    def store(self, cache: str, key: str, value: Any, stored_at: float) -> None:
+        pass
+
+    def delete(self, cache: str, key: str) -> None:
+        pass
+
+    def clear(self, cache: str) -> None:
+        pass
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Persists the caches to a SQLite database file, such as one on a persistent volume.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " cache TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " PRIMARY KEY (cache, key))"
+            )
+
+    def load(self, cache: str) -> Iterable[tuple[str, Any, float]]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, value, stored_at FROM cache_entries"
+                " WHERE cache = ? ORDER BY stored_at",
+                (cache,),
+            ).fetchall()
+        return [(key, json.loads(value), stored_at) for key, value, stored_at in rows]
+
+    def store(self, cache: str, key: str, value: Any, stored_at: float) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+                (cache, key, json.dumps(value), stored_at),
+            )
+
+    def delete(self, cache: str, key: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM cache_entries WHERE cache = ? AND key = ?", (cache, key)
+            )
+
+    def clear(self, cache: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM cache_entries WHERE cache = ?", (cache,)
+            )
+
+
+# All the caches, reported by CacheCollector
+_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+# The backend of caches created from now on
+_default_backend: CacheBackend = MemoryBackend()
+
+
+def _identity(value):
+    return value
+
+
+def _weigh_one(value) -> float:
+    return 1
+
+
+@define(kw_only=True, eq=False)
+class TTLCache(Generic[V]):
+    """
+    A thread-safe cache whose entries expire `ttl` seconds after being stored,
+    holding at most `max_size` entries, whose values `weigh` at most `max_weight`
+    in total, such as a number of bytes.
+
+    Any limit may be None, to keep entries forever or to not bound the size.
+
+    `dump` and `load` convert values to and from JSON-serializable data,
+    to store them in the backend.
+    """
+
+    # reported as the cache label of the cache metrics, and used to store it
+    name: str
+    ttl: Optional[float] = None
+    max_size: Optional[int] = None
+    max_weight: Optional[float] = None
+    weigh: Callable[[V], float] = field(default=_weigh_one, repr=False)
+    dump: Callable[[V], Any] = field(default=_identity, repr=False)
+    load: Callable[[Any], V] = field(default=_identity, repr=False)
+    timer: Callable[[], float] = field(default=time.time, repr=False)
+
+    _backend: CacheBackend = field(factory=lambda: _default_backend, init=False)
+    # values and their storage time, from the least to the most recently used
+    _entries: OrderedDict[str, tuple[V, float]] = field(factory=OrderedDict, init=False)
+    # storage times, keys and entries, from the oldest to the newest
+    _expiry_queue: deque[tuple[float, str, tuple[V, float]]] = field(
+        factory=deque, init=False
+    )
+    _lock: threading.RLock = field(factory=threading.RLock, init=False)
+    # total weight of the values
+    _weight: float = field(default=0, init=False)
+
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    expirations: int = field(default=0, init=False)
+
+    def __attrs_post_init__(self):
+        _caches.add(self)
+        self._warm()
+
+    def get(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        "Get the value for the key, marking it as recently used."
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._expire()
+            return key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._expire()
+            return iter(list(self._entries))
+
+    def set(self, key: str, value: V) -> None:
+        """
+        Store the value, replacing any previous one and restarting its expiry.
+        A value weighing more than `max_weight` is not stored, and only the
+        previous value of the key is removed, instead of evicting the others.
+        """
+        if self._too_heavy(value):
+            logging.debug("Not caching %s in cache %s: too large", key, self.name)
+            self.pop(key)
+            return
+        with self._lock:
+            self._expire()
+            stored_at = self.timer()
+            self._insert(key, value, stored_at)
+            if self._backend.persistent:
+                self._backend.store(self.name, key, self.dump(value), stored_at)
+
+    def pop(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._weight -= self.weigh(entry[0])
+            self._backend.delete(self.name, key)
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry_queue.clear()
+            self._weight = 0
+            self._backend.clear(self.name)
+
+    def entries(self) -> list[tuple[str, V, float]]:
+        "The keys, values and storage times of all the entries."
+        with self._lock:
+            self._expire()
+            return [
+                (key, value, stored_at)
+                for key, (value, stored_at) in self._entries.items()
+            ]
+
+    @property
+    def weight(self) -> float:
+        "The total weight of the values."
+        with self._lock:
+            self._expire()
+            return self._weight
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+    def use_backend(self, backend: CacheBackend) -> None:
+        """
+        Write the entries through to the given backend,
+        and load the entries it already has.
+        """
+        with self._lock:
+            for key, (value, stored_at) in self._entries.items():
+                if not backend.persistent:
+                    break
+                backend.store(self.name, key, self.dump(value), stored_at)
+            self._backend = backend
+            self._warm()
+
+    def _warm(self) -> None:
+        "Load the entries of the backend that are not expired."
+        with self._lock:
+            loaded = 0
+            now = self.timer()
+            for key, data, stored_at in self._backend.load(self.name):
+                if key in self._entries:
+                    continue
+                if self.ttl is not None and now - stored_at >= self.ttl:
+                    self._backend.delete(self.name, key)
+                    continue
+                try:
+                    value = self.load(data)
+                except Exception:
+                    logging.warning(
+                        "Dropping unreadable entry %s of cache %s", key, self.name
+                    )
+                    self._backend.delete(self.name, key)
+                    continue
+                if self._too_heavy(value):
+                    self._backend.delete(self.name, key)
+                    continue
+                self._insert(key, value, stored_at)
+                loaded += 1
+            if loaded:
+                logging.info("Loaded %d entries into cache %s", loaded, self.name)
+
+    def _too_heavy(self, value: V) -> bool:
+        return self.max_weight is not None and self.weigh(value) > self.max_weight
+
+    def _insert(self, key: str, value: V, stored_at: float) -> None:
+        entry = (value, stored_at)
+        replaced = self._entries.get(key)
+        if replaced is not None:
+            self._weight -= self.weigh(replaced[0])
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._weight += self.weigh(value)
+        if self.ttl is not None:
+            self._expiry_queue.append((stored_at, key, entry))
+        while (self.max_size is not None and len(self._entries) > self.max_size) or (
+            self.max_weight is not None and self._weight > self.max_weight
+        ):
+            evicted, (evicted_value, _) = self._entries.popitem(last=False)
+            self._weight -= self.weigh(evicted_value)
+            self._backend.delete(self.name, evicted)
+            self.evictions += 1
+
+    def _expire(self) -> None:
+        if self.ttl is None:
+            return
+        deadline = self.timer() - self.ttl
+        queue = self._expiry_queue
+        while queue and queue[0][0] <= deadline:
+            _, key, entry = queue.popleft()
+            # skip entries that were evicted, removed or stored again since
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self._weight -= self.weigh(entry[0])
+                self._backend.delete(self.name, key)
+                self.expirations += 1
+        # keep the queue from growing past the number of live entries
+        # when the same keys are stored again and again
+        if len(queue) > 2 * len(self._entries) + 1024:
+            self._expiry_queue = deque(
+                queued for queued in queue if self._entries.get(queued[1]) is queued[2]
+            )
+
+
+def use_backend(backend: CacheBackend) -> None:
+    """
+    Make all the caches use the given backend, including the ones created later,
+    loading the entries it already has.
+    """
+    global _default_backend
+    _default_backend = backend
+    for cache in list(_caches):
+        cache.use_backend(backend)
+
+
+def use_cache_dir(cache_dir: Optional[str]) -> None:
+    """
+    Persist all the caches in a SQLite database in the given directory, if any.
+    """
+    if not cache_dir:
+        logging.debug("No %s given, caches are kept in memory only", CACHE_DIR_ENV)
+        return
+    path = Path(cache_dir) / CACHE_FILE_NAME
+    logging.info("Persisting caches to %s", path)
+    use_backend(SQLiteBackend(path))
+
+
+class CacheCollector(Collector):
+    """
+    Reports the size, hits, misses, evictions and expirations of all the caches.
+    """
+
+    def collect(self) -> Iterable[Metric]:
+        labels = ["cache"]
+        size = GaugeMetricFamily(
+            "pelorus_cache_entries", "Number of entries in the cache", labels=labels
+        )
+        hits = CounterMetricFamily(
+            "pelorus_cache_hits",
+            "Number of cache lookups that found a value",
+            labels=labels,
+        )
+        misses = CounterMetricFamily(
+            "pelorus_cache_misses",
+            "Number of cache lookups that found nothing",
+            labels=labels,
+        )
+        evictions = CounterMetricFamily(
+            "pelorus_cache_evictions",
+            "Number of entries removed because the cache was full",
+            labels=labels,
+        )
+        expirations = CounterMetricFamily(
+            "pelorus_cache_expirations",
+            "Number of entries removed because they were too old",
+            labels=labels,
+        )
+        for cache in sorted(_caches, key=lambda c: c.name):
+            size.add_metric([cache.name], len(cache))
+            hits.add_metric([cache.name], cache.hits)
+            misses.add_metric([cache.name], cache.misses)
+            evictions.add_metric([cache.name], cache.evictions)
+            expirations.add_metric([cache.name], cache.expirations)
+        yield from (size, hits, misses, evictions, expirations)
+
+
+__all__ = [
+    "TTLCache",
+    "CacheBackend",
+    "MemoryBackend",
+    "SQLiteBackend",
+    "CacheCollector",
+    "use_backend",
+    "use_cache_dir",
+]
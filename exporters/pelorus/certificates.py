@@ -16,7 +16,7 @@ import os
 import shutil
 import tempfile
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
 
 import certifi
 
@@ -25,11 +25,13 @@ DEFAULT_CERT_DIR = Path("/etc/pelorus/custom_certs")
 
 # TODO: validate and/or automate making sure the file is PEM versus DER?
 # TODO: what if the certs are missing trailing newlines? Will they still work?
-def _combine_certificates(dir_to_check: Path = DEFAULT_CERT_DIR) -> str:
+def _combine_certificates(
+    dir_to_check: Path = DEFAULT_CERT_DIR, extra_certs: Iterable[Path] = ()
+) -> str:
     """
     Combines the certificates with the certificates from `certifi`.
     All certificates ending in `.pem` under each directory under `dir_to_check`
-    is combined (e.g. `dir_to_check/*/*.pem`).
+    is combined (e.g. `dir_to_check/*/*.pem`), as well as the `extra_certs` files.
     Returns the path of the combined file.
     """
     target_fd, target_path = tempfile.mkstemp(suffix=".pem", prefix="custom-certs")
@@ -38,7 +40,7 @@ def _combine_certificates(dir_to_check: Path = DEFAULT_CERT_DIR) -> str:
         with open(certifi.where(), "rb") as source:
             shutil.copyfileobj(source, target)
 
-        for source_path in dir_to_check.glob("*/*.pem"):
+        for source_path in [*dir_to_check.glob("*/*.pem"), *extra_certs]:
             logging.info("Combining custom certificate file %s", source_path)
 
             with source_path.open("rb") as source:
@@ -56,7 +58,9 @@ def _register_cleanup(path: str):
     atexit.register(os.remove, path)
 
 
-def set_up_requests_certs(verify: Optional[bool] = None) -> Union[bool, str]:
+def set_up_requests_certs(
+    verify: Optional[bool] = None, extra_certs: Iterable[Path] = ()
+) -> Union[bool, str]:
     """
     Set up custom certificates based on the way requests is configured.
 
@@ -75,6 +79,7 @@ def set_up_requests_certs(verify: Optional[bool] = None) -> Union[bool, str]:
 
     It will combine them into a temporary file, the path of which is returned.
     It will also register that file for removal at program exit.
+    Other certificate files to trust can be given as `extra_certs`.
 
     If `verify` is `False`, `False` is returned for ease of use with the above example.
     """
@@ -86,7 +91,7 @@ def set_up_requests_certs(verify: Optional[bool] = None) -> Union[bool, str]:
         )
         return False
 
-    file = _combine_certificates()
+    file = _combine_certificates(extra_certs=extra_certs)
     _register_cleanup(file)
 
     return file
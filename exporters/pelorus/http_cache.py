@@ -0,0 +1,223 @@
+"""
+Conditional requests for HTTP APIs, replaying unchanged responses from a cache.
+
+Most of what the exporters request from git providers and issue trackers does
+not change between collections. Responses with an ETag or Last-Modified header
+are cached, and requested again with If-None-Match or If-Modified-Since.
+When the server answers 304 Not Modified, the cached response is returned
+instead, without downloading it again. GitHub does not count those 304
+responses against its rate limit.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import threading
+from typing import Iterable
+
+import requests
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.metrics_core import Metric
+from prometheus_client.registry import Collector
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from pelorus.cache import TTLCache
+
+HTTP_CACHE_MAX_BYTES_ENV = "HTTP_CACHE_MAX_BYTES"
+HTTP_CACHE_MAX_BODY_SIZE_ENV = "HTTP_CACHE_MAX_BODY_SIZE"
+# Maximum number of cached responses, the least recently used being evicted.
+HTTP_CACHE_MAX_SIZE = 1_000
+# Maximum total size of the cached response bodies, in bytes, as held base64
+# encoded, the least recently used being evicted.
+DEFAULT_HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Larger responses, once encoded, are not cached,
+# so one page does not evict many others.
+DEFAULT_HTTP_CACHE_MAX_BODY_SIZE = 1024 * 1024
+
+# Response headers that are not cached: they are about the response itself,
+# or come up to date with the 304 response.
+_UNCACHED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def _body_size(cached: dict) -> int:
+    "The size of the response body, as it is held by the cache."
+    return len(cached["body"])
+
+
+_responses: TTLCache[dict] = TTLCache(
+    name="http_responses",
+    max_size=HTTP_CACHE_MAX_SIZE,
+    max_weight=DEFAULT_HTTP_CACHE_MAX_BYTES,
+    weigh=_body_size,
+)
+_max_body_size = DEFAULT_HTTP_CACHE_MAX_BODY_SIZE
+
+_stats_lock = threading.Lock()
+# GET requests answered from the cache
+_hits = 0
+# GET requests answered by downloading the response
+_misses = 0
+
+
+def _cache_key(request: requests.PreparedRequest) -> str:
+    """
+    Responses are cached by URL and credentials,
+    since different credentials may be allowed to see different content.
+    """
+    authorization = request.headers.get("Authorization", "")
+    credentials = hashlib.sha256(authorization.encode()).hexdigest()[:16]
+    return f"{credentials} {request.url}"
+
+
+def _count(hit: bool) -> None:
+    global _hits, _misses
+    with _stats_lock:
+        if hit:
+            _hits += 1
+        else:
+            _misses += 1
+
+
+class ConditionalCacheAdapter(HTTPAdapter):
+    """
+    A transport adapter that caches GET responses with an ETag or Last-Modified
+    header, and replays them when the server answers 304 Not Modified.
+    """
+
+    def send(
+        self, request: requests.PreparedRequest, stream=False, **kwargs
+    ) -> requests.Response:
+        if request.method != "GET" or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = _cache_key(request)
+        cached = _responses.get(key)
+        if cached is not None:
+            if cached.get("etag"):
+                request.headers.setdefault("If-None-Match", cached["etag"])
+            if cached.get("last_modified"):
+                request.headers.setdefault("If-Modified-Since", cached["last_modified"])
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if cached is not None and response.status_code == 304:
+            _count(hit=True)
+            logging.debug("Replaying cached response for %s", request.url)
+            return _replay(cached, response)
+
+        _count(hit=False)
+        if response.status_code == 200:
+            _store(key, response)
+        return response
+
+
+def _store(key: str, response: requests.Response) -> None:
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not (etag or last_modified):
+        return
+    # measured as held by the cache, as its total size is
+    body = base64.b64encode(response.content).decode("ascii")
+    if len(body) > _max_body_size:
+        return
+    _responses.set(
+        key,
+        {
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in _UNCACHED_HEADERS
+            },
+            "encoding": response.encoding,
+            "body": body,
+        },
+    )
+
+
+def _replay(cached: dict, not_modified: requests.Response) -> requests.Response:
+    """
+    The cached response, with the headers of the 304 response,
+    such as the current rate limits.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = not_modified.url
+    response.request = not_modified.request
+    response.encoding = cached["encoding"]
+    response.headers = CaseInsensitiveDict(cached["headers"])
+    response.headers.update(
+        (name, value)
+        for name, value in not_modified.headers.items()
+        if name.lower() not in _UNCACHED_HEADERS
+    )
+    response._content = base64.b64decode(cached["body"])
+    # read the empty body, releasing the connection
+    not_modified.content
+    return response
+
+
+def configure(
+    max_bytes: int = DEFAULT_HTTP_CACHE_MAX_BYTES,
+    max_body_size: int = DEFAULT_HTTP_CACHE_MAX_BODY_SIZE,
+) -> None:
+    """
+    Bound the total size of the cached responses, and the size of each one.
+    Responses are only cached if they are smaller than both.
+    """
+    global _max_body_size
+    _responses.max_weight = max_bytes
+    _max_body_size = min(max_body_size, max_bytes)
+
+
+def mount_conditional_cache(session: requests.Session) -> None:
+    "Make the session cache responses and send conditional requests."
+    adapter = ConditionalCacheAdapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def cache_stats() -> tuple[int, int]:
+    "The numbers of GET requests answered from the cache, and by the server."
+    with _stats_lock:
+        return _hits, _misses
+
+
+class HTTPCacheCollector(Collector):
+    """
+    Reports how many GET requests were answered from the cache.
+    """
+
+    def collect(self) -> Iterable[Metric]:
+        hits, misses = cache_stats()
+        yield CounterMetricFamily(
+            "pelorus_http_cache_hits",
+            "Number of HTTP GET requests answered from the cache, with a 304 response",
+            value=hits,
+        )
+        yield CounterMetricFamily(
+            "pelorus_http_cache_misses",
+            "Number of HTTP GET requests answered with a new response",
+            value=misses,
+        )
+
+
+def clear() -> None:
+    "Forget all cached responses and statistics."
+    global _hits, _misses
+    _responses.clear()
+    with _stats_lock:
+        _hits = _misses = 0
+
+
+__all__ = [
+    "ConditionalCacheAdapter",
+    "HTTPCacheCollector",
+    "configure",
+    "mount_conditional_cache",
+    "cache_stats",
+]
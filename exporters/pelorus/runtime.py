@@ -0,0 +1,238 @@
+"""
+Runtime shared by the pull exporters.
+
+Collecting metrics means talking to the cluster and to external providers,
+which may take much longer than Prometheus is willing to wait for a scrape.
+`BackgroundCollector` runs the exporter's collection on an interval in a background
+thread, and serves the last complete snapshot of its metrics instantly.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+from attrs import define, field, frozen
+from prometheus_client import start_http_server
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.metrics_core import Metric
+from prometheus_client.registry import Collector, CollectorRegistry
+
+from pelorus import http_cache
+from pelorus.cache import CACHE_DIR_ENV, CacheCollector, use_cache_dir
+from pelorus.config import env_vars, load_and_log
+from pelorus.http_cache import (
+    DEFAULT_HTTP_CACHE_MAX_BODY_SIZE,
+    DEFAULT_HTTP_CACHE_MAX_BYTES,
+    HTTP_CACHE_MAX_BODY_SIZE_ENV,
+    HTTP_CACHE_MAX_BYTES_ENV,
+    HTTPCacheCollector,
+)
+from pelorus.utils.pagination import ListPageCollector
+
+COLLECTION_INTERVAL_ENV = "COLLECTION_INTERVAL"
+# Seconds between the end of a collection and the start of the next one.
+# 0 disables background collection: metrics are collected during each scrape.
+DEFAULT_COLLECTION_INTERVAL = 60.0
+DEFAULT_PORT = 8080
+
+# Set by run_exporter when scrapes are served from background collections,
+# so that slow requests do not hold up scrapes.
+_collecting_in_background = False
+
+
+@frozen
+class Snapshot:
+    """
+    The metrics produced by one complete collection.
+    """
+
+    metrics: tuple[Metric, ...]
+    # unix time at which the collection finished
+    timestamp: float
+    # how long the collection took, in seconds
+    duration: float
+
+
+@define(kw_only=True, eq=False)
+class BackgroundCollector(Collector):
+    """
+    Wraps a collector, running its collection every `interval` seconds in a background thread.
+
+    `collect` returns the latest snapshot without doing any work, along with metrics
+    reporting how old that snapshot is. If a collection fails, the previous snapshot is kept.
+    At most one collection runs at any time: overlapping refreshes are skipped.
+    """
+
+    collector: Collector
+    interval: float = field(default=DEFAULT_COLLECTION_INTERVAL)
+
+    _snapshot: Optional[Snapshot] = field(default=None, init=False)
+    _refresh_lock: threading.Lock = field(factory=threading.Lock, init=False)
+    _stopped: threading.Event = field(factory=threading.Event, init=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False)
+    _failed_refreshes: int = field(default=0, init=False)
+    _skipped_refreshes: int = field(default=0, init=False)
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """
+        Run the wrapped collector once and publish its metrics as the new snapshot.
+
+        Returns False if the collection failed, or was skipped because
+        another one was still running.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logging.warning("Previous collection is still running, skipping refresh")
+            self._skipped_refreshes += 1
+            return False
+
+        try:
+            start = time.monotonic()
+            try:
+                metrics = tuple(self.collector.collect())
+            except Exception:
+                logging.error(
+                    "Collection failed, serving the previous metrics", exc_info=True
+                )
+                self._failed_refreshes += 1
+                return False
+
+            duration = time.monotonic() - start
+            self._snapshot = Snapshot(metrics, time.time(), duration)
+            logging.debug("Collection finished in %.2fs", duration)
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def start(self) -> None:
+        "Start collecting in a daemon thread."
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pelorus-collection", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        "Stop collecting, waiting up to `timeout` seconds for a running collection."
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.refresh()
+            self._stopped.wait(self.interval)
+
+    def collect(self) -> Iterable[Metric]:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            yield from snapshot.metrics
+
+        age = GaugeMetricFamily(
+            "pelorus_collection_age_seconds",
+            "Seconds since the served metrics were collected",
+        )
+        duration = GaugeMetricFamily(
+            "pelorus_collection_duration_seconds",
+            "Seconds the last successful collection took",
+        )
+        if snapshot is not None:
+            age.add_metric([], time.time() - snapshot.timestamp)
+            duration.add_metric([], snapshot.duration)
+        yield age
+        yield duration
+
+        failed = CounterMetricFamily(
+            "pelorus_collection_failures", "Number of failed collections"
+        )
+        failed.add_metric([], self._failed_refreshes)
+        yield failed
+
+        skipped = CounterMetricFamily(
+            "pelorus_collection_skipped",
+            "Number of collections skipped because the previous one was still running",
+        )
+        skipped.add_metric([], self._skipped_refreshes)
+        yield skipped
+
+
+@define(kw_only=True)
+class RuntimeConfig:
+    collection_interval: float = field(
+        default=DEFAULT_COLLECTION_INTERVAL,
+        converter=float,
+        metadata=env_vars(COLLECTION_INTERVAL_ENV),
+    )
+    cache_dir: Optional[str] = field(default=None, metadata=env_vars(CACHE_DIR_ENV))
+    http_cache_max_bytes: int = field(
+        default=DEFAULT_HTTP_CACHE_MAX_BYTES,
+        converter=int,
+        metadata=env_vars(HTTP_CACHE_MAX_BYTES_ENV),
+    )
+    http_cache_max_body_size: int = field(
+        default=DEFAULT_HTTP_CACHE_MAX_BODY_SIZE,
+        converter=int,
+        metadata=env_vars(HTTP_CACHE_MAX_BODY_SIZE_ENV),
+    )
+
+
+def collects_in_background() -> bool:
+    "If metrics are collected in the background, rather than during each scrape."
+    return _collecting_in_background
+
+
+def run_exporter(
+    collector: Collector,
+    port: int = DEFAULT_PORT,
+    registry: CollectorRegistry = REGISTRY,
+) -> None:
+    """
+    Register the collector and serve its metrics over HTTP, forever.
+
+    Unless COLLECTION_INTERVAL is set to 0, the collector runs in the background
+    and scrapes are served from its latest snapshot.
+    The caches are persisted to CACHE_DIR if it is set, the HTTP response
+    cache being bounded by HTTP_CACHE_MAX_BYTES, and their usage
+    is reported along with the collector's metrics, as are the pages of
+    Kubernetes lists fetched.
+    """
+    global _collecting_in_background
+
+    config = load_and_log(RuntimeConfig)
+    http_cache.configure(config.http_cache_max_bytes, config.http_cache_max_body_size)
+    use_cache_dir(config.cache_dir)
+
+    if config.collection_interval > 0:
+        _collecting_in_background = True
+        background = BackgroundCollector(
+            collector=collector, interval=config.collection_interval
+        )
+        registry.register(background)
+        background.start()
+    else:
+        registry.register(collector)
+    registry.register(CacheCollector())
+    registry.register(HTTPCacheCollector())
+    registry.register(ListPageCollector())
+
+    start_http_server(port, registry=registry)
+
+    while True:
+        time.sleep(1)
+
+
+__all__ = [
+    "BackgroundCollector",
+    "Snapshot",
+    "RuntimeConfig",
+    "collects_in_background",
+    "run_exporter",
+]
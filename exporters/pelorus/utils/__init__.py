@@ -23,16 +23,16 @@ in kubernetes that are not so idiomatic to deal with.
 """
 import logging
 import os
-from typing import ClassVar, Generator, Optional, cast, overload
+from typing import ClassVar, Optional, overload
 
 import requests
 import requests.auth
 import urllib3
 from kubernetes import client, config
-from kubernetes.dynamic import Resource, ResourceInstance
 from openshift.dynamic import DynamicClient
 
 from pelorus.certificates import set_up_requests_certs
+from pelorus.http_cache import mount_conditional_cache
 from pelorus.utils.nested import (
     BadAttributePathError,
     collect_bad_attribute_path_error,
@@ -40,6 +40,7 @@ from pelorus.utils.nested import (
     get_nested,
     split_path,
 )
+from pelorus.utils.pagination import paginate_resource
 
 DEFAULT_VAR_KEYWORD = "default"
 
@@ -172,8 +173,12 @@ def set_up_requests_session(
 def set_up_requests_session(
     session: requests.Session, verify: Optional[bool], **kwargs
 ):
-    "Configures a requests session for proper TLS handling and auth."
+    """
+    Configures a requests session for proper TLS handling and auth,
+    and to cache responses with conditional requests.
+    """
     session.verify = set_up_requests_certs(verify)
+    mount_conditional_cache(session)
     if "auth" in kwargs:
         auth: Optional[requests.auth.AuthBase] = kwargs["auth"]
         session.auth = auth
@@ -188,28 +193,6 @@ def join_url_path_components(*components: str) -> str:
     return "/".join(c.strip("/") for c in components)
 
 
-def paginate_resource(
-    resource: Resource,
-    query: dict[str, str],
-    # completely arbitrary. Could experiment.
-    limit: int = 50,
-) -> Generator[ResourceInstance, None, None]:
-    """
-    Paginate requests for openshift resources.
-    """
-    client = cast(DynamicClient, resource.client)
-
-    list_ = client.get(resource, **query, limit=limit)
-
-    yield from list_.items
-
-    continue_token = list_.metadata.get("continue")
-
-    while continue_token:
-        list_ = client.get(resource, **query, limit=limit, _continue=continue_token)
-        yield from list_.items
-
-
 class Url(urllib3.util.Url):
     """
     A URL.
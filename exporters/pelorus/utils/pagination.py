@@ -0,0 +1,225 @@
+"""
+Listing Kubernetes resources page by page.
+
+Large lists, such as all the Pods or Builds of a cluster, are requested
+`limit` items at a time with the continue token of the previous page, so only
+the page being processed and the next one are held in memory. The next page
+is fetched in the background while the items of the current one are processed.
+
+Continue tokens expire after a few minutes. When one does, the listing goes on
+from the token the API server gives back for that, or starts over if there is
+none, skipping the items already listed.
+
+Lists of which only the metadata of the items is read can ask for it alone,
+as PartialObjectMetadataList, which is far smaller than the full items.
+API servers that cannot send it send the full items instead.
+
+Large lists can also be decoded as plain dicts, see `pelorus.utils.raw`.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Generator, Iterable, Mapping, Optional, Union
+
+from kubernetes.dynamic import Resource, ResourceField, ResourceInstance
+from kubernetes.dynamic.exceptions import DynamicApiError, GoneError
+from prometheus_client.core import SummaryMetricFamily
+from prometheus_client.metrics_core import Metric
+from prometheus_client.registry import Collector
+
+from pelorus.utils.raw import RawField, get_raw_page
+
+# Number of items per page, as kubectl does.
+DEFAULT_PAGE_SIZE = 500
+
+# Asks for the metadata of the items only, or the full items if the API server
+# cannot send that.
+METADATA_ONLY_ACCEPT = (
+    "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,"
+    "application/json"
+)
+_NOT_ACCEPTABLE = 406
+# (apiVersion, kind) of the resources that refused metadata-only lists
+_metadata_unsupported: set[tuple[Any, Any]] = set()
+
+# Next pages are fetched by these threads, shared by all listings.
+_prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="list-prefetch")
+
+_stats_lock = threading.Lock()
+# Number of pages fetched, and the seconds it took, by resource kind
+_page_stats: dict[str, tuple[int, float]] = {}
+
+
+def _fetch_page(
+    resource: Resource,
+    query: Mapping[str, Any],
+    limit: int,
+    token: Optional[str],
+    metadata_only: bool = False,
+    raw: bool = False,
+) -> Union[ResourceInstance, dict[str, Any]]:
+    started_at = time.monotonic()
+    get = partial(get_raw_page, resource) if raw else resource.get
+    try:
+        if metadata_only:
+            page = _fetch_metadata_page(resource, get, query, limit, token)
+            if page is not None:
+                return page
+        return get(**query, limit=limit, _continue=token)
+    finally:
+        elapsed = time.monotonic() - started_at
+        kind = getattr(resource, "kind", None)
+        kind = kind if isinstance(kind, str) else "unknown"
+        with _stats_lock:
+            pages, seconds = _page_stats.get(kind, (0, 0.0))
+            _page_stats[kind] = (pages + 1, seconds + elapsed)
+
+
+def _fetch_metadata_page(
+    resource: Resource,
+    get: Callable[..., Any],
+    query: Mapping[str, Any],
+    limit: int,
+    token: Optional[str],
+) -> Any:
+    "The page with the metadata of the items only, or None if it cannot be had."
+    key = (getattr(resource, "group_version", None), getattr(resource, "kind", None))
+    if key in _metadata_unsupported:
+        return None
+    try:
+        return get(
+            **query,
+            limit=limit,
+            _continue=token,
+            header_params={"Accept": METADATA_ONLY_ACCEPT},
+        )
+    except DynamicApiError as e:
+        if e.status != _NOT_ACCEPTABLE:
+            raise
+        logging.info(
+            "%s lists cannot be limited to metadata, listing full objects",
+            getattr(resource, "kind", "resource"),
+        )
+        _metadata_unsupported.add(key)
+        return None
+
+
+def _continue_token(page: Union[ResourceInstance, dict[str, Any]]) -> Optional[str]:
+    if isinstance(page, dict):
+        metadata = page.get("metadata")
+    else:
+        metadata = getattr(page, "metadata", None)
+    token = metadata.get("continue") if metadata else None
+    return token if isinstance(token, str) and token else None
+
+
+def _inconsistent_continue_token(error: GoneError) -> Optional[str]:
+    "The token to go on listing with, that the server gave with the error."
+    try:
+        status = json.loads(error.body)
+    except (TypeError, ValueError):
+        return None
+    return ((status or {}).get("metadata") or {}).get("continue") or None
+
+
+def paginate_resource(
+    resource: Resource,
+    query: Optional[Mapping[str, Any]] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    metadata_only: bool = False,
+    raw: bool = False,
+) -> Generator[ResourceField, None, None]:
+    """
+    Yield the items of the resource matching the query, such as
+    `dict(namespace=..., label_selector=...)`, a page of `limit` at a time.
+
+    If `metadata_only`, the items may only have their `metadata` (and `kind`
+    and `apiVersion`), so they must not be read further.
+    If `raw`, the pages are decoded as plain dicts, and the items are
+    `RawField`s wrapping them, which behave the same.
+    """
+    query = query or {}
+
+    def fetch(token: Optional[str]) -> Future:
+        return _prefetcher.submit(
+            _fetch_page, resource, query, limit, token, metadata_only, raw
+        )
+
+    future: Optional[Future] = fetch(None)
+    # uids of the items listed, to skip them if the listing starts over
+    listed: Optional[set[str]] = None
+    seen: set[str] = set()
+
+    while future is not None:
+        try:
+            page = future.result()
+        except GoneError as e:
+            token = _inconsistent_continue_token(e)
+            if token:
+                logging.warning(
+                    "Continue token of the %s list expired, going on with "
+                    "the current list",
+                    getattr(resource, "kind", "resource"),
+                )
+            else:
+                logging.warning(
+                    "Continue token of the %s list expired, listing again",
+                    getattr(resource, "kind", "resource"),
+                )
+                listed = seen
+            future = fetch(token)
+            continue
+
+        token = _continue_token(page)
+        future = fetch(token) if token else None
+        items = map(RawField, page["items"]) if isinstance(page, dict) else page.items
+        for item in items:
+            uid = _uid(item)
+            if uid is not None:
+                if listed is not None and uid in listed:
+                    continue
+                seen.add(uid)
+            yield item
+        # drop the page before waiting for the next one
+        del page
+
+
+def _uid(item: Any) -> Optional[str]:
+    metadata = getattr(item, "metadata", None)
+    return getattr(metadata, "uid", None) if metadata is not None else None
+
+
+def page_stats() -> dict[str, tuple[int, float]]:
+    "The number of pages fetched, and the seconds it took, by resource kind."
+    with _stats_lock:
+        return dict(_page_stats)
+
+
+class ListPageCollector(Collector):
+    """
+    Reports the pages of Kubernetes lists fetched, and how long they took.
+    """
+
+    def collect(self) -> Iterable[Metric]:
+        pages = SummaryMetricFamily(
+            "pelorus_kube_list_page_seconds",
+            "Time taken to fetch pages of Kubernetes lists, by resource kind",
+            labels=["kind"],
+        )
+        for kind, (count, seconds) in sorted(page_stats().items()):
+            pages.add_metric([kind], count_value=count, sum_value=seconds)
+        yield pages
+
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "ListPageCollector",
+    "METADATA_ONLY_ACCEPT",
+    "page_stats",
+    "paginate_resource",
+]
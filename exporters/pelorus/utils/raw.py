@@ -0,0 +1,128 @@
+"""
+Kubernetes lists decoded into plain dicts.
+
+The dynamic client turns every response into `ResourceField` objects, going
+through every field of every item, which takes most of the time spent on large
+Pod or Build lists. Pages fetched with `get_raw_page` are decoded into plain
+dicts instead, by orjson when it is installed, and their items are read
+through `RawField`, which only wraps the fields that are read, when they are.
+"""
+from __future__ import annotations
+
+import json
+from pprint import pformat
+from typing import Any
+
+from kubernetes.dynamic import Resource, ResourceField
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+
+def get_raw_page(resource: Resource, **query) -> Any:
+    """
+    The list of the resource matching the query, as a plain dict.
+    The items are given the `kind` and `apiVersion` of the list when they
+    have none, as the dynamic client does.
+
+    Resources that give their list deserialized all the same, without a body
+    to decode, have it returned as it is.
+    """
+    response = resource.get(**query, serialize=False)
+    data = getattr(response, "data", None)
+    if not isinstance(data, (bytes, str)):
+        return response
+    page = _loads(data)
+    kind = page.get("kind") or ""
+    if kind.endswith("List"):
+        page["items"] = items = page.get("items") or []
+        for item in items:
+            item.setdefault("apiVersion", page.get("apiVersion"))
+            item.setdefault("kind", kind[:-4])
+    return page
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return RawField(value)
+    if isinstance(value, (list, tuple)):
+        return [_wrap(item) for item in value]
+    return value
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, ResourceField):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_unwrap(item) for item in value]
+    return value
+
+
+class RawField(ResourceField):
+    """
+    A `ResourceField` of a decoded dict, behaving the same,
+    that wraps the nested fields the first time they are read.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, params: dict[str, Any]):
+        object.__setattr__(self, "_raw", params)
+
+    def _field(self, name: str) -> Any:
+        # fields already read, or set, are in __dict__
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            pass
+        if name not in self._raw:
+            return None
+        value = self.__dict__[name] = _wrap(self._raw[name])
+        return value
+
+    def _fields(self) -> dict[str, Any]:
+        "All the fields wrapped, in their order, as ResourceField.__dict__ is."
+        fields = {name: self._field(name) for name in self._raw}
+        if len(fields) < len(self.__dict__):
+            fields.update(self.__dict__)
+        return fields
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_raw":
+            # not set, instead of looking it up again and again
+            raise AttributeError(name)
+        if name in self._raw:
+            return self._field(name)
+        # such as .get() or .items() when there is no such field
+        return getattr(self._fields(), name, None)
+
+    def __getitem__(self, name: str) -> Any:
+        return self._field(name)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ResourceField):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return pformat(self._fields())
+
+    def __dir__(self):
+        return dir(type(self)) + list(self._fields().keys())
+
+    def __iter__(self):
+        yield from self._fields().items()
+
+    def __reduce__(self):
+        # copied or pickled as the dict it wraps
+        return type(self), (self.to_dict(),)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: _unwrap(value) for name, value in self._fields().items()}
+
+
+__all__ = ["RawField", "get_raw_page"]
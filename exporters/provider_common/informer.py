@@ -0,0 +1,262 @@
+"""
+In-memory copies of cluster objects, kept up to date by watching the API server.
+
+Listing every object of a kind on each collection transfers the whole
+collection every time, even when nothing changed. A `ResourceInformer`
+lists the objects once, then follows a watch starting at the list's
+resourceVersion, so only changes are transferred afterwards.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Hashable, Iterable, Optional
+
+from attrs import define, field
+from kubernetes.watch import Watch
+from openshift.dynamic import ResourceInstance
+from openshift.dynamic.resource import Resource, ResourceField
+
+# Seconds before the API server closes a watch, which is then resumed
+# from the last seen resourceVersion.
+DEFAULT_WATCH_TIMEOUT = 300
+# Seconds to wait before watching again after an unexpected error.
+DEFAULT_RETRY_INTERVAL = 5.0
+
+HTTP_STATUS_GONE = 410
+
+# Computes the keys an object is indexed under. No keys means it is not indexed.
+Indexer = Callable[[ResourceField], Iterable[Hashable]]
+
+
+class InformerNotSyncedError(Exception):
+    """
+    Raised when reading from an informer that never listed its objects.
+    """
+
+
+@define(kw_only=True, eq=False)
+class ResourceInformer:
+    """
+    Keeps the objects of a resource in memory, along with indices over them.
+
+    `start` lists the objects, then keeps them up to date in a daemon thread
+    using a resourceVersion-based watch. When the API server no longer has the
+    history needed to resume a watch (410 Gone), everything is listed again.
+
+    Objects are stored by uid. Each indexer maps an object to the keys it can be
+    looked up by through `get_by_index` and `index`.
+    """
+
+    resource: Resource
+    # None watches all namespaces
+    namespace: Optional[str] = None
+    label_selector: Optional[str] = None
+    field_selector: Optional[str] = None
+    indexers: dict[str, Indexer] = field(factory=dict)
+    watch_timeout: int = DEFAULT_WATCH_TIMEOUT
+    retry_interval: float = DEFAULT_RETRY_INTERVAL
+
+    _objects: dict[str, ResourceField] = field(factory=dict, init=False)
+    _indices: dict[str, dict[Hashable, dict[str, ResourceField]]] = field(
+        factory=dict, init=False
+    )
+    _resource_version: Optional[str] = field(default=None, init=False)
+    _lock: threading.RLock = field(factory=threading.RLock, init=False)
+    _synced: threading.Event = field(factory=threading.Event, init=False)
+    _stopped: threading.Event = field(factory=threading.Event, init=False)
+    _watcher: Optional[Watch] = field(default=None, init=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False)
+
+    @property
+    def synced(self) -> bool:
+        "If the objects were listed, and the watch has not expired since."
+        return self._synced.is_set()
+
+    @property
+    def resource_version(self) -> Optional[str]:
+        return self._resource_version
+
+    def relist(self) -> None:
+        """
+        List all the objects, replacing the stored ones, and remember the
+        resourceVersion to watch from.
+        """
+        logging.debug(
+            "Listing %s in namespace %s with label %s",
+            self.resource.kind,
+            self.namespace or "<all>",
+            self.label_selector,
+        )
+        result = self.resource.get(
+            namespace=self.namespace,
+            label_selector=self.label_selector,
+            field_selector=self.field_selector,
+        )
+        with self._lock:
+            self._objects = {}
+            self._indices = {name: {} for name in self.indexers}
+            for obj in result.items:
+                self._store(obj)
+            self._resource_version = result.metadata.resourceVersion
+            self._synced.set()
+        logging.debug(
+            "Listed %d %s at resourceVersion %s",
+            len(self._objects),
+            self.resource.kind,
+            self._resource_version,
+        )
+
+    def watch(self) -> None:
+        """
+        Apply the changes since the last seen resourceVersion,
+        until the API server closes the watch.
+
+        If the resourceVersion is too old to resume from, the informer is
+        marked as not synced, so the next `sync` lists everything again.
+        """
+        self._watcher = Watch()
+        try:
+            for event in self.resource.watch(
+                namespace=self.namespace,
+                label_selector=self.label_selector,
+                field_selector=self.field_selector,
+                resource_version=self._resource_version,
+                timeout=self.watch_timeout,
+                watcher=self._watcher,
+            ):
+                self.apply(event["type"], event["object"])
+        except Exception as e:
+            if getattr(e, "status", None) != HTTP_STATUS_GONE:
+                raise
+            logging.info(
+                "Watch of %s expired at resourceVersion %s, listing again",
+                self.resource.kind,
+                self._resource_version,
+            )
+            self._synced.clear()
+
+    def apply(self, event_type: str, obj: ResourceInstance) -> None:
+        "Apply a single watch event to the stored objects."
+        with self._lock:
+            if event_type in ("ADDED", "MODIFIED"):
+                self._store(obj)
+            elif event_type == "DELETED":
+                self._remove(obj.metadata.uid)
+            elif event_type != "BOOKMARK":
+                logging.debug("Ignoring %s watch event", event_type)
+                return
+            self._resource_version = obj.metadata.resourceVersion
+
+    def sync(self) -> None:
+        "List everything if not synced, otherwise watch for changes."
+        if self.synced:
+            self.watch()
+        else:
+            self.relist()
+
+    def start(self) -> None:
+        """
+        List the objects, then keep them up to date in a daemon thread.
+
+        Errors from the initial list are raised, as there is nothing to serve without it.
+        """
+        if self._thread is not None:
+            return
+        if not self.synced:
+            self.relist()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"informer-{self.resource.kind.lower()}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        "Stop watching after the next event, waiting up to `timeout` seconds."
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logging.error(
+                    "Failed to watch %s, retrying in %ss",
+                    self.resource.kind,
+                    self.retry_interval,
+                    exc_info=True,
+                )
+                self._stopped.wait(self.retry_interval)
+
+    def objects(self) -> list[ResourceField]:
+        "All the stored objects."
+        self._check_synced()
+        with self._lock:
+            return list(self._objects.values())
+
+    def get(self, uid: str) -> Optional[ResourceField]:
+        "The stored object with the given uid, if any."
+        self._check_synced()
+        with self._lock:
+            return self._objects.get(uid)
+
+    def get_by_index(self, index_name: str, key: Hashable) -> list[ResourceField]:
+        "The stored objects indexed under the given key."
+        self._check_synced()
+        with self._lock:
+            return list(self._indices[index_name].get(key, {}).values())
+
+    def index(self, index_name: str) -> dict[Hashable, list[ResourceField]]:
+        "A copy of the whole index, mapping each key to its objects."
+        self._check_synced()
+        with self._lock:
+            return {
+                key: list(objects.values())
+                for key, objects in self._indices[index_name].items()
+                if objects
+            }
+
+    def _check_synced(self) -> None:
+        # after a 410 the stored objects are still the most recent known,
+        # so they are served until the next list replaces them.
+        if self._resource_version is None:
+            raise InformerNotSyncedError(
+                f"Informer for {self.resource.kind} has not listed its objects yet"
+            )
+
+    def _store(self, obj: ResourceField) -> None:
+        uid = obj.metadata.uid
+        self._remove(uid)
+        self._objects[uid] = obj
+        for name, indexer in self.indexers.items():
+            index = self._indices.setdefault(name, {})
+            for key in indexer(obj):
+                index.setdefault(key, {})[uid] = obj
+
+    def _remove(self, uid: str) -> None:
+        previous = self._objects.pop(uid, None)
+        if previous is None:
+            return
+        for name, indexer in self.indexers.items():
+            index = self._indices.get(name, {})
+            for key in indexer(previous):
+                objects = index.get(key)
+                if objects is not None:
+                    objects.pop(uid, None)
+                    if not objects:
+                        del index[key]
+
+
+__all__ = [
+    "ResourceInformer",
+    "InformerNotSyncedError",
+    "Indexer",
+    "DEFAULT_WATCH_TIMEOUT",
+]
@@ -1,23 +1,44 @@
 import logging
 import re
-import time
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Set, Tuple, Union
 
+from attrs import define, field
 from openshift.dynamic import DynamicClient, ResourceInstance
 from openshift.dynamic.exceptions import ResourceNotFoundError
 from openshift.dynamic.resource import ResourceField
 
+from pelorus.cache import TTLCache
 from pelorus.timeutil import parse_assuming_utc
+from pelorus.utils.pagination import paginate_resource
+from provider_common.informer import ResourceInformer
 
 # https://docs.openshift.com/container-platform/4.10/rest_api/objects/index.html#io.k8s.apimachinery.pkg.apis.meta.v1.ObjectMeta
 _DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
 SUPPORTED_REPLICA_OBJECTS = ["ReplicaSet", "ReplicationController"]
+# API version of each supported replica object kind, used to watch them
+REPLICA_OBJECTS_API_VERSIONS = {
+    "ReplicaSet": "apps/v1",
+    "ReplicationController": "v1",
+}
+
+RUNNING_PODS_FIELD_SELECTOR = "status.phase=Running"
+
+WATCH_PODS_ENV = "WATCH_PODS"
 
 # Cache threshold in seconds, used by every cached_parents_dict entry
 CACHE_THRESHOLD_1_DAY = 60 * 60 * 24
-cached_parents_dict: dict[str, Tuple[ResourceInstance, float]] = {}
+# Maximum number of cached parent objects, the least recently used are evicted first
+CACHE_MAX_SIZE = 10_000
+cached_parents_dict: TTLCache[ResourceInstance] = TTLCache(
+    name="replica_owners",
+    ttl=CACHE_THRESHOLD_1_DAY,
+    max_size=CACHE_MAX_SIZE,
+    dump=lambda k8s_obj: k8s_obj.to_dict(),
+    load=lambda data: ResourceInstance(None, data),
+)
 
 
 def _add_object_to_cache(uid: str, k8s_obj: ResourceInstance) -> None:
@@ -25,35 +46,18 @@ def _add_object_to_cache(uid: str, k8s_obj: ResourceInstance) -> None:
     Create in-memory cache for the K8S objects, so we don't have
     to query them each time.
 
-    We have also 'timeout' for each cache entry, which means
-    we won't grow the cache infinitely.
+    We have also 'timeout' for each cache entry, and a maximum number
+    of entries, which means we won't grow the cache infinitely.
     """
     if uid not in cached_parents_dict:
-        cached_parents_dict[uid] = (k8s_obj, time.time())
+        cached_parents_dict.set(uid, k8s_obj)
 
 
 def _get_object_from_cache(uid: str) -> ResourceInstance:
     """
     Gets the object from the cache by it's uid.
     """
-    k8s_obj, _ = cached_parents_dict.get(uid) or (None, None)
-    return k8s_obj
-
-
-def _remove_expired_objects() -> None:
-    """
-    Cleanup function to remove expired objects from the cache.
-    """
-    current_time = time.time()
-
-    expired_keys = [
-        uid
-        for uid, (_, insertion_time) in cached_parents_dict.items()
-        if current_time - insertion_time > CACHE_THRESHOLD_1_DAY
-    ]
-    for uid in expired_keys:
-        if uid in cached_parents_dict:
-            del cached_parents_dict[uid]
+    return cached_parents_dict.get(uid)
 
 
 def parse_datetime(dt_str: str) -> datetime:
@@ -103,26 +107,28 @@ def get_running_pods(
     pods = []
 
     for ns in namespaces or {""}:
-        pods += v1_services.get(
-            label_selector=app_label,
-            field_selector="status.phase=Running",
-            namespace=ns,
-        ).items
-
-    if with_owner_only:
-        return [
-            ocp_object
-            for ocp_object in pods
-            if ocp_object.metadata.ownerReferences
-            and any(
-                owner_ref.kind in SUPPORTED_REPLICA_OBJECTS
-                for owner_ref in ocp_object.metadata.ownerReferences
-            )
-        ]
+        for pod in paginate_resource(
+            v1_services,
+            dict(
+                label_selector=app_label,
+                field_selector=RUNNING_PODS_FIELD_SELECTOR,
+                namespace=ns,
+            ),
+            raw=True,
+        ):
+            if not with_owner_only or _has_replica_owner(pod):
+                pods.append(pod)
 
     return pods
 
 
+def _has_replica_owner(pod: ResourceField) -> bool:
+    return bool(pod.metadata.ownerReferences) and any(
+        owner_ref.kind in SUPPORTED_REPLICA_OBJECTS
+        for owner_ref in pod.metadata.ownerReferences
+    )
+
+
 def get_owner_object_from_child(
     client: DynamicClient, uid: str, child_object: ResourceField
 ) -> Dict[str, ResourceInstance]:
@@ -148,7 +154,6 @@ def get_owner_object_from_child(
     )
 
     if owner_ref:
-        _remove_expired_objects()
         replica = _get_object_from_cache(owner_ref.uid)
         if replica:
             return {owner_ref.uid: replica}
@@ -168,11 +173,14 @@ def get_owner_object_from_child(
             # We don't need to limit for a given namespace, because Replica objects may live in other
             # then Pod namespace, so we may get multiple replica objects for a given name.
             # The field_selector does not work on the UID, that's why we need to match separately
-            replica_list = api_resource.get(
-                field_selector=f"metadata.name={owner_ref.name}"
+            # Only the metadata of the replicas is read, not their pod template
+            replicas = paginate_resource(
+                api_resource,
+                dict(field_selector=f"metadata.name={owner_ref.name}"),
+                metadata_only=True,
             )
 
-            for replica in replica_list.items:
+            for replica in replicas:
                 if replica.metadata.uid == owner_ref.uid:
                     _add_object_to_cache(owner_ref.uid, replica)
                     return {owner_ref.uid: replica}
@@ -185,6 +193,214 @@ def get_owner_object_from_child(
     return {}
 
 
+def get_owner_objects(
+    client: DynamicClient, replica_pods_dict: Dict[str, ResourceField]
+) -> Dict[str, ResourceInstance]:
+    """
+    Retrieves the OpenShift Parent objects of the given Pods.
+
+    Instead of querying each Parent object separately, the Parent objects of each kind
+    are listed once per namespace, and matched by their UID. Parent objects that are
+    already cached are not queried at all. Only their metadata is listed, when the
+    API server supports it.
+
+    Args:
+        client (DynamicClient): An OpenShift client object.
+        replica_pods_dict (Dict[str, ResourceField]): Pod objects keyed by the UID of their Parent object,
+                                                      as returned by `filter_pods_by_replica_uid`.
+
+    Returns:
+        Dict[str, ResourceInstance]: A dictionary with the UIDs of the Parent objects as keys
+                                     and the Parent objects themselves as values.
+                                     Parent objects that were not found are left out.
+    """
+    owners = {}
+    # UIDs of the Parent objects to look for, by apiVersion, kind and namespace
+    missing_uids: Dict[Tuple[str, str, str], Set[str]] = {}
+
+    for uid, pod in replica_pods_dict.items():
+        owner_ref = next(
+            (owner for owner in pod.metadata.ownerReferences if owner.uid == uid),
+            None,
+        )
+        if not owner_ref or owner_ref.kind not in SUPPORTED_REPLICA_OBJECTS:
+            continue
+
+        replica = _get_object_from_cache(uid)
+        if replica:
+            owners[uid] = replica
+            continue
+
+        # Parent objects of namespaced objects always live in the same namespace
+        key = (owner_ref.apiVersion, owner_ref.kind, pod.metadata.namespace)
+        missing_uids.setdefault(key, set()).add(uid)
+
+    for (api_version, kind, namespace), uids in missing_uids.items():
+        logging.debug(
+            "Listing %s %s in namespace %s to find %d replica(s)",
+            api_version,
+            kind,
+            namespace,
+            len(uids),
+        )
+        try:
+            api_resource = client.resources.get(api_version=api_version, kind=kind)
+        except ResourceNotFoundError:
+            logging.debug(
+                "API Object not found for version: %s kind: %s", api_version, kind
+            )
+            continue
+
+        # Only the metadata of the replicas is read, not their pod template
+        for replica in paginate_resource(
+            api_resource, dict(namespace=namespace), metadata_only=True
+        ):
+            uid = replica.metadata.uid
+            if uid in uids:
+                _add_object_to_cache(uid, replica)
+                owners[uid] = replica
+
+    return owners
+
+
+@define(kw_only=True, eq=False)
+class PodInformerCache:
+    """
+    Keeps the running pods and their ReplicaSets and ReplicationControllers in memory,
+    watching them instead of listing them on every collection.
+
+    Serves the same data as `get_running_pods` and `get_owner_object_from_child`,
+    without any API call once started: owners are looked up by uid.
+    If the namespaces are given, the objects are only watched in those namespaces,
+    otherwise they are watched in all namespaces.
+    """
+
+    client: DynamicClient
+    namespaces: set[str] = field(factory=set)
+    app_label: Optional[str] = None
+
+    _pod_informers: list[ResourceInformer] = field(factory=list, init=False)
+    # replica object kind to its informers
+    _owner_informers: dict[str, list[ResourceInformer]] = field(
+        factory=dict, init=False
+    )
+    _start_lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    def start(self) -> None:
+        "List the objects and start watching them, if not done yet."
+        with self._start_lock:
+            if self._pod_informers:
+                return
+
+            v1_pods = self.client.resources.get(api_version="v1", kind="Pod")
+            owner_resources = {}
+            for kind in SUPPORTED_REPLICA_OBJECTS:
+                try:
+                    owner_resources[kind] = self.client.resources.get(
+                        api_version=REPLICA_OBJECTS_API_VERSIONS[kind], kind=kind
+                    )
+                except ResourceNotFoundError:
+                    logging.debug("API Object not found for kind: %s", kind)
+
+            pod_informers = []
+            owner_informers: dict[str, list[ResourceInformer]] = {}
+            for namespace in self.namespaces or {None}:
+                pod_informers.append(
+                    ResourceInformer(
+                        resource=v1_pods,
+                        namespace=namespace,
+                        label_selector=self.app_label,
+                        field_selector=RUNNING_PODS_FIELD_SELECTOR,
+                    )
+                )
+                # Owners of namespaced objects always live in the same namespace
+                for kind, resource in owner_resources.items():
+                    owner_informers.setdefault(kind, []).append(
+                        ResourceInformer(resource=resource, namespace=namespace)
+                    )
+
+            all_informers = pod_informers + [
+                informer
+                for informers in owner_informers.values()
+                for informer in informers
+            ]
+            try:
+                for informer in all_informers:
+                    informer.start()
+            except Exception:
+                for informer in all_informers:
+                    informer.stop()
+                raise
+
+            self._owner_informers = owner_informers
+            self._pod_informers = pod_informers
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        for informer in self._pod_informers:
+            informer.stop(timeout)
+        for informers in self._owner_informers.values():
+            for informer in informers:
+                informer.stop(timeout)
+
+    def get_running_pods(
+        self,
+        namespaces: Optional[Set[str]] = None,
+        with_owner_only: bool = True,
+    ) -> List[ResourceField]:
+        """
+        Same as `get_running_pods`, served from memory.
+        """
+        self.start()
+        pods = [
+            pod
+            for informer in self._pod_informers
+            for pod in informer.objects()
+            if not namespaces or pod.metadata.namespace in namespaces
+        ]
+        if with_owner_only:
+            return [pod for pod in pods if _has_replica_owner(pod)]
+        return pods
+
+    def get_owner_object_from_child(
+        self, uid: str, child_object: ResourceField
+    ) -> Dict[str, ResourceInstance]:
+        """
+        Same as `get_owner_object_from_child`, served from memory.
+
+        An owner created so recently that it was not received yet
+        is looked up through the API.
+        """
+        self.start()
+        owner_ref = next(
+            (
+                owner
+                for owner in child_object.metadata.ownerReferences
+                if owner.uid == uid
+            ),
+            None,
+        )
+        if not owner_ref or owner_ref.kind not in SUPPORTED_REPLICA_OBJECTS:
+            return {}
+
+        for informer in self._owner_informers.get(owner_ref.kind, []):
+            replica = informer.get(uid)
+            if replica is not None:
+                return {uid: replica}
+
+        return get_owner_object_from_child(self.client, uid, child_object)
+
+    def get_owner_objects(
+        self, replica_pods_dict: Dict[str, ResourceField]
+    ) -> Dict[str, ResourceInstance]:
+        """
+        Same as `get_owner_objects`, served from memory.
+        """
+        owners = {}
+        for uid, pod in replica_pods_dict.items():
+            owners.update(self.get_owner_object_from_child(uid, pod))
+        return owners
+
+
 def filter_pods_by_replica_uid(
     pods_list: List[ResourceField],
 ) -> Dict[str, ResourceField]:
@@ -241,7 +457,10 @@ def get_and_log_namespaces(
         query_args = dict()
 
     all_namespaces = client.resources.get(api_version="v1", kind="Namespace")
-    namespaces = {ns.metadata.name for ns in all_namespaces.get(**query_args).items}
+    namespaces = {
+        ns.metadata.name
+        for ns in paginate_resource(all_namespaces, query_args, metadata_only=True)
+    }
     logging.debug("Watching namespaces %s", namespaces)
     if not namespaces:
         logging.warning(
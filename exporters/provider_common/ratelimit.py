@@ -0,0 +1,296 @@
+"""
+Pacing of requests to APIs with an hourly rate limit, like GitHub's.
+
+GitHub reports the remaining requests of the current window, and when it resets,
+in the `x-ratelimit-*` headers of each response. A `RateLimiter` tracks them for
+one token and host, and spreads the remaining requests over the rest of the
+window, as a token bucket, once fewer than `threshold` requests remain:
+short bursts go through immediately, but sustained request rates are slowed
+down so the budget lasts until the reset.
+
+When metrics are collected in the background, requests wait for the budget
+to refill, or for the rate limit to reset, for up to `max_pause`.
+When they are collected during scrapes, waits are kept short: when a request
+would have to wait longer than `max_wait`, `RateLimitExceeded` is raised instead,
+leaving the callers to back off.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from attrs import define, field
+
+from pelorus import runtime
+from pelorus.http_cache import ConditionalCacheAdapter
+from provider_common.github import (
+    RATELIMIT_LIMIT_HEADER,
+    RATELIMIT_REMAINING_HEADER,
+    RATELIMIT_RESET_HEADER,
+)
+
+GITHUB_RATELIMIT_BURST_ENV = "GITHUB_RATELIMIT_BURST"
+GITHUB_RATELIMIT_THRESHOLD_ENV = "GITHUB_RATELIMIT_THRESHOLD"
+GITHUB_RATELIMIT_MAX_PAUSE_ENV = "GITHUB_RATELIMIT_MAX_PAUSE"
+# Number of requests that can be made at once, before being paced.
+DEFAULT_BURST = 100
+# Requests are only paced once fewer requests than this remain.
+DEFAULT_THRESHOLD = 500
+# Longest wait for a request, in seconds, before failing instead,
+# when collecting during scrapes.
+DEFAULT_MAX_WAIT = 10.0
+# Longest wait for a request, in seconds, when collecting in the background:
+# GitHub's rate limit resets every hour.
+DEFAULT_MAX_PAUSE = 3600.0
+# Header of rate limited responses telling how long to wait, in seconds.
+RETRY_AFTER_HEADER = "retry-after"
+
+
+class RateLimitExceeded(requests.RequestException):
+    """
+    Raised instead of waiting longer than allowed for the rate limit,
+    with the HTTP status of rate limited responses.
+    """
+
+    status_code = 429
+
+    def __init__(self, name: str, retry_at: float):
+        self.retry_at = retry_at
+        super().__init__(f"Rate limit of {name} exceeded, retry at {retry_at:.0f}")
+
+
+@define(kw_only=True)
+class RateLimiter:
+    """
+    A token bucket refilled at the rate that spreads the remaining
+    requests until the rate limit resets.
+
+    Until a response reports the rate limit, and while more than `threshold`
+    requests remain, requests are not paced.
+    Requests wait for up to `max_pause` when collecting in the background,
+    and up to `max_wait` when collecting during scrapes.
+    """
+
+    name: str
+    burst: int = DEFAULT_BURST
+    threshold: int = DEFAULT_THRESHOLD
+    max_wait: float = DEFAULT_MAX_WAIT
+    max_pause: float = DEFAULT_MAX_PAUSE
+    timer: Callable[[], float] = field(default=time.time, repr=False)
+    sleep: Callable[[float], None] = field(default=time.sleep, repr=False)
+
+    limit: Optional[int] = field(default=None, init=False)
+    remaining: Optional[int] = field(default=None, init=False)
+    reset_at: Optional[float] = field(default=None, init=False)
+
+    _tokens: float = field(default=0.0, init=False)
+    _refilled_at: float = field(default=0.0, init=False)
+    _lock: threading.Lock = field(factory=threading.Lock, init=False, repr=False)
+
+    def acquire(self) -> None:
+        """
+        Wait until a request can be made within the rate limit.
+        Raises RateLimitExceeded if that would take longer than allowed.
+        """
+        with self._lock:
+            wait = self._reserve()
+        if wait > 0:
+            logging.debug("Waiting %.1fs for the rate limit of %s", wait, self.name)
+            self.sleep(wait)
+
+    def update(self, response: requests.Response) -> None:
+        "Track the rate limit reported by the response, if any."
+        headers = response.headers
+        try:
+            remaining = int(headers[RATELIMIT_REMAINING_HEADER])
+            reset_at = float(headers[RATELIMIT_RESET_HEADER])
+            limit = int(headers.get(RATELIMIT_LIMIT_HEADER, remaining))
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            now = self.timer()
+            if self.remaining is None or (self.reset_at or 0) < reset_at:
+                # a new window starts with a full burst
+                self._tokens = min(self.burst, remaining)
+                self._refilled_at = now
+            self.limit = limit
+            self.remaining = remaining
+            self.reset_at = reset_at
+
+    def is_rate_limited(self, response: requests.Response) -> bool:
+        "If the request was rejected because of the rate limit."
+        if response.status_code not in (403, 429):
+            return False
+        return (
+            RETRY_AFTER_HEADER in response.headers
+            or response.headers.get(RATELIMIT_REMAINING_HEADER) == "0"
+        )
+
+    def pause(self, response: requests.Response) -> bool:
+        """
+        Wait as long as the rate limited response asks to,
+        unless that is longer than allowed.
+        Returns whether the request can be retried.
+        """
+        retry_after = response.headers.get(RETRY_AFTER_HEADER)
+        with self._lock:
+            if retry_after is not None and retry_after.isdigit():
+                wait = float(retry_after)
+            else:
+                wait = (self.reset_at or self.timer()) - self.timer()
+        wait = max(wait, 1.0)
+        if wait > self.longest_wait():
+            logging.warning(
+                "Rate limit of %s exceeded for %.0fs, not retrying", self.name, wait
+            )
+            return False
+        logging.warning("Rate limit of %s exceeded, pausing for %.0fs", self.name, wait)
+        self.sleep(wait)
+        return True
+
+    def longest_wait(self) -> float:
+        "How long a request may wait, depending on how metrics are collected."
+        if runtime.collects_in_background():
+            return self.max_pause
+        return self.max_wait
+
+    def _reserve(self) -> float:
+        "Take a token, returning how long to wait for it."
+        if self.remaining is None or self.reset_at is None:
+            return 0.0
+        now = self.timer()
+        if now >= self.reset_at:
+            # the window was reset, but no response told the new limits yet
+            self.remaining = None
+            return 0.0
+
+        if self.remaining > self.threshold:
+            # plenty left: not paced, with a full burst once it is
+            self._tokens = float(self.burst)
+            self._refilled_at = now
+            self.remaining -= 1
+            return 0.0
+
+        longest_wait = self.longest_wait()
+        if self.remaining <= 0:
+            if self.reset_at - now > longest_wait:
+                raise RateLimitExceeded(self.name, self.reset_at)
+            wait = self.reset_at - now
+            self._tokens = 0.0
+            self._refilled_at = now + wait
+            return wait
+
+        rate = self.remaining / (self.reset_at - now)
+        tokens = min(self.burst, self._tokens + (now - self._refilled_at) * rate) - 1
+        wait = -tokens / rate if tokens < 0 else 0.0
+        if wait > longest_wait:
+            raise RateLimitExceeded(self.name, now + wait)
+        self._tokens = tokens
+        self._refilled_at = now
+        self.remaining -= 1
+        return wait
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    host: str, token: Optional[str], resource: str = "core", **settings
+) -> RateLimiter:
+    """
+    The rate limiter of the token at the host, shared by all its sessions,
+    since the rate limit applies to the token.
+    It is created with the settings of the first session asking for it,
+    such as its `burst`, `threshold` or `max_pause`.
+
+    GitHub has separate limits for its REST (core), search and GraphQL APIs.
+    """
+    token_hash = hashlib.sha256((token or "").encode()).hexdigest()[:16]
+    key = f"{host} {resource} {token_hash}"
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(
+                name=f"{host} {resource}", **settings
+            )
+        return limiter
+
+
+def _resource(request: requests.PreparedRequest) -> str:
+    "The GitHub rate limit resource that the request counts against."
+    path = urlsplit(request.url or "").path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+class RateLimitedAdapter(ConditionalCacheAdapter):
+    """
+    A transport adapter that paces requests with the rate limiters of a token,
+    retrying once after a pause when the rate limit was exceeded anyway.
+    Responses that would need a longer pause than allowed are returned as they are.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        token: Optional[str],
+        burst: int = DEFAULT_BURST,
+        threshold: int = DEFAULT_THRESHOLD,
+        max_pause: float = DEFAULT_MAX_PAUSE,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.host = host
+        self.token = token
+        self.settings = dict(burst=burst, threshold=threshold, max_pause=max_pause)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        limiter = get_rate_limiter(
+            self.host, self.token, _resource(request), **self.settings
+        )
+        limiter.acquire()
+        response = super().send(request, **kwargs)
+        limiter.update(response)
+        if limiter.is_rate_limited(response) and limiter.pause(response):
+            response = super().send(request, **kwargs)
+            limiter.update(response)
+        return response
+
+
+def rate_limit_session(
+    session: requests.Session,
+    host: str,
+    token: Optional[str],
+    burst: int = DEFAULT_BURST,
+    threshold: int = DEFAULT_THRESHOLD,
+    max_pause: float = DEFAULT_MAX_PAUSE,
+):
+    """
+    Pace the requests of the session to the host,
+    with the rate limiters of the token.
+    Requests raise RateLimitExceeded instead of waiting longer than allowed
+    for the rate limit.
+    """
+    adapter = RateLimitedAdapter(
+        host, token, burst=burst, threshold=threshold, max_pause=max_pause
+    )
+    for scheme in ("https", "http"):
+        session.mount(f"{scheme}://{host}/", adapter)
+
+
+__all__ = [
+    "RateLimitExceeded",
+    "RateLimiter",
+    "RateLimitedAdapter",
+    "get_rate_limiter",
+    "rate_limit_session",
+]
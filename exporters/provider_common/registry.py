@@ -0,0 +1,271 @@
+"""
+Labels of container images, read from their registries with the
+OCI distribution (Docker registry v2) API.
+
+The labels are in the image configuration, so only two small documents are
+downloaded per image: its manifest and the configuration blob it points to,
+both by digest. Requests share one session, keeping connections to each
+registry open, and the bearer tokens that registries hand out for pulling
+from a repository are reused until they expire.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import platform
+import re
+import threading
+import time
+from typing import Callable, Optional, Union
+
+import requests
+from attrs import define, field, frozen
+
+# Seconds a request to a registry may take.
+REGISTRY_TIMEOUT = 30
+# Seconds a token is valid for when the registry does not tell.
+DEFAULT_TOKEN_EXPIRY = 60
+# Tokens are renewed this many seconds before they expire.
+TOKEN_EXPIRY_MARGIN = 10
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_API = "registry-1.docker.io"
+
+OCI_INDEX = "application/vnd.oci.image.index.v1+json"
+OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+DOCKER_MANIFEST_LIST = "application/vnd.docker.distribution.manifest.list.v2+json"
+DOCKER_MANIFEST = "application/vnd.docker.distribution.manifest.v2+json"
+MANIFEST_MEDIA_TYPES = (OCI_INDEX, OCI_MANIFEST, DOCKER_MANIFEST_LIST, DOCKER_MANIFEST)
+
+# Go architecture names, as used in manifest lists, of the machine names
+_ARCHITECTURES = {"x86_64": "amd64", "aarch64": "arm64", "ppc64le": "ppc64le"}
+
+# `docker://<registry>/<repository>@sha256:<hex>`
+_IMAGE_URI = re.compile(
+    r"^(?:docker://)?(?P<registry>[^/]+)/(?P<repository>[^@]+)"
+    r"@(?P<digest>sha256:[a-fA-F0-9]{64})$"
+)
+# `key="value"` parameters of a WWW-Authenticate challenge
+_CHALLENGE_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+
+# Statuses of registries refusing access to a repository, or hiding it:
+# retrying soon will not help.
+AUTH_FAILURE_HTTP_STATUSES = frozenset({401, 403, 404})
+
+
+class RegistryError(Exception):
+    """
+    The labels of an image could not be read from its registry,
+    with the HTTP status of its response, if any.
+    """
+
+    def __init__(self, message, status_code: Optional[int] = None):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+    @property
+    def is_auth_failure(self) -> bool:
+        "If the registry refused access, as opposed to network or server errors."
+        return self.status_code in AUTH_FAILURE_HTTP_STATUSES
+
+
+@frozen
+class ImageReference:
+    "An image in a registry, by digest."
+
+    registry: str
+    repository: str
+    digest: str
+
+    @classmethod
+    def parse(cls, image_uri: str) -> Optional[ImageReference]:
+        """
+        The reference of a `docker://` image URI pinned to a digest, or None.
+
+        >>> ImageReference.parse("docker://quay.io/pelorus/todolist@sha256:" + "0" * 64)
+        ImageReference(registry='quay.io', repository='pelorus/todolist', digest='sha256:0000000000000000000000000000000000000000000000000000000000000000')
+        >>> ImageReference.parse("docker://quay.io/pelorus/todolist:latest") is None
+        True
+        """
+        match = _IMAGE_URI.match(image_uri)
+        if not match:
+            return None
+        registry, repository = match["registry"], match["repository"]
+        if registry == DOCKER_HUB:
+            registry = DOCKER_HUB_API
+            if "/" not in repository:
+                repository = f"library/{repository}"
+        return cls(registry, repository, match["digest"])
+
+
+def _default_architecture() -> str:
+    machine = platform.machine()
+    return _ARCHITECTURES.get(machine, machine or "amd64")
+
+
+@define(kw_only=True)
+class RegistryClient:
+    """
+    Reads image labels from registries, anonymously or with the bearer tokens
+    registries give for pulling from public repositories.
+    """
+
+    session: requests.Session = field(factory=requests.Session)
+    # plain http is only meant for local registries
+    scheme: str = "https"
+    architecture: str = field(factory=_default_architecture)
+    timer: Callable[[], float] = field(default=time.monotonic, repr=False)
+
+    # (token, expiry time) by (registry, repository)
+    _tokens: dict[tuple[str, str], tuple[str, float]] = field(
+        factory=dict, init=False, repr=False
+    )
+    _tokens_lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    @classmethod
+    def with_verify(cls, verify: Union[bool, str], **kwargs) -> RegistryClient:
+        session = requests.Session()
+        session.verify = verify
+        return cls(session=session, **kwargs)
+
+    def get_labels(self, reference: ImageReference) -> dict[str, str]:
+        "The labels of the image, from its configuration."
+        manifest = self._get_manifest(reference, reference.digest)
+        try:
+            config_digest = manifest["config"]["digest"]
+        except (KeyError, TypeError):
+            raise RegistryError(f"{reference.digest} has no configuration")
+        response = self._get(reference, f"blobs/{config_digest}")
+        _check_digest(response, config_digest)
+        try:
+            config = response.json()
+        except ValueError:
+            raise RegistryError(f"Invalid configuration of {reference.digest}")
+        return (config.get("config") or {}).get("Labels") or {}
+
+    def _get_manifest(self, reference: ImageReference, digest: str) -> dict:
+        "The image manifest, from the manifest list for this architecture if needed."
+        response = self._get(
+            reference,
+            f"manifests/{digest}",
+            headers={"Accept": ", ".join(MANIFEST_MEDIA_TYPES)},
+        )
+        _check_digest(response, digest)
+        try:
+            manifest = response.json()
+        except ValueError:
+            raise RegistryError(f"Invalid manifest {digest}")
+
+        if manifest.get("mediaType") in (OCI_INDEX, DOCKER_MANIFEST_LIST) or (
+            "manifests" in manifest and "config" not in manifest
+        ):
+            if digest != reference.digest:
+                raise RegistryError(f"Nested manifest list {digest}")
+            return self._get_manifest(reference, self._platform_digest(manifest))
+        return manifest
+
+    def _platform_digest(self, manifest_list: dict) -> str:
+        "The digest of the image for this platform, or the first one."
+        manifests = [m for m in manifest_list.get("manifests") or [] if m.get("digest")]
+        if not manifests:
+            raise RegistryError("Empty manifest list")
+        for manifest in manifests:
+            platform_ = manifest.get("platform") or {}
+            if (
+                platform_.get("os") == "linux"
+                and platform_.get("architecture") == self.architecture
+            ):
+                return manifest["digest"]
+        return manifests[0]["digest"]
+
+    def _get(
+        self, reference: ImageReference, path: str, headers: Optional[dict] = None
+    ) -> requests.Response:
+        url = f"{self.scheme}://{reference.registry}/v2/{reference.repository}/{path}"
+        headers = dict(headers or {})
+        token = self._cached_token(reference)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            response = self.session.get(url, headers=headers, timeout=REGISTRY_TIMEOUT)
+            if response.status_code == 401:
+                token = self._authenticate(reference, response)
+                headers["Authorization"] = f"Bearer {token}"
+                response = self.session.get(
+                    url, headers=headers, timeout=REGISTRY_TIMEOUT
+                )
+        except requests.RequestException as e:
+            raise RegistryError(f"Request to {reference.registry} failed: {e}") from e
+        if not response.ok:
+            raise RegistryError(
+                f"GET {url} failed with status {response.status_code}",
+                response.status_code,
+            )
+        return response
+
+    def _cached_token(self, reference: ImageReference) -> Optional[str]:
+        key = (reference.registry, reference.repository)
+        with self._tokens_lock:
+            token, expires_at = self._tokens.get(key, (None, 0.0))
+            if token and self.timer() < expires_at:
+                return token
+            self._tokens.pop(key, None)
+            return None
+
+    def _authenticate(
+        self, reference: ImageReference, response: requests.Response
+    ) -> str:
+        "Get a token to pull from the repository, as the challenge asks."
+        challenge = response.headers.get("WWW-Authenticate", "")
+        scheme, _, params = challenge.partition(" ")
+        if scheme.lower() != "bearer":
+            raise RegistryError(
+                f"{reference.registry} requires credentials for {reference.repository}",
+                response.status_code,
+            )
+        realm_params = dict(_CHALLENGE_PARAM.findall(params))
+        realm = realm_params.pop("realm", None)
+        if not realm:
+            raise RegistryError(f"{reference.registry} sent no token realm")
+        realm_params.pop("error", None)
+        realm_params["scope"] = f"repository:{reference.repository}:pull"
+
+        logging.debug(
+            "Getting a token for %s/%s", reference.registry, reference.repository
+        )
+        token_response = self.session.get(
+            realm, params=realm_params, timeout=REGISTRY_TIMEOUT
+        )
+        if not token_response.ok:
+            raise RegistryError(
+                f"{reference.registry} refused a token for {reference.repository}"
+                f" with status {token_response.status_code}",
+                token_response.status_code,
+            )
+        try:
+            body = token_response.json()
+            token = body.get("token") or body["access_token"]
+            expires_in = int(body.get("expires_in") or DEFAULT_TOKEN_EXPIRY)
+        except (ValueError, KeyError, TypeError):
+            raise RegistryError(f"Invalid token from {reference.registry}")
+
+        with self._tokens_lock:
+            self._tokens[(reference.registry, reference.repository)] = (
+                token,
+                self.timer() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0),
+            )
+        return token
+
+
+def _check_digest(response: requests.Response, digest: str) -> None:
+    "Content fetched by digest must match it."
+    algorithm, _, expected = digest.partition(":")
+    if algorithm != "sha256":
+        return
+    if hashlib.sha256(response.content).hexdigest() != expected.lower():
+        raise RegistryError(f"Content of {digest} does not match its digest")
+
+
+__all__ = ["ImageReference", "RegistryClient", "RegistryError"]
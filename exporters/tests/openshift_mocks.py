@@ -1,3 +1,4 @@
+import json
 from typing import Any, Generic, Optional, TypeVar
 
 import attr
@@ -70,8 +71,32 @@ Item = TypeVar("Item")
 @attr.define
 class ResourceGetResponse(Generic[Item]):
     items: list[Item] = attr.Factory(list)
+    metadata: dict[str, Any] = attr.Factory(dict)
 
     @classmethod
     def of(cls, *items: Item):
         """Puts all arguments into the items list"""
         return cls(list(items))
+
+
+@attr.define
+class RawGetResponse:
+    "The response of the dynamic client when the list is not deserialized."
+    data: bytes
+
+    @classmethod
+    def of(cls, kind: str, *items: Any):
+        """A list of the kind with the items, which may be attrs objects."""
+        return cls(
+            json.dumps(
+                {
+                    "kind": f"{kind}List",
+                    "apiVersion": "v1",
+                    "metadata": {},
+                    "items": [
+                        attr.asdict(item) if attr.has(type(item)) else item
+                        for item in items
+                    ],
+                }
+            ).encode()
+        )
@@ -0,0 +1,161 @@
+from pelorus.cache import CacheCollector, SQLiteBackend, TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    timer = FakeTimer()
+    cache = TTLCache(name="test", ttl=10, timer=timer)
+    cache.set("old", 1)
+    timer.now += 5
+    cache.set("new", 2)
+
+    timer.now += 5
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+
+    timer.now += 5
+    assert len(cache) == 0
+    assert cache.expirations == 2
+
+
+def test_storing_again_restarts_expiry():
+    timer = FakeTimer()
+    cache = TTLCache(name="test", ttl=10, timer=timer)
+    cache.set("key", 1)
+    timer.now += 8
+    cache.set("key", 2)
+
+    timer.now += 8
+    assert cache.get("key") == 2
+    assert cache.expirations == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(name="test", max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_caches_are_bounded_by_weight():
+    timer = FakeTimer()
+    cache = TTLCache(name="test", ttl=10, max_weight=10, weigh=len, timer=timer)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.set("a", "aa")
+    assert cache.weight == 6
+
+    cache.set("c", "cccccc")
+
+    assert "b" not in cache
+    assert (cache.get("a"), cache.get("c")) == ("aa", "cccccc")
+    assert cache.weight == 8
+
+    # values heavier than the whole cache are not kept, and evict nothing
+    cache.set("a", "a" * 11)
+    assert cache.get("a") is None
+    assert cache.get("c") == "cccccc"
+    assert cache.weight == 6
+    assert cache.evictions == 1
+
+    timer.now += 10
+    assert cache.weight == 0
+
+
+def test_hits_and_misses_are_counted():
+    cache = TTLCache(name="test")
+    cache.set("a", 1)
+
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_expiry_queue_stays_bounded():
+    timer = FakeTimer()
+    cache = TTLCache(name="test", ttl=10, timer=timer)
+
+    for i in range(5000):
+        cache.set("key", i)
+
+    assert len(cache._expiry_queue) < 2000
+
+
+def test_collector_reports_cache_usage():
+    cache = TTLCache(name="test_collector_cache", max_size=1)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("b")
+
+    metrics = {metric.name: metric for metric in CacheCollector().collect()}
+
+    def value(name: str) -> float:
+        return next(
+            sample.value
+            for sample in metrics[name].samples
+            if sample.labels["cache"] == cache.name
+        )
+
+    assert value("pelorus_cache_entries") == 1
+    assert value("pelorus_cache_hits") == 1
+    assert value("pelorus_cache_evictions") == 1
+
+
+def test_sqlite_backend_warms_new_caches(tmp_path):
+    timer = FakeTimer()
+    backend = SQLiteBackend(tmp_path / "cache.sqlite3")
+    cache = TTLCache(name="test_sqlite", ttl=10, timer=timer)
+    cache.use_backend(backend)
+    cache.set("old", {"value": 1})
+    timer.now += 5
+    cache.set("new", {"value": 2})
+    cache.set("gone", {"value": 3})
+    cache.pop("gone")
+
+    timer.now += 6
+    restarted = TTLCache(name="test_sqlite", ttl=10, timer=timer)
+    restarted.use_backend(SQLiteBackend(tmp_path / "cache.sqlite3"))
+
+    assert restarted.entries() == [("new", {"value": 2}, timer.now - 6)]
+    # the expired entry was removed from the database as well
+    assert [key for key, _, _ in backend.load("test_sqlite")] == ["new"]
+
+
+def test_heavy_values_do_not_evict_persisted_entries(tmp_path):
+    backend = SQLiteBackend(tmp_path / "cache.sqlite3")
+    cache = TTLCache(name="test_heavy", max_weight=10, weigh=len)
+    cache.use_backend(backend)
+    cache.set("small", "small")
+
+    cache.set("large", "l" * 11)
+
+    assert [key for key, _, _ in backend.load("test_heavy")] == ["small"]
+
+
+def test_unreadable_entries_are_dropped(tmp_path):
+    backend = SQLiteBackend(tmp_path / "cache.sqlite3")
+    backend.store("test_unreadable", "a", "not a number", 1000.0)
+    backend.store("test_unreadable", "b", "2", 1000.0)
+
+    cache = TTLCache(name="test_unreadable", load=int)
+    cache.use_backend(backend)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert [key for key, _, _ in backend.load("test_unreadable")] == ["b"]
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import NonCallableMock
+
+from committime import CommitMetric
+from committime.collector_azure_devops import (
+    COMMIT_IDS_PER_REQUEST,
+    AzureDevOpsCommitCollector,
+)
+
+ORGANIZATION_URL = "https://dev.azure.com/dora-metrics"
+REPO_URL = f"{ORGANIZATION_URL}/pelorus/_git/todolist"
+COMMIT_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def azure_commit(number: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        commit_id=f"{number:040x}", committer=SimpleNamespace(date=COMMIT_DATE)
+    )
+
+
+class FakeGitClient:
+    def __init__(self, commits: list[SimpleNamespace]):
+        self.commits = commits
+        self.gets: list[str] = []
+        self.queries: list[dict] = []
+
+    def get_commit(self, commit_id: str, repository_id: str, project: str):
+        self.gets.append(commit_id)
+        return next(c for c in self.commits if c.commit_id == commit_id)
+
+    def get_commits(self, repository_id, search_criteria, project=None, top=None):
+        self.queries.append(
+            dict(repository=repository_id, project=project, ids=search_criteria.ids)
+        )
+        return [c for c in self.commits if c.commit_id in search_criteria.ids][:top]
+
+
+def azure_collector(commits: list[SimpleNamespace]):
+    collector = AzureDevOpsCommitCollector(
+        kube_client=NonCallableMock(), username="user", token="token"
+    )
+    git_client = FakeGitClient(commits)
+    collector._git_clients[ORGANIZATION_URL] = git_client
+    return collector, git_client
+
+
+def commit(commit_hash: str) -> CommitMetric:
+    metric = CommitMetric("todolist", commit_hash=commit_hash)
+    metric.repo_url = REPO_URL
+    return metric
+
+
+def test_git_client_is_reused():
+    collector, git_client = azure_collector([azure_commit(1), azure_commit(2)])
+
+    collector.get_commit_time(commit(azure_commit(1).commit_id))
+    metric = collector.get_commit_time(commit(azure_commit(2).commit_id))
+
+    assert list(collector._git_clients) == [ORGANIZATION_URL]
+    assert git_client.gets == [azure_commit(1).commit_id, azure_commit(2).commit_id]
+    assert metric.commit_timestamp == 1672531200.0
+    assert metric.commit_link == REPO_URL
+
+
+def test_commits_are_asked_for_by_ids():
+    commits = [azure_commit(number) for number in range(COMMIT_IDS_PER_REQUEST + 1)]
+    collector, git_client = azure_collector(commits)
+
+    metrics = [commit(c.commit_id) for c in commits] + [commit("f" * 40)]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics[:-1]
+    assert [len(query["ids"]) for query in git_client.queries] == [
+        COMMIT_IDS_PER_REQUEST,
+        2,
+    ]
+    assert git_client.queries[0]["repository"] == "todolist"
+    assert git_client.queries[0]["project"] == "pelorus"
+    assert git_client.gets == []
+    assert metrics[-1].commit_time is None
+
+
+def test_single_commits_are_not_batched():
+    collector, git_client = azure_collector([azure_commit(1)])
+
+    assert collector.get_commit_times([commit(azure_commit(1).commit_id)]) == []
+    assert git_client.queries == []
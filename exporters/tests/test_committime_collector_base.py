@@ -0,0 +1,547 @@
+#
+# Copyright Red Hat
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import threading
+from typing import Optional
+from unittest.mock import MagicMock, NonCallableMagicMock, NonCallableMock
+
+import attrs
+import pytest
+from attrs import define, field
+from kubernetes.dynamic.resource import ResourceInstance
+
+import pelorus
+from committime import CommitMetric
+from committime.collector_base import (
+    PERMANENT_FAILURE_RETRY_INTERVAL,
+    AbstractCommitCollector,
+    CommitLookupError,
+    UnsupportedGITProvider,
+)
+from pelorus.utils.raw import RawField
+
+APP = "todolist"
+NAMESPACE = "todolist-build"
+REPO_URL = "https://github.com/dora-metrics/todolist.git"
+GOOD_HASH = "1a2b3c4d5e6f1a2b3c4d5e6f1a2b3c4d5e6f1a2b"
+OTHER_HASH = "6f5e4d3c2b1a6f5e4d3c2b1a6f5e4d3c2b1a6f5e"
+MISSING_HASH = "0000000000000000000000000000000000000000"
+BROKEN_HASH = "ffffffffffffffffffffffffffffffffffffffff"
+UNSUPPORTED_HASH = "eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee"
+NOT_FOUND_HASH = "dddddddddddddddddddddddddddddddddddddddd"
+UNAVAILABLE_HASH = "cccccccccccccccccccccccccccccccccccccccc"
+COMMIT_TIMESTAMP = 1672531200.0
+
+
+def build_list(*commit_hashes: str) -> ResourceInstance:
+    """Create a list of code Builds of the same app, one for each commit hash."""
+    items = [
+        {
+            "metadata": {
+                "name": f"{APP}-{number}",
+                "uid": f"uid-{number}",
+                "namespace": NAMESPACE,
+                "labels": {"buildconfig": APP, pelorus.DEFAULT_APP_LABEL: APP},
+                "annotations": {},
+            },
+            "spec": {
+                "strategy": {"type": "Source"},
+                "source": {"git": {"uri": REPO_URL}},
+                "revision": {"git": {"commit": commit_hash}},
+            },
+            "status": {
+                "phase": "Complete",
+                "outputDockerImageReference": f"registry/{APP}:latest",
+                "output": {"to": {"imageDigest": f"sha256:{number}"}},
+            },
+        }
+        for number, commit_hash in enumerate(commit_hashes)
+    ]
+    return ResourceInstance(
+        client=None,
+        instance={
+            "kind": "BuildList",
+            "apiVersion": "v1",
+            "metadata": {"resourceVersion": "1"},
+            "items": items,
+        },
+    )
+
+
+def builds(*commit_hashes: str) -> list:
+    return build_list(*commit_hashes).items
+
+
+@define(kw_only=True)
+class FakeCommitCollector(AbstractCommitCollector):
+    calls: list[str] = field(factory=list, init=False)
+    concurrent_calls: int = field(default=0, init=False)
+    max_concurrent_calls: int = field(default=0, init=False)
+    barrier: Optional[threading.Barrier] = field(default=None)
+    lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    def get_commit_time(self, metric: CommitMetric) -> Optional[CommitMetric]:
+        with self.lock:
+            self.calls.append(metric.commit_hash)
+            self.concurrent_calls += 1
+            self.max_concurrent_calls = max(
+                self.max_concurrent_calls, self.concurrent_calls
+            )
+        try:
+            if self.barrier:
+                self.barrier.wait(timeout=5)
+            if metric.commit_hash == BROKEN_HASH:
+                raise RuntimeError("git provider error")
+            if metric.commit_hash == UNSUPPORTED_HASH:
+                raise UnsupportedGITProvider("Skipping non fake server")
+            if metric.commit_hash == NOT_FOUND_HASH:
+                raise CommitLookupError("Commit not found", status_code=404)
+            if metric.commit_hash == UNAVAILABLE_HASH:
+                raise CommitLookupError("Service unavailable", status_code=503)
+            if metric.commit_hash != MISSING_HASH:
+                metric.commit_time = "2023-01-01T00:00:00Z"
+                metric.commit_timestamp = COMMIT_TIMESTAMP
+            return metric
+        finally:
+            with self.lock:
+                self.concurrent_calls -= 1
+
+
+def fake_collector(**kwargs) -> FakeCommitCollector:
+    return FakeCommitCollector(
+        kube_client=NonCallableMock(), username="", token="", **kwargs
+    )
+
+
+def test_same_commit_is_resolved_once():
+    collector = fake_collector()
+
+    metrics = collector.get_metrics_from_apps(
+        {APP: builds(GOOD_HASH, GOOD_HASH, OTHER_HASH, GOOD_HASH)}, NAMESPACE
+    )
+
+    assert len(metrics) == 4
+    assert sorted(collector.calls) == sorted([GOOD_HASH, OTHER_HASH])
+    assert all(m.commit_timestamp == COMMIT_TIMESTAMP for m in metrics)
+    assert set(collector.commit_dict) == {GOOD_HASH, OTHER_HASH}
+
+
+def test_cached_commits_are_not_resolved_again():
+    collector = fake_collector()
+    collector.get_metrics_from_apps({APP: builds(GOOD_HASH)}, NAMESPACE)
+
+    metrics = collector.get_metrics_from_apps(
+        {APP: builds(GOOD_HASH, OTHER_HASH)}, NAMESPACE
+    )
+
+    assert len(metrics) == 2
+    assert collector.calls == [GOOD_HASH, OTHER_HASH]
+    # the cached time is set on the metric of each build
+    assert [m.build_name for m in metrics] == [f"{APP}-0", f"{APP}-1"]
+    assert all(m.commit_timestamp == COMMIT_TIMESTAMP for m in metrics)
+
+
+def test_commit_cache_is_bounded():
+    collector = fake_collector(commit_cache_size=1)
+
+    metrics = collector.get_metrics_from_apps(
+        {APP: builds(GOOD_HASH, OTHER_HASH)}, NAMESPACE
+    )
+
+    assert len(metrics) == 2
+    # commits evicted during the collection are not resolved again
+    assert sorted(collector.calls) == sorted([GOOD_HASH, OTHER_HASH])
+    assert len(collector.commit_dict) == 1
+    assert collector.commit_dict.evictions == 1
+
+
+def test_commits_are_resolved_concurrently():
+    collector = fake_collector(
+        commit_resolution_workers=3, barrier=threading.Barrier(3)
+    )
+
+    metrics = collector.get_metrics_from_apps(
+        {APP: builds(GOOD_HASH, OTHER_HASH, "abc123")}, NAMESPACE
+    )
+
+    assert len(metrics) == 3
+    assert collector.max_concurrent_calls == 3
+
+
+def test_concurrency_is_bounded():
+    collector = fake_collector(commit_resolution_workers=2)
+
+    hashes = [f"{number:040x}" for number in range(1, 20)]
+    metrics = collector.get_metrics_from_apps({APP: builds(*hashes)}, NAMESPACE)
+
+    assert len(metrics) == len(hashes)
+    assert collector.max_concurrent_calls <= 2
+
+
+def test_failed_commits_only_affect_their_builds(caplog):
+    collector = fake_collector()
+
+    metrics = collector.get_metrics_from_apps(
+        {
+            APP: builds(
+                GOOD_HASH,
+                BROKEN_HASH,
+                MISSING_HASH,
+                UNSUPPORTED_HASH,
+                BROKEN_HASH,
+                MISSING_HASH,
+            )
+        },
+        NAMESPACE,
+    )
+
+    assert [m.commit_hash for m in metrics] == [GOOD_HASH]
+    assert sorted(collector.calls) == sorted(
+        [GOOD_HASH, BROKEN_HASH, MISSING_HASH, UNSUPPORTED_HASH]
+    )
+    assert set(collector.commit_dict) == {GOOD_HASH}
+    assert caplog.text.count("Couldn't get commit time") == 2
+    assert caplog.text.count("Skipping non fake server") == 1
+    assert [r.message for r in caplog.records].count("git provider error") == 2
+
+
+def test_get_metric_from_build():
+    collector = fake_collector()
+    build = builds(GOOD_HASH)[0]
+
+    metric = collector.get_metric_from_build(build, APP, NAMESPACE, None)
+
+    assert metric.commit_timestamp == COMMIT_TIMESTAMP
+    assert metric.repo_url == REPO_URL
+    assert collector.calls == [GOOD_HASH]
+
+
+def test_raw_builds_are_read_from_their_annotations():
+    collector = fake_collector()
+    build = builds(GOOD_HASH)[0].to_dict()
+    del build["spec"]["revision"]
+    del build["spec"]["source"]
+    build["metadata"]["annotations"] = {
+        "io.openshift.build.commit.id": GOOD_HASH,
+        "io.openshift.build.source-location": REPO_URL,
+    }
+
+    build_metric = collector._prepare_metric_from_build(
+        RawField(build), APP, NAMESPACE, None
+    )
+
+    assert build_metric.errors == []
+    assert build_metric.metric.commit_hash == GOOD_HASH
+    assert build_metric.metric.repo_url == REPO_URL
+    assert build_metric.metric.labels == build["metadata"]["labels"]
+
+
+def test_commits_evicted_from_the_cache_are_looked_up_again():
+    collector = fake_collector()
+    # evicted right after being found in the cache
+    collector.commit_dict = MagicMock()
+    collector.commit_dict.__contains__.return_value = True
+    collector.commit_dict.get.return_value = None
+
+    metric = collector.get_metric_from_build(builds(GOOD_HASH)[0], APP, NAMESPACE, None)
+
+    assert metric.commit_timestamp == COMMIT_TIMESTAMP
+    assert collector.calls == [GOOD_HASH]
+
+
+def test_watched_builds_are_listed_once():
+    stopped = threading.Event()
+    v1_builds = NonCallableMagicMock(kind="Build")
+    v1_builds.get.return_value = build_list(GOOD_HASH, OTHER_HASH)
+    v1_builds.watch.side_effect = lambda **kwargs: stopped.wait(5) and iter([])
+    collector = fake_collector(namespaces=NAMESPACE, watch_builds=True)
+    collector.kube_client.resources.get.return_value = v1_builds
+
+    try:
+        first = collector.generate_metrics()
+        second = collector.generate_metrics()
+    finally:
+        stopped.set()
+        for informer in collector._build_informers.values():
+            informer.stop(timeout=5)
+
+    assert v1_builds.get.call_count == 1
+    assert sorted(m.commit_hash for m in first) == sorted([GOOD_HASH, OTHER_HASH])
+    assert sorted(m.commit_hash for m in second) == sorted([GOOD_HASH, OTHER_HASH])
+    assert all(m.namespace == NAMESPACE for m in first)
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_failed_commits_are_retried_with_backoff():
+    collector = fake_collector(commit_retry_backoff=10, commit_retry_max_backoff=15)
+    collector.failed_commits.timer = timer = FakeTimer()
+
+    def collect_missing():
+        collector.get_metrics_from_apps({APP: builds(MISSING_HASH)}, NAMESPACE)
+
+    collect_missing()
+    timer.now += 5
+    collect_missing()
+    assert collector.calls == [MISSING_HASH]
+
+    timer.now += 5
+    collect_missing()
+    assert collector.calls == [MISSING_HASH] * 2
+
+    # the backoff doubled, up to the maximum
+    timer.now += 10
+    collect_missing()
+    assert collector.calls == [MISSING_HASH] * 2
+    timer.now += 5
+    collect_missing()
+    assert collector.calls == [MISSING_HASH] * 3
+
+
+def image_build(commit_hash: str, image_digest: str) -> ResourceInstance:
+    "A Build of the commit pushing the Image to an ImageStreamTag."
+    instance = builds(commit_hash)[0].to_dict()
+    instance["spec"]["output"] = {"to": {"kind": "ImageStreamTag", "name": "app:1"}}
+    instance["status"]["output"]["to"]["imageDigest"] = image_digest
+    return ResourceInstance(client=None, instance=instance)
+
+
+def images_without_labels(collector: FakeCommitCollector) -> NonCallableMock:
+    v1_images = NonCallableMock()
+    v1_images.get.return_value = ResourceInstance(
+        client=None,
+        instance={
+            "kind": "Image",
+            "apiVersion": "image.openshift.io/v1",
+            "dockerImageMetadata": {"Config": {"Labels": {}}},
+        },
+    )
+    collector.kube_client.resources.get.return_value = v1_images
+    return v1_images
+
+
+def test_backing_off_commits_make_no_api_call():
+    collector = fake_collector(commit_retry_backoff=10)
+    collector.failed_commits.timer = timer = FakeTimer()
+    v1_images = images_without_labels(collector)
+
+    collector.get_metrics_from_apps(
+        {APP: [image_build(MISSING_HASH, "sha256:1")]}, NAMESPACE
+    )
+    assert collector.calls == [MISSING_HASH]
+    assert v1_images.get.call_count == 1
+
+    # a new Build of the same commit, whose Image was not read yet
+    timer.now += 5
+    collector.get_metrics_from_apps(
+        {APP: [image_build(MISSING_HASH, "sha256:2")]}, NAMESPACE
+    )
+    assert collector.calls == [MISSING_HASH]
+    assert v1_images.get.call_count == 1
+
+
+def test_images_without_commit_date_are_read_once():
+    collector = fake_collector(commit_time_sources="image_labels")
+    v1_images = images_without_labels(collector)
+    build = image_build(GOOD_HASH, "sha256:1")
+
+    collector.get_metrics_from_apps({APP: [build]}, NAMESPACE)
+    metrics = collector.get_metrics_from_apps({APP: [build]}, NAMESPACE)
+
+    assert metrics == []
+    assert v1_images.get.call_count == 1
+
+
+def test_images_are_read_concurrently():
+    collector = fake_collector(commit_time_sources="image_labels")
+    # each lookup waits for the other one
+    both_reading = threading.Barrier(2, timeout=5)
+
+    def get_image(name):
+        both_reading.wait()
+        return ResourceInstance(
+            client=None,
+            instance={
+                "kind": "Image",
+                "dockerImageMetadata": {
+                    "Config": {"Labels": {collector.date_annotation_name: "1672531200"}}
+                },
+            },
+        )
+
+    v1_images = NonCallableMock()
+    v1_images.get.side_effect = get_image
+    collector.kube_client.resources.get.return_value = v1_images
+
+    metrics = collector.get_metrics_from_apps(
+        {
+            APP: [
+                image_build(GOOD_HASH, "sha256:1"),
+                image_build(OTHER_HASH, "sha256:2"),
+            ]
+        },
+        NAMESPACE,
+    )
+
+    assert [metric.commit_timestamp for metric in metrics] == [COMMIT_TIMESTAMP] * 2
+
+
+def test_permanent_failures_are_retried_daily():
+    collector = fake_collector()
+    collector.failed_commits.timer = timer = FakeTimer()
+    hashes = (NOT_FOUND_HASH, UNSUPPORTED_HASH, UNAVAILABLE_HASH)
+
+    collector.get_metrics_from_apps({APP: builds(*hashes)}, NAMESPACE)
+    timer.now += PERMANENT_FAILURE_RETRY_INTERVAL - 1
+    collector.get_metrics_from_apps({APP: builds(*hashes)}, NAMESPACE)
+
+    assert sorted(collector.calls) == sorted(hashes + (UNAVAILABLE_HASH,))
+    assert {
+        failure.errors: failure.permanent
+        for _, failure, _ in collector.failed_commits.entries()
+    } == {
+        ("Commit not found",): True,
+        ("Skipping non fake server",): True,
+        ("Service unavailable",): False,
+    }
+
+
+def test_resolved_commits_are_no_longer_failed():
+    collector = fake_collector(commit_retry_backoff=0)
+    collector.get_metrics_from_apps({APP: builds(UNAVAILABLE_HASH)}, NAMESPACE)
+    assert len(collector.failed_commits) == 1
+
+    collector.get_commit_time = lambda metric: attrs.evolve(
+        metric, commit_time="2023-01-01T00:00:00Z", commit_timestamp=COMMIT_TIMESTAMP
+    )
+    metrics = collector.get_metrics_from_apps(
+        {APP: builds(UNAVAILABLE_HASH)}, NAMESPACE
+    )
+
+    assert len(metrics) == 1
+    assert len(collector.failed_commits) == 0
+
+
+def test_failed_commits_are_reported():
+    collector = fake_collector()
+    collector.get_metrics_from_apps(
+        {APP: builds(NOT_FOUND_HASH, MISSING_HASH, UNAVAILABLE_HASH)}, NAMESPACE
+    )
+
+    failures = collector._collect_failed_commits()
+
+    assert {sample.labels["kind"]: sample.value for sample in failures.samples} == {
+        "permanent": 1,
+        "transient": 2,
+    }
+
+
+@define(kw_only=True)
+class BatchCommitCollector(FakeCommitCollector):
+    batches: list[list[str]] = field(factory=list, init=False)
+
+    def get_commit_times(self, metrics: list[CommitMetric]) -> list[CommitMetric]:
+        self.batches.append([metric.commit_hash for metric in metrics])
+        resolved = [metric for metric in metrics if metric.commit_hash == GOOD_HASH]
+        for metric in resolved:
+            metric.commit_time = "2023-01-01T00:00:00Z"
+            metric.commit_timestamp = COMMIT_TIMESTAMP
+        return resolved
+
+
+def test_commits_are_looked_up_at_once():
+    collector = BatchCommitCollector(
+        kube_client=NonCallableMock(), username="", token=""
+    )
+
+    metrics = collector.get_metrics_from_apps(
+        {APP: builds(GOOD_HASH, OTHER_HASH, GOOD_HASH)}, NAMESPACE
+    )
+
+    assert len(metrics) == 3
+    assert [sorted(batch) for batch in collector.batches] == [
+        sorted([GOOD_HASH, OTHER_HASH])
+    ]
+    # commits not returned by the batch are looked up one by one
+    assert collector.calls == [OTHER_HASH]
+    assert GOOD_HASH in collector.commit_dict
+
+
+def build_with_commit_date(commit_hash: str, annotations=None, env=None):
+    build = builds(commit_hash)[0]
+    instance = build.to_dict()
+    instance["metadata"]["annotations"] = annotations or {}
+    instance["spec"]["strategy"]["sourceStrategy"] = {"env": env or []}
+    return ResourceInstance(client=None, instance=instance)
+
+
+def test_commit_times_are_taken_from_build_metadata():
+    collector = fake_collector()
+    annotated = build_with_commit_date(
+        GOOD_HASH, annotations={"io.openshift.build.commit.date": "1672531200"}
+    )
+    with_env = build_with_commit_date(
+        OTHER_HASH,
+        env=[{"name": "OPENSHIFT_BUILD_COMMIT_DATE", "value": "2023-01-01T00:00:00Z"}],
+    )
+
+    metrics = collector.get_metrics_from_apps({APP: [annotated, with_env]}, NAMESPACE)
+
+    assert collector.calls == []
+    assert [m.commit_timestamp for m in metrics] == [COMMIT_TIMESTAMP] * 2
+    assert metrics[0].commit_link == REPO_URL
+    resolutions = collector._collect_resolutions_by_source()
+    assert {s.labels["source"]: s.value for s in resolutions.samples} == {
+        "annotations": 1,
+        "env": 1,
+        "image_labels": 0,
+        "api": 0,
+    }
+
+
+def test_git_api_is_called_without_build_metadata():
+    collector = fake_collector()
+    unreadable = build_with_commit_date(
+        GOOD_HASH, annotations={"io.openshift.build.commit.date": "yesterday"}
+    )
+
+    metrics = collector.get_metrics_from_apps({APP: [unreadable]}, NAMESPACE)
+
+    assert collector.calls == [GOOD_HASH]
+    assert metrics[0].commit_timestamp == COMMIT_TIMESTAMP
+    assert collector._resolutions_by_source["api"] == 1
+
+
+def test_git_api_can_be_left_out():
+    collector = fake_collector(commit_time_sources="annotations")
+
+    metrics = collector.get_metrics_from_apps({APP: builds(GOOD_HASH)}, NAMESPACE)
+
+    assert collector.calls == []
+    assert metrics == []
+
+
+def test_git_api_must_be_the_last_source():
+    with pytest.raises(ValueError):
+        fake_collector(commit_time_sources="api,annotations")
+    with pytest.raises(ValueError):
+        fake_collector(commit_time_sources="annotations,labels")
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from unittest.mock import NonCallableMock
+
+import requests
+
+from committime import CommitMetric
+from committime.collector_bitbucket import (
+    COMMITS_PER_PAGE,
+    BitbucketCommitCollector,
+    Version2,
+)
+from pelorus.cache import SQLiteBackend
+
+SERVER = "https://bitbucket.example.com"
+API_URL = f"{SERVER}/api/2.0/repositories"
+COMMITS_URL = f"{API_URL}/dora-metrics/todolist/commits"
+# recent enough to be listed
+COMMIT_TIME = datetime.now(timezone.utc).replace(microsecond=0)
+COMMIT_DATE = COMMIT_TIME.isoformat()
+
+
+class FakeSession(requests.Session):
+    """
+    Implements the Bitbucket 2.0 API, listing the recent commits it was given,
+    whatever the repository.
+    """
+
+    def __init__(self, recent_commits: list[str]):
+        super().__init__()
+        self.recent_commits = recent_commits
+        self.urls: list[str] = []
+
+    def get(self, url, params=None, **kwargs):
+        self.urls.append(url)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        if url == API_URL:
+            body = {}
+        else:
+            page = int(url.rpartition("page=")[2]) if "page=" in url else 1
+            start = (page - 1) * COMMITS_PER_PAGE
+            body = {
+                "values": [
+                    {
+                        "hash": sha,
+                        "date": COMMIT_DATE,
+                        "links": {"html": f"{SERVER}/commits/{sha}"},
+                    }
+                    for sha in self.recent_commits[start : start + COMMITS_PER_PAGE]
+                ],
+                "next": f"{COMMITS_URL}?pagelen={COMMITS_PER_PAGE}&page={page + 1}",
+            }
+        response._content = requests.compat.json.dumps(body).encode()
+        return response
+
+
+def bitbucket_collector(session: FakeSession, **kwargs) -> BitbucketCommitCollector:
+    collector = BitbucketCommitCollector(
+        kube_client=NonCallableMock(), username="user", token="token", **kwargs
+    )
+    collector.session = session
+    return collector
+
+
+def commit(commit_hash: str) -> CommitMetric:
+    metric = CommitMetric("todolist", commit_hash=commit_hash)
+    metric.repo_url = f"{SERVER}/dora-metrics/todolist"
+    return metric
+
+
+def test_recent_commits_are_listed_once_per_repository():
+    recent_commits = [f"{number:040x}" for number in range(COMMITS_PER_PAGE * 3)]
+    session = FakeSession(recent_commits)
+    collector = bitbucket_collector(session, commit_prefetch_pages=2)
+
+    metrics = [
+        commit(recent_commits[1]),
+        commit(recent_commits[2]),
+        commit(recent_commits[COMMITS_PER_PAGE]),
+    ]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics
+    assert session.urls == [
+        API_URL,
+        COMMITS_URL,
+        f"{COMMITS_URL}?pagelen={COMMITS_PER_PAGE}&page=2",
+    ]
+    assert metrics[-1].commit_timestamp == COMMIT_TIME.timestamp()
+
+
+def test_listing_stops_at_the_page_limit():
+    recent_commits = [f"{number:040x}" for number in range(COMMITS_PER_PAGE * 3)]
+    session = FakeSession(recent_commits)
+    collector = bitbucket_collector(session, commit_prefetch_pages=1)
+
+    metrics = [commit(recent_commits[1]), commit(recent_commits[-1])]
+
+    assert collector.get_commit_times(metrics) == metrics[:1]
+    assert session.urls == [API_URL, COMMITS_URL]
+
+
+def test_listing_stops_at_old_commits():
+    recent_commits = [f"{number:040x}" for number in range(COMMITS_PER_PAGE * 3)]
+    session = FakeSession(recent_commits)
+    collector = bitbucket_collector(
+        session, commit_prefetch_pages=2, commit_prefetch_days=0
+    )
+
+    metrics = [
+        commit(recent_commits[0]),
+        commit(recent_commits[-2]),
+        commit(recent_commits[-1]),
+    ]
+
+    assert collector.get_commit_times(metrics) == metrics[:1]
+    assert session.urls == [API_URL, COMMITS_URL]
+
+
+def test_api_versions_are_persisted(tmp_path):
+    collector = bitbucket_collector(FakeSession([]))
+    collector.cached_server_api_versions.use_backend(
+        SQLiteBackend(tmp_path / "cache.sqlite3")
+    )
+    collector.get_commit_times([commit("aaa")])
+
+    session = FakeSession([])
+    restarted = bitbucket_collector(session)
+    restarted.cached_server_api_versions.use_backend(
+        SQLiteBackend(tmp_path / "cache.sqlite3")
+    )
+
+    assert isinstance(restarted.get_api_version(SERVER), Version2)
+    assert session.urls == []
+
+
+def test_commit_links_follow_the_api_version():
+    collector = bitbucket_collector(FakeSession([]))
+    metric = commit("a" * 40)
+    # until the API version of the server is known
+    assert collector.commit_link(metric) == metric.repo_url
+
+    collector.cached_server_api_versions.set(SERVER, Version2())
+    assert collector.commit_link(metric) == (
+        f"{SERVER}/dora-metrics/todolist/commits/{'a' * 40}"
+    )
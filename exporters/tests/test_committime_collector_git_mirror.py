@@ -0,0 +1,201 @@
+import os
+import subprocess
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import NonCallableMock
+
+import pytest
+
+from committime import CommitMetric
+from committime.collector_base import CommitLookupError
+from committime.collector_git_mirror import (
+    MIN_FORCED_FETCH_INTERVAL,
+    GitError,
+    GitMirror,
+    GitMirrorCommitCollector,
+    parse_committer_date,
+)
+
+REPO_URL = "https://git.example.com/dora-metrics/todolist"
+COMMIT_DATE = "2023-01-01T02:00:00+02:00"
+COMMIT_TIMESTAMP = 1672531200.0
+
+
+def git(*args: str, cwd: Path, date: str = COMMIT_DATE) -> str:
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="Pelorus",
+        GIT_AUTHOR_EMAIL="pelorus@example.com",
+        GIT_COMMITTER_NAME="Pelorus",
+        GIT_COMMITTER_EMAIL="pelorus@example.com",
+        GIT_AUTHOR_DATE=date,
+        GIT_COMMITTER_DATE=date,
+    )
+    return subprocess.run(
+        ["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit(repo: Path, message: str, date: str = COMMIT_DATE) -> str:
+    git("commit", "--allow-empty", "--quiet", "-m", message, cwd=repo, date=date)
+    return git("rev-parse", "HEAD", cwd=repo)
+
+
+@pytest.fixture
+def origin(tmp_path: Path) -> Path:
+    repo = tmp_path / "origin"
+    repo.mkdir()
+    git("init", "--quiet", cwd=repo)
+    return repo
+
+
+@pytest.fixture
+def collector(tmp_path: Path, origin: Path):
+    """
+    A collector whose mirror of REPO_URL was cloned from the local origin,
+    so fetching it fetches from the origin.
+    """
+    collector = GitMirrorCommitCollector(
+        kube_client=NonCallableMock(),
+        username="",
+        token="",
+        mirror_dir=str(tmp_path / "mirrors"),
+    )
+    commit(origin, "initial commit")
+    mirror_path = collector.mirror_path(REPO_URL)
+    mirror_path.parent.mkdir(parents=True)
+    git("clone", "--mirror", "--quiet", str(origin), str(mirror_path), cwd=tmp_path)
+    yield collector
+    for mirror in collector._mirrors.values():
+        mirror.close()
+
+
+def commit_metric(commit_hash: str) -> CommitMetric:
+    metric = CommitMetric("todolist", commit_hash=commit_hash)
+    metric.repo_url = REPO_URL
+    return metric
+
+
+def test_commits_are_read_from_the_mirror(collector, origin):
+    first = git("rev-parse", "HEAD", cwd=origin)
+    second = commit(origin, "second commit", date="2023-01-02T00:00:00Z")
+
+    metrics = [commit_metric(first), commit_metric(second[:12])]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics
+    assert metrics[0].commit_timestamp == COMMIT_TIMESTAMP
+    assert metrics[0].commit_time == COMMIT_DATE
+    assert metrics[1].commit_timestamp == COMMIT_TIMESTAMP + 24 * 60 * 60
+    assert metrics[1].commit_link == REPO_URL
+
+
+def test_new_commits_are_fetched(collector, origin):
+    first = git("rev-parse", "HEAD", cwd=origin)
+    collector.get_commit_time(commit_metric(first))
+    mirror = collector._mirrors[REPO_URL]
+    mirror._fetched_at -= MIN_FORCED_FETCH_INTERVAL
+
+    second = commit(origin, "pushed later")
+    metric = collector.get_commit_time(commit_metric(second))
+
+    assert metric.commit_timestamp == COMMIT_TIMESTAMP
+
+
+def test_missing_commits_fail(collector):
+    with pytest.raises(CommitLookupError):
+        collector.get_commit_time(commit_metric("f" * 40))
+
+    assert collector.get_commit_times([commit_metric("f" * 40)]) == []
+
+
+def test_missing_commits_are_fetched_once(collector, monkeypatch):
+    fetches = []
+    git_command = GitMirror._git
+
+    def counting_git(self, command, *args, **kwargs):
+        fetches.append(command)
+        return git_command(self, command, *args, **kwargs)
+
+    monkeypatch.setattr(GitMirror, "_git", counting_git)
+    missing = [commit_metric(f"{number:040x}") for number in range(3)]
+
+    assert collector.get_commit_times(missing) == []
+    # then looked up one by one, as the collectors do with unresolved commits
+    for metric in missing:
+        with pytest.raises(CommitLookupError):
+            collector.get_commit_time(metric)
+
+    assert fetches == ["fetch"]
+
+
+def test_mirrors_are_read_when_fetching_fails(collector, origin, monkeypatch):
+    first = git("rev-parse", "HEAD", cwd=origin)
+    fetches = []
+
+    def failing_git(self, command, *args, **kwargs):
+        fetches.append(command)
+        raise GitError(f"git {command} of {self.url} failed")
+
+    monkeypatch.setattr(GitMirror, "_git", failing_git)
+    metrics = [commit_metric(first), commit_metric("f" * 40)]
+
+    assert collector.get_commit_times(metrics) == metrics[:1]
+    with pytest.raises(CommitLookupError):
+        collector.get_commit_time(metrics[1])
+    assert collector.get_commit_time(commit_metric(first)).commit_timestamp
+
+    assert fetches == ["fetch"]
+
+
+def test_failed_clones_are_retried_later(tmp_path, monkeypatch):
+    clones = []
+    git_command = GitMirror._git
+
+    def counting_git(self, command, *args, **kwargs):
+        clones.append(command)
+        return git_command(self, command, *args, **kwargs)
+
+    monkeypatch.setattr(GitMirror, "_git", counting_git)
+    mirror = GitMirror(
+        url=str(tmp_path / "missing"), path=tmp_path / "mirror.git", fetch_interval=60
+    )
+
+    for _ in range(2):
+        with pytest.raises(GitError):
+            mirror.read_commits(["f" * 40])
+    assert clones == ["clone"]
+
+    mirror._fetched_at -= MIN_FORCED_FETCH_INTERVAL
+    with pytest.raises(GitError):
+        mirror.read_commits(["f" * 40])
+    assert clones == ["clone", "clone"]
+
+
+def test_mirrors_are_cloned_on_first_use(tmp_path, origin):
+    first = commit(origin, "initial commit")
+    mirror = GitMirror(url=str(origin), path=tmp_path / "mirror.git", fetch_interval=60)
+    try:
+        found = mirror.read_commits([first, "not a hash"])
+    finally:
+        mirror.close()
+
+    assert list(found) == [first]
+    object_hash, content = found[first]
+    assert object_hash == first
+    assert b"initial commit" in content
+
+
+def test_committer_date_is_parsed():
+    commit_object = (
+        b"tree 4b825dc642cb6eb9a060e54bf8d69288fbee4904\n"
+        b"author A <a@example.com> 1672531200 +0000\n"
+        b"committer C <c@example.com> 1672534800 -0130\n"
+        b"\n"
+        b"committer 1 +0000 in the message\n"
+    )
+
+    assert parse_committer_date(commit_object) == datetime(
+        2022, 12, 31, 23, 30, tzinfo=timezone(-timedelta(hours=1, minutes=30))
+    )
+    assert parse_committer_date(b"tree 4b825dc\n\nno committer\n") is None
@@ -0,0 +1,92 @@
+from unittest.mock import NonCallableMock
+
+import requests
+
+from committime import CommitMetric
+from committime.collector_gitea import COMMITS_PER_PAGE, GiteaCommitCollector
+
+SERVER = "https://gitea.example.com"
+COMMIT_DATE = "2023-01-01T00:00:00Z"
+
+
+class FakeSession(requests.Session):
+    "Lists the recent commits it was given, whatever the repository."
+
+    def __init__(self, recent_commits: list[str]):
+        super().__init__()
+        self.recent_commits = recent_commits
+        self.listings: list[dict] = []
+
+    def get(self, url, params=None, **kwargs):
+        self.listings.append(dict(url=url, **params))
+        start = (params["page"] - 1) * params["limit"]
+        commits = [
+            {
+                "sha": sha,
+                "html_url": f"{SERVER}/dora-metrics/todolist/commit/{sha}",
+                "commit": {"committer": {"date": COMMIT_DATE}},
+            }
+            for sha in self.recent_commits[start : start + params["limit"]]
+        ]
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = requests.compat.json.dumps(commits).encode()
+        return response
+
+
+def gitea_collector(session: FakeSession, **kwargs) -> GiteaCommitCollector:
+    collector = GiteaCommitCollector(
+        kube_client=NonCallableMock(),
+        username="user",
+        token="token",
+        git_api=SERVER,
+        **kwargs,
+    )
+    collector.session = session
+    return collector
+
+
+def commit(commit_hash: str) -> CommitMetric:
+    metric = CommitMetric("todolist", commit_hash=commit_hash)
+    metric.repo_url = f"{SERVER}/dora-metrics/todolist"
+    return metric
+
+
+def test_recent_commits_are_listed_once_per_repository():
+    recent_commits = [f"{number:040x}" for number in range(COMMITS_PER_PAGE * 3)]
+    session = FakeSession(recent_commits)
+    collector = gitea_collector(session, commit_prefetch_pages=2)
+
+    metrics = [
+        commit(recent_commits[1]),
+        commit(recent_commits[2]),
+        commit(recent_commits[COMMITS_PER_PAGE]),
+    ]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics
+    assert [listing["page"] for listing in session.listings] == [1, 2]
+    assert session.listings[0]["url"] == (
+        f"{SERVER}/api/v1/repos/dora-metrics/todolist/commits"
+    )
+    assert metrics[-1].commit_timestamp == 1672531200.0
+    assert metrics[-1].commit_link == (
+        f"{SERVER}/dora-metrics/todolist/commit/{recent_commits[COMMITS_PER_PAGE]}"
+    )
+
+
+def test_single_commits_are_not_listed():
+    session = FakeSession([f"{1:040x}"])
+    collector = gitea_collector(session)
+
+    assert collector.get_commit_times([commit(f"{1:040x}")]) == []
+    assert session.listings == []
+
+
+def test_commit_links_match_the_api():
+    collector = gitea_collector(FakeSession([]))
+
+    assert collector.commit_link(commit("a" * 40)) == (
+        f"{SERVER}/dora-metrics/todolist/commit/{'a' * 40}"
+    )
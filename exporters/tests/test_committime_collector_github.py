@@ -0,0 +1,259 @@
+from typing import Optional
+from unittest.mock import NonCallableMock
+
+import pytest
+import requests
+
+from committime import CommitMetric
+from committime.collector_base import CommitLookupError, is_permanent_failure
+from committime.collector_github import COMMITS_PER_PAGE, GitHubCommitCollector
+from pelorus.utils import Url
+from provider_common.ratelimit import RateLimitExceeded
+
+COMMIT_DATE = "2023-01-01T00:00:00Z"
+COMMIT_TIMESTAMP = 1672531200.0
+AAA = "a" * 40
+BBB = "b" * 40
+CCC = "c" * 40
+MISSING = "d" * 40
+
+
+class FakeSession(requests.Session):
+    """
+    Answers GraphQL commit queries with the commits it knows of,
+    or with the given status code.
+    """
+
+    def __init__(
+        self,
+        commits: dict[str, str],
+        status_code: int = 200,
+        recent_commits: Optional[list[str]] = None,
+    ):
+        super().__init__()
+        self.commits = commits
+        self.status_code = status_code
+        self.recent_commits = recent_commits or []
+        self.queries: list[dict] = []
+        self.listings: list[dict] = []
+
+    def get(self, url, params=None, **kwargs):
+        "Lists the recent commits, whatever the repository."
+        self.listings.append(dict(url=url, **params))
+        start = (params["page"] - 1) * params["per_page"]
+        commits = [
+            {
+                "sha": sha,
+                "html_url": f"https://github.com/dora-metrics/todolist/commit/{sha}",
+                "commit": {"committer": {"date": COMMIT_DATE}},
+            }
+            for sha in self.recent_commits[start : start + params["per_page"]]
+        ]
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = requests.compat.json.dumps(commits).encode()
+        return response
+
+    def post(self, url, json=None, **kwargs):
+        self.queries.append(dict(url=url, **json))
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = url
+        # every repository alias gets every commit, the collector picks its own
+        commits = {
+            f"c{name[len('oid'):]}": (
+                {"committedDate": COMMIT_DATE, "url": self.commits[oid]}
+                if oid in self.commits
+                else None
+            )
+            for name, oid in json["variables"].items()
+            if name.startswith("oid")
+        }
+        data = {
+            f"r{name[len('owner'):]}": commits
+            for name in json["variables"]
+            if name.startswith("owner")
+        }
+        response._content = requests.compat.json.dumps({"data": data}).encode()
+        return response
+
+
+def commit(repo: str, commit_hash: str) -> CommitMetric:
+    metric = CommitMetric("app", commit_hash=commit_hash)
+    metric.repo_url = f"https://github.com/dora-metrics/{repo}"
+    return metric
+
+
+def github_collector(
+    session: FakeSession, git_api: Optional[str] = None, **kwargs
+) -> GitHubCommitCollector:
+    if git_api:
+        kwargs["git_api"] = git_api
+    collector = GitHubCommitCollector(
+        kube_client=NonCallableMock(), username="user", token="token", **kwargs
+    )
+    collector.session = session
+    return collector
+
+
+def test_commits_are_looked_up_in_batches():
+    session = FakeSession(
+        {
+            AAA: f"https://github.com/dora-metrics/todolist/commit/{AAA}",
+            BBB: f"https://github.com/dora-metrics/todolist/commit/{BBB}",
+            CCC: f"https://github.com/dora-metrics/pelorus/commit/{CCC}",
+        }
+    )
+    collector = github_collector(session, graphql_batch_size=3)
+
+    metrics = [
+        commit("todolist", AAA),
+        commit("pelorus", CCC),
+        commit("todolist", BBB),
+        commit("todolist", MISSING),
+    ]
+    resolved = collector.get_commit_times(metrics)
+
+    assert len(session.queries) == 2
+    assert session.queries[0]["url"] == "https://api.github.com/graphql"
+    assert session.queries[0]["variables"] == {
+        "owner0": "dora-metrics",
+        "name0": "pelorus",
+        "oid0": CCC,
+        "owner1": "dora-metrics",
+        "name1": "todolist",
+        "oid1": AAA,
+        "oid2": BBB,
+    }
+    assert sorted(metric.commit_hash for metric in resolved) == [AAA, BBB, CCC]
+    assert all(metric.commit_timestamp == COMMIT_TIMESTAMP for metric in resolved)
+    assert metrics[0].commit_link == session.commits[AAA]
+    assert metrics[3].commit_time is None
+
+
+def test_abbreviated_hashes_are_left_out_of_graphql():
+    session = FakeSession({AAA: "link", "aaaaaaa": "link"})
+    collector = github_collector(session)
+
+    metrics = [commit("todolist", AAA), commit("todolist", "aaaaaaa")]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics[:1]
+    assert session.queries[0]["variables"] == {
+        "owner0": "dora-metrics",
+        "name0": "todolist",
+        "oid0": AAA,
+    }
+
+
+def test_recent_commits_are_listed_before_graphql():
+    session = FakeSession(
+        {CCC: f"https://github.com/dora-metrics/todolist/commit/{CCC}"},
+        recent_commits=["aaa111", "bbb222"],
+    )
+    collector = github_collector(session, commit_prefetch_pages=2)
+
+    metrics = [
+        commit("todolist", "aaa"),
+        commit("todolist", "bbb"),
+        commit("todolist", CCC),
+    ]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics
+    assert len(session.listings) == 1
+    assert session.listings[0]["url"] == (
+        "https://api.github.com/repos/dora-metrics/todolist/commits"
+    )
+    assert session.listings[0]["page"] == 1
+    assert metrics[0].commit_link == (
+        "https://github.com/dora-metrics/todolist/commit/aaa111"
+    )
+    assert metrics[1].commit_timestamp == COMMIT_TIMESTAMP
+    assert session.queries[0]["variables"] == {
+        "owner0": "dora-metrics",
+        "name0": "todolist",
+        "oid0": CCC,
+    }
+
+
+def test_listing_stops_at_the_page_limit():
+    recent_commits = [f"{number:040x}" for number in range(COMMITS_PER_PAGE * 3)]
+    session = FakeSession({}, recent_commits=recent_commits)
+    collector = github_collector(session, commit_prefetch_pages=2)
+    collector.token = ""
+
+    metrics = [
+        commit("todolist", recent_commits[COMMITS_PER_PAGE + 1]),
+        commit("todolist", recent_commits[COMMITS_PER_PAGE + 2]),
+        commit("todolist", recent_commits[-1]),
+    ]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics[:2]
+    assert [listing["page"] for listing in session.listings] == [1, 2]
+
+
+def test_repositories_with_fewer_commits_than_pages_are_not_listed():
+    recent_commits = [f"{number:040x}" for number in range(3)]
+    session = FakeSession({}, recent_commits=recent_commits)
+    collector = github_collector(session, commit_prefetch_pages=3)
+    collector.token = ""
+
+    metrics = [commit("todolist", commit_hash) for commit_hash in recent_commits]
+
+    assert collector.get_commit_times(metrics) == []
+    assert session.listings == []
+
+
+def test_servers_without_graphql_use_rest():
+    session = FakeSession({}, status_code=404)
+    collector = github_collector(session, git_api="github.example.com/api/v3")
+
+    assert collector.get_commit_times([commit("todolist", AAA)]) == []
+    assert collector.get_commit_times([commit("todolist", BBB)]) == []
+
+    assert [query["url"] for query in session.queries] == [
+        "https://github.example.com/api/graphql"
+    ]
+
+
+def test_anonymous_collectors_use_rest():
+    session = FakeSession({"aaa": "link"})
+    collector = github_collector(session)
+    collector.token = ""
+
+    assert collector.get_commit_times([commit("todolist", "aaa")]) == []
+    assert session.queries == []
+
+
+def test_exceeded_rate_limits_are_transient_failures():
+    class RateLimitedSession(FakeSession):
+        def get(self, url, params=None, **kwargs):
+            raise RateLimitExceeded("api.github.com core", retry_at=2000.0)
+
+    collector = github_collector(RateLimitedSession({}))
+
+    with pytest.raises(CommitLookupError) as error:
+        collector.get_commit_time(commit("todolist", AAA))
+    assert error.value.status_code == 429
+    assert not is_permanent_failure(error.value)
+
+
+def test_commit_links_match_the_api():
+    collector = github_collector(FakeSession({}))
+    link = f"https://github.com/dora-metrics/todolist/commit/{AAA}"
+
+    assert collector.commit_link(commit("todolist", AAA)) == link
+    ssh = commit("todolist", AAA)
+    ssh.repo_url = "git@github.com:dora-metrics/todolist.git"
+    assert collector.commit_link(ssh) == link
+
+
+def test_graphql_url():
+    collector = github_collector(FakeSession({}))
+    assert collector.graphql_url == "https://api.github.com/graphql"
+
+    collector.git_api = Url.parse("github.example.com")
+    assert collector.graphql_url == "https://github.example.com/api/graphql"
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+from typing import Optional
+from unittest.mock import NonCallableMock
+
+from committime import CommitMetric
+from committime.collector_gitlab import COMMITS_PER_PAGE, GitLabCommitCollector
+
+SERVER = "https://gitlab.example.com"
+PROJECT_PATH = "dora-metrics/todolist"
+PROJECT_ID = 42
+
+
+def gitlab_commit(number: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=f"{number:040x}",
+        committed_date="2023-01-01T00:00:00.000+00:00",
+        web_url=f"{SERVER}/{PROJECT_PATH}/-/commit/{number:040x}",
+    )
+
+
+class FakeCommits:
+    def __init__(self, commits: list[SimpleNamespace]):
+        self.commits = commits
+        self.gets: list[str] = []
+        self.pages: list[int] = []
+
+    def get(self, short_hash: str) -> SimpleNamespace:
+        self.gets.append(short_hash)
+        return next(c for c in self.commits if c.id.startswith(short_hash))
+
+    def list(self, since: str, per_page: int, page: int) -> list[SimpleNamespace]:
+        self.pages.append(page)
+        return self.commits[(page - 1) * per_page : page * per_page]
+
+
+class FakeProjects:
+    def __init__(self, commits: FakeCommits):
+        self.project = SimpleNamespace(id=PROJECT_ID, commits=commits)
+        self.gets: list[tuple] = []
+
+    def get(self, id, lazy: bool = False):
+        self.gets.append((id, lazy))
+        return self.project
+
+
+def gitlab_collector(commits: list[SimpleNamespace], **kwargs):
+    collector = GitLabCommitCollector(
+        kube_client=NonCallableMock(), username="user", token="token", **kwargs
+    )
+    projects = FakeProjects(FakeCommits(commits))
+    collector._clients[SERVER] = SimpleNamespace(projects=projects)
+    return collector, projects
+
+
+def commit(commit_hash: str, repo_url: Optional[str] = None) -> CommitMetric:
+    metric = CommitMetric("todolist", commit_hash=commit_hash)
+    metric.repo_url = repo_url or f"{SERVER}/{PROJECT_PATH}"
+    return metric
+
+
+def test_clients_and_projects_are_reused():
+    collector, projects = gitlab_collector([gitlab_commit(1), gitlab_commit(2)])
+
+    collector.get_commit_time(commit(gitlab_commit(1).id))
+    collector.get_commit_time(commit(gitlab_commit(2).id))
+
+    assert projects.gets == [(PROJECT_PATH, False), (PROJECT_ID, True)]
+    assert projects.project.commits.gets == [
+        gitlab_commit(1).id[:8],
+        gitlab_commit(2).id[:8],
+    ]
+
+
+def test_recent_commits_are_listed_once_per_repository():
+    commits = [gitlab_commit(number) for number in range(COMMITS_PER_PAGE * 3)]
+    collector, projects = gitlab_collector(commits, commit_prefetch_pages=2)
+
+    metrics = [
+        commit(commits[1].id),
+        commit(commits[2].id),
+        commit(commits[COMMITS_PER_PAGE + 1].id),
+    ]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics
+    assert projects.project.commits.pages == [1, 2]
+    assert projects.project.commits.gets == []
+    assert metrics[-1].commit_link == commits[COMMITS_PER_PAGE + 1].web_url
+    assert metrics[-1].commit_timestamp == 1672531200.0
+
+
+def test_listing_stops_at_the_page_limit():
+    commits = [gitlab_commit(number) for number in range(COMMITS_PER_PAGE * 3)]
+    collector, projects = gitlab_collector(commits, commit_prefetch_pages=1)
+
+    metrics = [commit(commits[1].id), commit(commits[-1].id)]
+    resolved = collector.get_commit_times(metrics)
+
+    assert resolved == metrics[:1]
+    assert projects.project.commits.pages == [1]
+
+
+def test_single_commits_are_not_listed():
+    collector, projects = gitlab_collector([gitlab_commit(1)])
+
+    assert collector.get_commit_times([commit(gitlab_commit(1).id)]) == []
+    assert projects.project.commits.pages == []
+
+
+def test_commit_links_match_the_api():
+    collector, _ = gitlab_collector([])
+
+    assert collector.commit_link(commit(f"{1:040x}")) == gitlab_commit(1).web_url
+    assert (
+        collector.commit_link(
+            commit(f"{1:040x}", f"git@gitlab.example.com:{PROJECT_PATH}.git")
+        )
+        == gitlab_commit(1).web_url
+    )
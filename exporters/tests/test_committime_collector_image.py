@@ -0,0 +1,109 @@
+from typing import Optional
+from unittest.mock import NonCallableMagicMock, NonCallableMock
+
+from kubernetes.dynamic.resource import ResourceInstance
+
+import pelorus
+from committime.collector_image import ImageCommitCollector
+
+APP = "todolist"
+COMMIT_DATE = "Sun Jan 01 00:00:00 2023 +0000"
+COMMIT_TIMESTAMP = 1672531200.0
+
+
+def image(number: int, resource_version: str = "1", labels: Optional[dict] = None):
+    return {
+        "metadata": {
+            "name": f"sha256:{number:064x}",
+            "resourceVersion": resource_version,
+            "labels": {pelorus.DEFAULT_APP_LABEL: APP},
+            "annotations": {},
+        },
+        "dockerImageReference": f"registry/{APP}@sha256:{number:064x}",
+        "dockerImageMetadata": {
+            "Config": {
+                "Labels": labels
+                if labels is not None
+                else {
+                    "io.openshift.build.commit.date": COMMIT_DATE,
+                    "io.openshift.build.commit.id": f"{number:040x}",
+                }
+            }
+        },
+    }
+
+
+def image_list(images: list[dict], continue_token: Optional[str] = None):
+    return ResourceInstance(
+        client=None,
+        instance={
+            "kind": "ImageList",
+            "apiVersion": "image.openshift.io/v1",
+            "metadata": {"continue": continue_token} if continue_token else {},
+            "items": images,
+        },
+    )
+
+
+def image_collector(*pages: list[dict]):
+    """
+    A collector listing the images in the given pages,
+    and the mock of the Image resource.
+    """
+    v1_images = NonCallableMagicMock()
+
+    def get(label_selector, limit, _continue=None):
+        number = int(_continue or 0)
+        next_token = str(number + 1) if number + 1 < len(pages) else None
+        return image_list(pages[number], next_token)
+
+    v1_images.get.side_effect = get
+    kube_client = NonCallableMock()
+    kube_client.resources.get.return_value = v1_images
+    collector = ImageCommitCollector(
+        kube_client=kube_client,
+        username="",
+        token="",
+        date_format="%a %b %d %H:%M:%S %Y %z",
+        image_page_size=2,
+    )
+    return collector, v1_images
+
+
+def test_images_are_listed_page_by_page():
+    collector, v1_images = image_collector([image(1), image(2)], [image(3)])
+
+    metrics = list(collector.generate_metrics())
+
+    assert [metric.commit_hash for metric in metrics] == [
+        f"{number:040x}" for number in (1, 2, 3)
+    ]
+    assert all(metric.commit_timestamp == COMMIT_TIMESTAMP for metric in metrics)
+    assert [call.kwargs for call in v1_images.get.call_args_list] == [
+        dict(label_selector=collector.app_label, limit=2, _continue=None),
+        dict(label_selector=collector.app_label, limit=2, _continue="1"),
+    ]
+
+
+def test_image_metrics_are_made_once():
+    pages = [[image(1), image(2, labels={})]]
+    collector, _ = image_collector(*pages)
+    first = list(collector.generate_metrics())
+
+    pages[0][:] = [image(1), image(2, labels={})]
+    second = list(collector.generate_metrics())
+
+    assert len(first) == 1
+    assert second[0] is first[0]
+
+
+def test_changed_images_are_read_again():
+    pages = [[image(1), image(2, labels={})]]
+    collector, _ = image_collector(*pages)
+    list(collector.generate_metrics())
+
+    pages[0][:] = [image(2, resource_version="2")]
+    metrics = list(collector.generate_metrics())
+
+    assert [metric.commit_hash for metric in metrics] == [f"{2:040x}"]
+    assert list(collector._image_metrics) == [f"sha256:{2:064x}"]
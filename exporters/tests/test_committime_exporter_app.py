@@ -18,7 +18,7 @@ from unittest.mock import Mock
 import pytest
 from kubernetes.dynamic.resource import ResourceInstance
 
-from committime.app import set_up
+from committime.app import PROVIDER_CLASSES_BY_NAME, GitCommittimeConfig, set_up
 from committime.collector_azure_devops import AzureDevOpsCommitCollector
 from tests import MockExporter, get_number_of_error_logs
 
@@ -32,19 +32,15 @@ def name_space(name: str):
 namespaces = Mock()
 namespaces.get.return_value.items = {name_space("test1"), name_space("test2")}
 builds = Mock()
-builds.get.return_value = {
-    ResourceInstance(
-        client=None,
-        instance={"kind": "BuildList", "apiVersion": "build.openshift.io/v1"},
-    )
-}
+builds.get.return_value = ResourceInstance(
+    client=None,
+    instance={"kind": "BuildList", "apiVersion": "build.openshift.io/v1", "items": []},
+)
 images = Mock()
-images.get.return_value = {
-    ResourceInstance(
-        client=None,
-        instance={"kind": "ImageList", "apiVersion": "image.openshift.io/v1"},
-    )
-}
+images.get.return_value = ResourceInstance(
+    client=None,
+    instance={"kind": "ImageList", "apiVersion": "image.openshift.io/v1", "items": []},
+)
 
 
 matcher = {
@@ -218,3 +214,31 @@ def test_app_image_with_all_options(caplog: pytest.LogCaptureFixture):
     assert "date_format='custom format'" in caplog.text
     assert mocked_exporter.date_format == "custom format"
     assert get_number_of_error_logs(caplog.record_tuples) == 0
+
+
+@pytest.mark.parametrize("git_provider", sorted(PROVIDER_CLASSES_BY_NAME))
+def test_git_providers_make_their_collector(git_provider: str):
+    config = GitCommittimeConfig(kube_client=Mock(), git_provider=git_provider)
+
+    collector = config.make_collector()
+
+    assert isinstance(collector, PROVIDER_CLASSES_BY_NAME[git_provider])
+
+
+@pytest.mark.parametrize("git_provider", sorted(PROVIDER_CLASSES_BY_NAME))
+def test_git_providers_share_the_common_settings(git_provider: str):
+    config = GitCommittimeConfig(
+        kube_client=Mock(),
+        git_provider=git_provider,
+        commit_cache_size=10,
+        commit_retry_backoff=5,
+        commit_prefetch_pages=7,
+        commit_prefetch_days=30,
+    )
+
+    collector = config.make_collector()
+
+    assert collector.commit_cache_size == 10
+    assert collector.commit_retry_backoff == 5
+    assert collector.commit_prefetch_pages == 7
+    assert collector.commit_prefetch_days == 30
@@ -15,24 +15,56 @@
 #
 
 
+import hashlib
+import json
+import shutil
 import subprocess
+import threading
 import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, NonCallableMock, patch
 
 import pytest
+from kubernetes.dynamic.resource import ResourceInstance
 
+import committime.collector_containerimage as collector_containerimage
 from committime.collector_containerimage import (
+    ContainerImageCommitCollector,
     SkopeoDataException,
+    _add_image_to_get_label_queue,
+    _add_to_cleanup_set,
     _cache_container_images_labels,
+    _cleanup_cache,
+    _clear_cleanup_set,
+    _collect_label_queue_metrics,
+    _process_queued_image,
+    _registry_busy,
+    _registry_waiting,
+    _release_registry_slot,
     get_labels_from_image,
     image_label_cache,
-    skopeo_failures,
+    image_label_failures,
+    image_shas_uris_queue,
+    sha_in_queue,
+)
+from provider_common.registry import (
+    DOCKER_MANIFEST_LIST,
+    OCI_MANIFEST,
+    ImageReference,
+    RegistryClient,
+    RegistryError,
 )
 
 TEST_DATA_DIR = Path(__file__).resolve().parent / "data"
 
 
+@pytest.fixture(autouse=True)
+def clear_failures():
+    yield
+    image_label_failures.clear()
+
+
 @pytest.fixture
 def mock_popen():
     with patch("subprocess.Popen") as mock_popen:
@@ -85,7 +117,7 @@ def test_get_labels_from_image(mock_popen, returncode, json_file, expected_label
     )
     mocked_process.communicate.assert_called_once()
 
-    assert "sha256_value" not in skopeo_failures
+    assert "sha256_value" not in image_label_failures
 
 
 @pytest.mark.parametrize(
@@ -118,7 +150,7 @@ def test_missing_labels_from_image(mock_popen, returncode, json_file, missing_la
     )
     mocked_process.communicate.assert_called_once()
 
-    assert "sha256_value" not in skopeo_failures
+    assert "sha256_value" not in image_label_failures
 
 
 @pytest.mark.parametrize(
@@ -149,7 +181,7 @@ def test_malformed_json_response(mock_popen, returncode, json_file):
     )
     mocked_process.communicate.assert_called_once()
 
-    assert "sha256_value" in skopeo_failures
+    assert "sha256_value" in image_label_failures
 
 
 def test_cache_container_images_labels():
@@ -158,9 +190,375 @@ def test_cache_container_images_labels():
 
     current_time = time.time()
 
-    with patch("time.time") as mock_time:
-        mock_time.return_value = current_time
+    with patch.object(image_label_cache, "timer", return_value=current_time):
         _cache_container_images_labels(sha_256, labels)
 
     assert sha_256 in image_label_cache
-    assert image_label_cache[sha_256] == (labels, current_time)
+    assert (sha_256, labels, current_time) in image_label_cache.entries()
+
+
+def test_labels_are_kept_while_running_pods_use_the_image():
+    _cache_container_images_labels("sha256:running", {"label": "running"})
+    _cache_container_images_labels("sha256:gone", {"label": "gone"})
+    _clear_cleanup_set()
+    _add_to_cleanup_set("sha256:running")
+
+    # however long ago they were read
+    with patch("time.time", return_value=time.time() + 365 * 24 * 60 * 60):
+        _cleanup_cache()
+
+    assert image_label_cache.get("sha256:running") == {"label": "running"}
+    assert "sha256:gone" not in image_label_cache
+    _clear_cleanup_set()
+    image_label_cache.pop("sha256:running")
+
+
+def test_cached_pods_are_left_unchanged():
+    sha = "sha256:" + "c" * 64
+    pod = ResourceInstance(
+        client=None,
+        instance={
+            "kind": "Pod",
+            "metadata": {
+                "namespace": "todolist",
+                "labels": {"app.kubernetes.io/name": "todolist"},
+                "ownerReferences": [{"uid": "replicaset"}],
+            },
+            "status": {
+                "containerStatuses": [{"imageID": f"quay.io/pelorus/todolist@{sha}"}]
+            },
+        },
+    )
+    collector = ContainerImageCommitCollector(
+        kube_client=NonCallableMock(),
+        username="",
+        token="",
+        namespaces={"todolist"},
+        date_format="%a %b %d %H:%M:%S %Y %z",
+    )
+    # as an informer cache, giving the same pods to each collection
+    collector._pod_cache = Mock(get_running_pods=Mock(return_value=[pod]))
+    _cache_container_images_labels(
+        sha,
+        {
+            "io.openshift.build.commit.id": "abc",
+            "io.openshift.build.commit.date": "1672531200",
+        },
+    )
+
+    with patch.object(collector_containerimage, "_add_image_to_get_label_queue"):
+        first = list(collector.generate_metrics())
+        image_label_cache.pop(sha)
+        second = list(collector.generate_metrics())
+
+    assert [(m.commit_hash, m.commit_timestamp) for m in first] == [
+        ("abc", 1672531200.0)
+    ]
+    assert second == []
+    assert pod.metadata.commit_hash is None
+    _clear_cleanup_set()
+
+
+def failing_skopeo(mock_popen, stderr: bytes):
+    mocked_process = Mock()
+    mocked_process.returncode = 1
+    mocked_process.communicate.return_value = (b"", stderr)
+    mock_popen.return_value = mocked_process
+
+
+@pytest.mark.parametrize(
+    "stderr, auth, first_backoff",
+    [
+        (b"connection refused", False, 60),
+        (b"unauthorized: authentication required", True, 60 * 60),
+    ],
+)
+def test_failures_are_retried_with_backoff(mock_popen, stderr, auth, first_backoff):
+    failing_skopeo(mock_popen, stderr)
+    now = time.time()
+
+    with pytest.raises(SkopeoDataException):
+        get_labels_from_image("sha256:failing", "image_uri")
+    failure = image_label_failures.get("sha256:failing")
+    assert failure.auth == auth
+    assert now + first_backoff / 2 <= failure.retry_at <= time.time() + first_backoff
+
+    # not read again until the backoff is over
+    with pytest.raises(SkopeoDataException, match="Sha not to be checked"):
+        get_labels_from_image("sha256:failing", "image_uri")
+    assert mock_popen.call_count == 1
+
+    later = failure.retry_at
+    with patch("time.time", return_value=later):
+        with pytest.raises(SkopeoDataException):
+            get_labels_from_image("sha256:failing", "image_uri")
+    failure = image_label_failures.get("sha256:failing")
+    assert failure.attempts == 2
+    assert later + first_backoff <= failure.retry_at <= later + 2 * first_backoff
+
+
+@pytest.fixture
+def label_queue():
+    yield image_shas_uris_queue
+    while not image_shas_uris_queue.empty():
+        image_shas_uris_queue.get_nowait()
+        image_shas_uris_queue.task_done()
+    sha_in_queue.clear()
+    _registry_busy.clear()
+    _registry_waiting.clear()
+
+
+def queue_metrics() -> dict:
+    return {
+        sample.name: sample.value
+        for family in _collect_label_queue_metrics()
+        for sample in family.samples
+    }
+
+
+def test_images_are_queued_once_newest_pods_first(label_queue):
+    _add_image_to_get_label_queue("sha256:old", "docker://quay.io/a/b@old", 100.0)
+    _add_image_to_get_label_queue("sha256:new", "docker://quay.io/a/b@new", 200.0)
+    _add_image_to_get_label_queue("sha256:old", "docker://quay.io/a/b@old", 300.0)
+
+    assert label_queue.qsize() == 2
+    assert queue_metrics()["pelorus_image_label_queue_depth"] == 2
+    assert label_queue.get_nowait()[2] == "sha256:new"
+    assert label_queue.get_nowait()[2] == "sha256:old"
+    label_queue.task_done()
+    label_queue.task_done()
+
+
+def test_images_wait_for_a_free_slot_of_their_registry(label_queue):
+    image_uri = "docker://quay.io/pelorus/todolist@sha256:busy"
+    _add_image_to_get_label_queue("sha256:busy", image_uri)
+    _registry_busy["quay.io"] = 2
+    lookups = queue_metrics()["pelorus_image_label_lookup_seconds_count"]
+
+    with patch(
+        "committime.collector_containerimage.get_labels_from_image",
+        return_value={"label": "value"},
+    ) as get_labels:
+        _process_queued_image(label_queue.get_nowait())
+        label_queue.task_done()
+
+        get_labels.assert_not_called()
+        assert label_queue.empty()
+        assert queue_metrics()["pelorus_image_label_queue_depth"] == 1
+
+        _release_registry_slot("quay.io")
+        _process_queued_image(label_queue.get_nowait())
+        label_queue.task_done()
+
+    get_labels.assert_called_once_with("sha256:busy", image_uri)
+    assert image_label_cache.get("sha256:busy") == {"label": "value"}
+    assert "sha256:busy" not in sha_in_queue
+    assert _registry_busy["quay.io"] == 1
+    metrics = queue_metrics()
+    assert metrics["pelorus_image_label_queue_depth"] == 0
+    assert metrics["pelorus_image_label_lookup_seconds_count"] == lookups + 1
+
+
+REGISTRY_LABELS = {
+    "io.openshift.build.commit.date": "Tue May 16 20:07:52 2023 +0200",
+    "io.openshift.build.commit.id": "66f3dc5d6a36afb35e751309207e7c4f137e56b7",
+}
+
+
+def digest_of(content: bytes) -> str:
+    return "sha256:" + hashlib.sha256(content).hexdigest()
+
+
+class FakeRegistry(ThreadingHTTPServer):
+    """
+    A registry serving one image, for its platform and in a manifest list,
+    to holders of the tokens it gives.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRegistryHandler)
+        self.token_requests: list[str] = []
+        self.requests: list[str] = []
+        self.connections: set[int] = set()
+        config = json.dumps(
+            {"architecture": "amd64", "config": {"Labels": REGISTRY_LABELS}}
+        ).encode()
+        manifest = json.dumps(
+            {
+                "schemaVersion": 2,
+                "mediaType": OCI_MANIFEST,
+                "config": {"digest": digest_of(config), "size": len(config)},
+            }
+        ).encode()
+        manifest_list = json.dumps(
+            {
+                "schemaVersion": 2,
+                "mediaType": DOCKER_MANIFEST_LIST,
+                "manifests": [
+                    {"digest": "sha256:" + "0" * 64, "platform": {"os": "windows"}},
+                    {
+                        "digest": digest_of(manifest),
+                        "platform": {"os": "linux", "architecture": "amd64"},
+                    },
+                ],
+            }
+        ).encode()
+        self.manifest_digest = digest_of(manifest)
+        self.manifest_list_digest = digest_of(manifest_list)
+        self.content = {
+            f"manifests/{self.manifest_digest}": manifest,
+            f"manifests/{self.manifest_list_digest}": manifest_list,
+            f"blobs/{digest_of(config)}": config,
+        }
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self.server_port}"
+
+    def uri(self, digest: str, repository: str = "pelorus/todolist") -> str:
+        return f"docker://{self.host}/{repository}@{digest}"
+
+
+class FakeRegistryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeRegistry
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address[1])
+        if self.path.startswith("/token?"):
+            self.server.token_requests.append(self.path)
+            self.reply(200, json.dumps({"token": "pull-token"}).encode())
+            return
+        self.server.requests.append(self.path)
+        if self.headers.get("Authorization") != "Bearer pull-token":
+            realm = f"http://{self.server.host}/token"
+            self.reply(
+                401,
+                b"",
+                {"WWW-Authenticate": f'Bearer realm="{realm}",service="fake"'},
+            )
+            return
+        content = self.server.content.get(self.path.split("/", 4)[-1])
+        if content is None:
+            self.reply(404, b"")
+        else:
+            self.reply(200, content)
+
+    def reply(self, status: int, body: bytes, headers: dict = {}):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def fake_registry():
+    registry = FakeRegistry()
+    thread = threading.Thread(target=registry.serve_forever, daemon=True)
+    thread.start()
+    yield registry
+    registry.shutdown()
+    registry.server_close()
+
+
+@pytest.fixture
+def registry_client(fake_registry):
+    client = RegistryClient(scheme="http", architecture="amd64")
+    with patch.object(collector_containerimage, "_registry_client", client):
+        yield client
+
+
+def test_labels_are_read_from_the_registry(fake_registry, registry_client):
+    manifest_list = ImageReference.parse(
+        fake_registry.uri(fake_registry.manifest_list_digest)
+    )
+    manifest = ImageReference.parse(fake_registry.uri(fake_registry.manifest_digest))
+
+    assert registry_client.get_labels(manifest_list) == REGISTRY_LABELS
+    assert registry_client.get_labels(manifest) == REGISTRY_LABELS
+
+    # one token for the repository, over one connection
+    assert len(fake_registry.token_requests) == 1
+    assert "scope=repository%3Apelorus%2Ftodolist%3Apull" in (
+        fake_registry.token_requests[0]
+    )
+    assert len(fake_registry.connections) == 1
+    assert len(fake_registry.requests) == 6
+
+
+def test_missing_images_fail(fake_registry, registry_client):
+    reference = ImageReference.parse(fake_registry.uri("sha256:" + "f" * 64))
+
+    with pytest.raises(RegistryError):
+        registry_client.get_labels(reference)
+
+
+def test_labels_from_the_registry_skip_skopeo(
+    mock_popen, fake_registry, registry_client
+):
+    sha = fake_registry.manifest_digest
+
+    labels = get_labels_from_image(sha, fake_registry.uri(sha))
+
+    assert labels == REGISTRY_LABELS
+    mock_popen.assert_not_called()
+    assert sha not in image_label_failures
+
+
+def test_skopeo_reads_what_the_registry_could_not(
+    mock_popen, fake_registry, registry_client
+):
+    mocked_process = Mock()
+    mocked_process.returncode = 0
+    mocked_process.communicate.return_value = (
+        read_skopeo_fake_data("skopeo_default_container_labels.json"),
+        b"",
+    )
+    mock_popen.return_value = mocked_process
+    sha = "sha256:" + "e" * 64
+    image_uri = fake_registry.uri(sha, repository="pelorus/private")
+
+    labels = get_labels_from_image(sha, image_uri)
+
+    assert "io.openshift.build.commit.id" in labels
+    mock_popen.assert_called_once()
+    assert image_uri in mock_popen.call_args.args[0]
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not shutil.which("skopeo"), reason="skopeo is not installed")
+def test_registry_client_is_faster_than_skopeo(fake_registry, registry_client):
+    """
+    Benchmark reading the labels of the same image with both.
+    """
+    image_uri = fake_registry.uri(fake_registry.manifest_list_digest)
+    reference = ImageReference.parse(image_uri)
+    rounds = 20
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        registry_client.get_labels(reference)
+    native = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        output = subprocess.run(
+            ["skopeo", "inspect", "--tls-verify=false", image_uri],
+            check=True,
+            capture_output=True,
+        ).stdout
+        assert json.loads(output)["Labels"] == REGISTRY_LABELS
+    skopeo = time.perf_counter() - start
+
+    # skopeo starts a process for each image, which alone takes far longer
+    assert native * 2 < skopeo, (
+        f"registry client: {native / rounds * 1000:.1f}ms per image, "
+        f"skopeo: {skopeo / rounds * 1000:.1f}ms per image"
+    )
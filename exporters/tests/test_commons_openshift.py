@@ -1,6 +1,14 @@
+import threading
+from unittest.mock import NonCallableMagicMock
+
 import pytest
+from kubernetes.dynamic.resource import ResourceInstance
 
-from provider_common.openshift import _parse_container_image_uri
+from provider_common.openshift import (
+    PodInformerCache,
+    _parse_container_image_uri,
+    filter_pods_by_replica_uid,
+)
 
 
 @pytest.mark.parametrize(
@@ -50,3 +58,105 @@ def test_image_sha_bad_uri(registry: str, image: str, sha: str) -> None:
     assert ret_registry is None
     assert ret_image is None
     assert ret_sha is None
+
+
+class WatchedResource:
+    "Lists the given objects, and watches without receiving any change until stopped."
+
+    def __init__(self, kind: str, items: list[dict], stopped: threading.Event):
+        self.kind = kind
+        self.items = items
+        self.stopped = stopped
+        self.lists = 0
+
+    def get(self, **kwargs):
+        self.lists += 1
+        return ResourceInstance(
+            client=None,
+            instance={
+                "kind": f"{self.kind}List",
+                "apiVersion": "v1",
+                "metadata": {"resourceVersion": "1"},
+                "items": self.items,
+            },
+        )
+
+    def watch(self, **kwargs):
+        self.stopped.wait(5)
+        return iter([])
+
+
+def owned_pod(name: str, namespace: str, owner_kind: str, owner_uid: str) -> dict:
+    return {
+        "metadata": {
+            "name": name,
+            "uid": f"{name}-uid",
+            "namespace": namespace,
+            "ownerReferences": [
+                {"kind": owner_kind, "uid": owner_uid, "name": owner_uid}
+            ],
+        }
+    }
+
+
+@pytest.fixture
+def pod_cache():
+    stopped = threading.Event()
+    resources = {
+        "Pod": WatchedResource(
+            "Pod",
+            [
+                owned_pod("todo-1", "todo", "ReplicaSet", "rs-1"),
+                owned_pod("todo-2", "todo", "ReplicaSet", "rs-1"),
+                owned_pod("blog-1", "blog", "ReplicationController", "rc-1"),
+                owned_pod("job-1", "todo", "Job", "job-1"),
+            ],
+            stopped,
+        ),
+        "ReplicaSet": WatchedResource(
+            "ReplicaSet", [{"metadata": {"name": "rs-1", "uid": "rs-1"}}], stopped
+        ),
+        "ReplicationController": WatchedResource(
+            "ReplicationController",
+            [{"metadata": {"name": "rc-1", "uid": "rc-1"}}],
+            stopped,
+        ),
+    }
+    client = NonCallableMagicMock()
+    client.resources.get.side_effect = lambda api_version, kind: resources[kind]
+
+    cache = PodInformerCache(client=client)
+    yield cache, resources
+    stopped.set()
+    cache.stop(timeout=5)
+
+
+def test_pod_informer_cache_serves_pods_from_memory(pod_cache):
+    cache, resources = pod_cache
+
+    pods = cache.get_running_pods({"todo"})
+    pods_again = cache.get_running_pods({"todo"})
+
+    assert sorted(pod.metadata.name for pod in pods) == ["todo-1", "todo-2"]
+    assert len(pods_again) == 2
+    assert {kind: r.lists for kind, r in resources.items()} == {
+        "Pod": 1,
+        "ReplicaSet": 1,
+        "ReplicationController": 1,
+    }
+
+
+def test_pod_informer_cache_finds_owners_by_uid(pod_cache):
+    cache, resources = pod_cache
+
+    replicas = filter_pods_by_replica_uid(cache.get_running_pods())
+    owners = {
+        uid: cache.get_owner_object_from_child(uid, pod)[uid]
+        for uid, pod in replicas.items()
+    }
+
+    assert {uid: owner.metadata.name for uid, owner in owners.items()} == {
+        "rs-1": "rs-1",
+        "rc-1": "rc-1",
+    }
+    assert resources["ReplicaSet"].lists == 1
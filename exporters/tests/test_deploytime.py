@@ -3,7 +3,7 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from random import randrange
 from typing import Optional
-from unittest.mock import NonCallableMock, patch
+from unittest.mock import NonCallableMock
 
 import attrs
 import pytest
@@ -13,6 +13,7 @@ from openshift.dynamic.discovery import Discoverer  # type: ignore
 import pelorus
 from deploytime import DeployTimeMetric
 from deploytime.app import DeployTimeCollector
+from pelorus.utils.pagination import METADATA_ONLY_ACCEPT
 from tests.openshift_mocks import (
     Container,
     ContainerStatus,
@@ -259,14 +260,24 @@ def test_generate_normal_case() -> None:
         ),
     }
 
-    with patch("deploytime.app.get_owner_object_from_child") as owner_refs:
-        owner_refs.return_value = {
-            foo_rep_uid: foo_rep,
-            bar_rep_uid: bar_rep,
-            quux_rep_uid: quux_rep,
-        }
-        actual = set(collector.generate_metrics())
-        assert actual == expected
+    actual = set(collector.generate_metrics())
+    assert actual == expected
+
+    # replicas are listed once per kind and namespace, not once per replica
+    rep_list_calls = {
+        kind: sorted(call.kwargs["namespace"] for call in mock.get.call_args_list)
+        for kind, mock in data.replicators_by_kind.items()
+    }
+    assert rep_list_calls == {
+        REP_CONTROLLER: [FOO_NS],
+        REPLICA_SET: [BAR_NS, QUUX_NS],
+    }
+    # only their metadata is asked for
+    assert all(
+        call.kwargs["header_params"] == {"Accept": METADATA_ONLY_ACCEPT}
+        for mock in data.replicators_by_kind.values()
+        for call in mock.get.call_args_list
+    )
 
 
 @pytest.mark.xfail(reason="Bug with different rep kinds with same name and namespace")
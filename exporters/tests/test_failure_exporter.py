@@ -20,10 +20,11 @@ from typing import Optional
 from unittest import mock  # NOQA
 
 import pytest
+import requests
 from jira.exceptions import JIRAError
 from jira.resources import Issue
 
-from failure import collector_jira
+from failure import collector_github, collector_jira
 from failure.collector_github import GithubFailureCollector
 from failure.collector_jira import DEFAULT_JQL_SEARCH_QUERY, JiraFailureCollector
 from pelorus.config import load_and_log
@@ -377,6 +378,79 @@ def test_github_closed_issue_search_issues(monkeypatch: pytest.MonkeyPatch):
     assert critical_issues[0].resolutiondate == float(1653672080.0)
 
 
+def issues_page(numbers: list[int], next_url: Optional[str] = None, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response.url = "https://api.github.com/repos/org/repo/issues"
+    response._content = json.dumps([{"number": n} for n in numbers]).encode()
+    if next_url:
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    if status != 200:
+        response.headers["x-ratelimit-remaining"] = "0"
+    return response
+
+
+def github_issue_pages(monkeypatch: pytest.MonkeyPatch, pages: list[requests.Response]):
+    collector = setup_github_collector(monkeypatch)
+    collector.projects = {"org/repo"}
+    requested = []
+
+    def get(url, headers=None, params=None):
+        requested.append((url, params))
+        return pages.pop(0)
+
+    monkeypatch.setattr(collector.session, "get", get)
+    return collector, requested
+
+
+def test_github_issues_are_paginated(monkeypatch: pytest.MonkeyPatch):
+    page_2 = "https://api.github.com/repositories/1/issues?state=all&page=2"
+    collector, requested = github_issue_pages(
+        monkeypatch, [issues_page([4, 3], next_url=page_2), issues_page([2, 1])]
+    )
+
+    issues = collector.get_issues()
+
+    assert [issue["number"] for issue in issues] == [4, 3, 2, 1]
+    assert requested[0][1] == {"state": "all", "per_page": "100"}
+    assert requested[1] == (page_2, None)
+
+
+def test_github_issue_pages_are_capped(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(collector_github, "MAX_ISSUE_PAGES", 2)
+    next_url = "https://api.github.com/repositories/1/issues?page=next"
+    collector, requested = github_issue_pages(
+        monkeypatch,
+        [issues_page([n], next_url=next_url) for n in (3, 2, 1)],
+    )
+
+    issues = collector.get_issues()
+
+    assert [issue["number"] for issue in issues] == [3, 2]
+    assert len(requested) == 2
+
+
+def test_github_issue_pages_keep_newest_when_rate_limited(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    next_url = "https://api.github.com/repositories/1/issues?page=next"
+    collector, _ = github_issue_pages(
+        monkeypatch,
+        [issues_page([3], next_url=next_url), issues_page([], status=403)],
+    )
+
+    issues = collector.get_issues()
+
+    assert [issue["number"] for issue in issues] == [3]
+
+
+def test_github_issues_rate_limited_on_first_page(monkeypatch: pytest.MonkeyPatch):
+    collector, _ = github_issue_pages(monkeypatch, [issues_page([], status=403)])
+
+    with pytest.raises(requests.HTTPError):
+        collector.get_issues()
+
+
 def test_default_jql_search_query():
     env = {collector_jira.JQL_SEARCH_QUERY_ENV: collector_jira.DEFAULT_JQL_SEARCH_QUERY}
     projects = {"custom", "projects"}
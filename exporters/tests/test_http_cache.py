@@ -0,0 +1,112 @@
+from typing import Optional
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from pelorus import http_cache
+from pelorus.http_cache import cache_stats, mount_conditional_cache
+
+URL = "https://api.github.com/repos/dora-metrics/pelorus/releases"
+ETAG = '"abc123"'
+
+
+class FakeServer:
+    "Serves a body with an ETag, and 304 when the request has that ETag."
+
+    def __init__(self, etag: Optional[str] = ETAG):
+        self.body = b'[{"name": "v1"}]'
+        self.etag = etag
+        self.requests: list[requests.PreparedRequest] = []
+
+    def send(self, request: requests.PreparedRequest, **kwargs):
+        self.requests.append(request.copy())
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.headers["x-ratelimit-remaining"] = str(100 - len(self.requests))
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response._content = self.body
+            response.encoding = "utf-8"
+            if self.etag:
+                response.headers["ETag"] = self.etag
+        return response
+
+
+@pytest.fixture
+def server(monkeypatch) -> FakeServer:
+    http_cache.clear()
+    server = FakeServer()
+    monkeypatch.setattr(HTTPAdapter, "send", server.send)
+    yield server
+    http_cache.clear()
+    http_cache.configure()
+
+
+def session(token: str = "token") -> requests.Session:
+    session = requests.Session()
+    session.headers["Authorization"] = f"token {token}"
+    mount_conditional_cache(session)
+    return session
+
+
+def test_unchanged_responses_are_replayed(server):
+    first = session().get(URL)
+    second = session().get(URL)
+
+    assert server.requests[1].headers["If-None-Match"] == ETAG
+    assert second.status_code == 200
+    assert second.json() == first.json() == [{"name": "v1"}]
+    # headers of the 304 response are up to date
+    assert second.headers["x-ratelimit-remaining"] == "98"
+    assert second.headers["ETag"] == ETAG
+    assert cache_stats() == (1, 1)
+
+
+def test_changed_responses_are_downloaded(server):
+    session().get(URL)
+    server.etag = '"def456"'
+    server.body = b'[{"name": "v2"}]'
+
+    assert session().get(URL).json() == [{"name": "v2"}]
+    assert session().get(URL).json() == [{"name": "v2"}]
+    assert cache_stats() == (1, 2)
+
+
+def test_responses_are_cached_by_credentials(server):
+    session("token").get(URL)
+    session("other").get(URL)
+
+    assert "If-None-Match" not in server.requests[1].headers
+    assert cache_stats() == (0, 2)
+
+
+def test_responses_without_validators_are_not_cached(server):
+    server.etag = None
+    session().get(URL)
+    session().get(URL)
+
+    assert "If-None-Match" not in server.requests[1].headers
+    assert cache_stats() == (0, 2)
+
+
+def test_cached_responses_are_bounded_in_size(server):
+    # bodies are held in base64, taking 24 bytes each
+    http_cache.configure(max_bytes=60, max_body_size=24)
+    for page in range(3):
+        session().get(f"{URL}?page={page}")
+
+    # the first page was evicted
+    for page in reversed(range(3)):
+        session().get(f"{URL}?page={page}")
+    assert cache_stats() == (2, 4)
+
+    # 28 bytes once encoded
+    server.body = b"x" * 19
+    session().get(f"{URL}?page=3")
+    session().get(f"{URL}?page=3")
+    assert "If-None-Match" not in server.requests[-1].headers
@@ -0,0 +1,144 @@
+from typing import Optional
+
+import pytest
+from kubernetes.client.rest import ApiException
+from kubernetes.dynamic.resource import ResourceInstance
+
+from provider_common.informer import InformerNotSyncedError, ResourceInformer
+
+APP_LABEL = "app.kubernetes.io/name"
+
+
+def build(uid: str, app: str, resource_version: str, namespace: str = "ns") -> dict:
+    return {
+        "kind": "Build",
+        "metadata": {
+            "uid": uid,
+            "name": f"{app}-{uid}",
+            "namespace": namespace,
+            "resourceVersion": resource_version,
+            "labels": {APP_LABEL: app},
+        },
+    }
+
+
+class FakeResource:
+    """
+    Serves lists and watch events like a dynamic client Resource.
+    Each watch call consumes the next batch of events, where an int
+    batch is the status of an ApiException to raise.
+    """
+
+    kind = "Build"
+
+    def __init__(self, items: list[dict], resource_version: str = "10"):
+        self.items = items
+        self.resource_version = resource_version
+        self.batches: list = []
+        self.lists = 0
+        self.watched_from: list[Optional[str]] = []
+
+    def get(self, **kwargs):
+        self.lists += 1
+        return ResourceInstance(
+            client=None,
+            instance={
+                "kind": "BuildList",
+                "apiVersion": "build.openshift.io/v1",
+                "metadata": {"resourceVersion": self.resource_version},
+                "items": self.items,
+            },
+        )
+
+    def watch(self, resource_version=None, **kwargs):
+        self.watched_from.append(resource_version)
+        batch = self.batches.pop(0)
+        if isinstance(batch, int):
+            raise ApiException(status=batch, reason="Expired")
+        for event_type, obj in batch:
+            yield {"type": event_type, "object": ResourceInstance(None, obj)}
+
+
+def app_keys(obj) -> list:
+    return [(obj.metadata.namespace, obj.metadata.labels[APP_LABEL])]
+
+
+def informer_for(resource: FakeResource) -> ResourceInformer:
+    return ResourceInformer(resource=resource, indexers={"app": app_keys})
+
+
+def names(objects) -> list[str]:
+    return sorted(obj.metadata.name for obj in objects)
+
+
+def test_reading_before_listing_fails():
+    informer = informer_for(FakeResource([]))
+
+    with pytest.raises(InformerNotSyncedError):
+        informer.objects()
+
+
+def test_relist_indexes_objects():
+    resource = FakeResource([build("1", "todo", "5"), build("2", "blog", "6")])
+    informer = informer_for(resource)
+
+    informer.sync()
+
+    assert names(informer.objects()) == ["blog-2", "todo-1"]
+    assert names(informer.get_by_index("app", ("ns", "todo"))) == ["todo-1"]
+    assert informer.resource_version == "10"
+
+
+def test_watch_applies_changes_since_last_version():
+    resource = FakeResource([build("1", "todo", "5"), build("2", "blog", "6")])
+    informer = informer_for(resource)
+    informer.sync()
+
+    relabeled = build("2", "todo", "12")
+    resource.batches.append(
+        [
+            ("ADDED", build("3", "todo", "11")),
+            ("MODIFIED", relabeled),
+            ("DELETED", build("1", "todo", "13")),
+        ]
+    )
+    informer.sync()
+
+    assert resource.lists == 1
+    assert resource.watched_from == ["10"]
+    assert informer.resource_version == "13"
+    assert names(informer.get_by_index("app", ("ns", "todo"))) == ["todo-2", "todo-3"]
+    assert informer.index("app").keys() == {("ns", "todo")}
+
+
+def test_expired_watch_lists_again():
+    resource = FakeResource([build("1", "todo", "5")])
+    informer = informer_for(resource)
+    informer.sync()
+
+    resource.batches.append(410)
+    informer.sync()
+
+    assert not informer.synced
+    # the previous objects are served until listed again
+    assert names(informer.objects()) == ["todo-1"]
+
+    resource.items = [build("2", "todo", "20")]
+    resource.resource_version = "20"
+    informer.sync()
+
+    assert resource.lists == 2
+    assert names(informer.objects()) == ["todo-2"]
+    assert informer.resource_version == "20"
+
+
+def test_other_watch_errors_are_raised():
+    resource = FakeResource([])
+    informer = informer_for(resource)
+    informer.sync()
+
+    resource.batches.append(500)
+    with pytest.raises(ApiException):
+        informer.sync()
+
+    assert informer.synced
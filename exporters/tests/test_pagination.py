@@ -0,0 +1,164 @@
+import json
+import threading
+from typing import Optional
+
+import pytest
+from kubernetes.client.rest import ApiException
+from kubernetes.dynamic.exceptions import DynamicApiError, GoneError
+from kubernetes.dynamic.resource import ResourceInstance
+
+from pelorus.utils import paginate_resource
+from pelorus.utils.pagination import METADATA_ONLY_ACCEPT, page_stats
+
+
+def pod(number: int) -> dict:
+    return {"metadata": {"name": f"pod-{number}", "uid": f"uid-{number}"}}
+
+
+def pod_list(pods: list[dict], continue_token: Optional[str]) -> ResourceInstance:
+    return ResourceInstance(
+        client=None,
+        instance={
+            "kind": "PodList",
+            "apiVersion": "v1",
+            "metadata": {"continue": continue_token} if continue_token else {},
+            "items": pods,
+        },
+    )
+
+
+def gone(continue_token: Optional[str] = None) -> GoneError:
+    error = ApiException(status=410, reason="Gone")
+    error.body = json.dumps(
+        {
+            "kind": "Status",
+            "reason": "Expired",
+            "metadata": {"continue": continue_token} if continue_token else {},
+        }
+    )
+    return GoneError(error)
+
+
+class FakePods:
+    """
+    Pods listed by pages of 2 items, the continue token being the page number.
+    Tokens listed in `expired` fail once with a 410 Gone error.
+    """
+
+    kind = "Pod"
+
+    def __init__(self, pods: list[dict], expired: dict[str, GoneError] = {}):
+        self.pods = pods
+        self.expired = dict(expired)
+        self.calls: list[tuple[Optional[str], dict]] = []
+        self.lock = threading.Lock()
+        self.second_page_requested = threading.Event()
+
+    def get(self, limit: int, _continue: Optional[str] = None, **query):
+        with self.lock:
+            self.calls.append((_continue, query))
+        if _continue in self.expired:
+            raise self.expired.pop(_continue)
+        number = int(_continue or 0)
+        if number == 1:
+            self.second_page_requested.set()
+        page = self.pods[number * limit : (number + 1) * limit]
+        more = (number + 1) * limit < len(self.pods)
+        return pod_list(page, str(number + 1) if more else None)
+
+
+def names(items) -> list[str]:
+    return [item.metadata.name for item in items]
+
+
+def test_all_pages_are_listed():
+    pods = FakePods([pod(number) for number in range(5)])
+
+    items = list(paginate_resource(pods, dict(namespace="todo"), limit=2))
+
+    assert names(items) == [f"pod-{number}" for number in range(5)]
+    assert [token for token, _ in pods.calls] == [None, "1", "2"]
+    assert all(query == dict(namespace="todo") for _, query in pods.calls)
+
+
+def test_next_page_is_fetched_while_the_page_is_processed():
+    pods = FakePods([pod(number) for number in range(4)])
+    items = paginate_resource(pods, limit=2)
+
+    next(items)
+
+    assert pods.second_page_requested.wait(timeout=5)
+    assert names(items) == ["pod-1", "pod-2", "pod-3"]
+
+
+def test_expired_listings_go_on_with_the_given_token():
+    pods = FakePods(
+        [pod(number) for number in range(6)], expired={"1": gone(continue_token="1")}
+    )
+
+    items = list(paginate_resource(pods, limit=2))
+
+    assert names(items) == [f"pod-{number}" for number in range(6)]
+    assert [token for token, _ in pods.calls] == [None, "1", "1", "2"]
+
+
+def test_expired_listings_start_over_without_duplicates():
+    pods = FakePods([pod(number) for number in range(6)], expired={"2": gone()})
+
+    items = list(paginate_resource(pods, limit=2))
+
+    assert names(items) == [f"pod-{number}" for number in range(6)]
+    assert [token for token, _ in pods.calls] == [None, "1", "2", None, "1", "2"]
+
+
+def test_other_errors_are_raised():
+    class BrokenPods(FakePods):
+        def get(self, **kwargs):
+            raise RuntimeError("broken")
+
+    with pytest.raises(RuntimeError):
+        list(paginate_resource(BrokenPods([])))
+
+
+def test_pages_are_counted():
+    pages_before, _ = page_stats().get("Pod", (0, 0.0))
+
+    list(paginate_resource(FakePods([pod(number) for number in range(3)]), limit=2))
+
+    pages, seconds = page_stats()["Pod"]
+    assert pages == pages_before + 2
+    assert seconds >= 0
+
+
+def test_metadata_only_lists_ask_for_partial_objects():
+    pods = FakePods([pod(number) for number in range(3)])
+
+    items = list(paginate_resource(pods, limit=2, metadata_only=True))
+
+    assert names(items) == ["pod-0", "pod-1", "pod-2"]
+    assert all(
+        query == dict(header_params={"Accept": METADATA_ONLY_ACCEPT})
+        for _, query in pods.calls
+    )
+
+
+def test_metadata_only_lists_fall_back_to_full_objects():
+    class OldPods(FakePods):
+        kind = "OldPod"
+
+        def get(self, limit: int, _continue: Optional[str] = None, **query):
+            if "header_params" in query:
+                raise DynamicApiError(ApiException(status=406, reason="Not Acceptable"))
+            return super().get(limit, _continue, **query)
+
+    pods = OldPods([pod(number) for number in range(3)])
+
+    assert names(paginate_resource(pods, limit=2, metadata_only=True)) == [
+        "pod-0",
+        "pod-1",
+        "pod-2",
+    ]
+    # full objects are listed from then on, without asking again
+    pods.calls.clear()
+    list(paginate_resource(pods, limit=2, metadata_only=True))
+    assert [query for _, query in pods.calls] == [{}, {}]
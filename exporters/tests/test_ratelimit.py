@@ -0,0 +1,219 @@
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from pelorus import runtime
+from provider_common.ratelimit import (
+    RateLimiter,
+    RateLimitExceeded,
+    get_rate_limiter,
+    rate_limit_session,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def rate_limited_response(
+    remaining: int, reset_at: float, status_code: int = 200
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b"{}"
+    response.headers.update(
+        {
+            "x-ratelimit-limit": "5000",
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(reset_at),
+        }
+    )
+    return response
+
+
+def limiter(clock: FakeClock, burst: int, **kwargs) -> RateLimiter:
+    return RateLimiter(
+        name="test", burst=burst, timer=clock, sleep=clock.sleep, **kwargs
+    )
+
+
+def test_requests_are_not_paced_without_rate_limit():
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=1)
+
+    for _ in range(10):
+        rate_limiter.acquire()
+
+    assert clock.sleeps == []
+
+
+def test_requests_are_spread_until_reset():
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=10)
+    rate_limiter.update(rate_limited_response(100, reset_at=clock.now + 100))
+
+    for _ in range(10):
+        rate_limiter.acquire()
+    assert clock.sleeps == []
+
+    # 90 requests left for 100 seconds
+    rate_limiter.acquire()
+    assert clock.sleeps == [100 / 90]
+
+
+def test_requests_are_not_paced_above_threshold():
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=10, threshold=50)
+    rate_limiter.update(rate_limited_response(100, reset_at=clock.now + 100))
+
+    # 50 requests over the threshold, then a full burst
+    for _ in range(60):
+        rate_limiter.acquire()
+    assert clock.sleeps == []
+
+    rate_limiter.acquire()
+    assert len(clock.sleeps) == 1
+
+
+def test_exhausted_rate_limit_waits_for_close_reset():
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=10)
+    rate_limiter.update(rate_limited_response(0, reset_at=clock.now + 5))
+
+    rate_limiter.acquire()
+
+    assert clock.sleeps == [5]
+
+
+def test_long_waits_fail_fast():
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=10)
+    rate_limiter.update(rate_limited_response(0, reset_at=clock.now + 600))
+
+    with pytest.raises(RateLimitExceeded) as error:
+        rate_limiter.acquire()
+
+    assert clock.sleeps == []
+    assert error.value.retry_at == clock.now + 600
+    assert error.value.status_code == 429
+
+
+def test_slow_refills_fail_fast_without_taking_a_request():
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=1)
+    # one request every 100 seconds
+    rate_limiter.update(rate_limited_response(36, reset_at=clock.now + 3600))
+
+    rate_limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire()
+
+    assert clock.sleeps == []
+    assert rate_limiter.remaining == 35
+
+
+def test_background_collection_pauses_until_reset(monkeypatch):
+    monkeypatch.setattr(runtime, "_collecting_in_background", True)
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=10)
+    rate_limiter.update(rate_limited_response(0, reset_at=clock.now + 600))
+
+    rate_limiter.acquire()
+
+    assert clock.sleeps == [600]
+
+
+def test_background_collection_pauses_are_capped(monkeypatch):
+    monkeypatch.setattr(runtime, "_collecting_in_background", True)
+    clock = FakeClock()
+    rate_limiter = limiter(clock, burst=10, max_pause=300)
+    rate_limiter.update(rate_limited_response(0, reset_at=clock.now + 600))
+
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire()
+
+    assert clock.sleeps == []
+
+
+def rate_limited_session(
+    monkeypatch, host: str, clock: FakeClock, responses: list[requests.Response]
+) -> tuple[requests.Session, RateLimiter]:
+    monkeypatch.setattr(HTTPAdapter, "send", lambda *args, **kwargs: responses.pop(0))
+    rate_limiter = get_rate_limiter(host, "token")
+    rate_limiter.timer = clock
+    rate_limiter.sleep = clock.sleep
+
+    session = requests.Session()
+    rate_limit_session(session, host, "token")
+    return session, rate_limiter
+
+
+def test_rate_limited_requests_are_retried_after_reset(monkeypatch):
+    clock = FakeClock()
+    responses = [
+        rate_limited_response(0, reset_at=clock.now + 5, status_code=403),
+        rate_limited_response(4999, reset_at=clock.now + 3600),
+    ]
+    session, rate_limiter = rate_limited_session(
+        monkeypatch, "ratelimit.example.com", clock, responses
+    )
+
+    response = session.get("https://ratelimit.example.com/repos/org/repo/issues")
+
+    assert response.status_code == 200
+    assert clock.sleeps == [5]
+    assert rate_limiter.remaining == 4999
+
+
+def test_rate_limited_requests_are_not_retried_after_long_waits(monkeypatch):
+    clock = FakeClock()
+    responses = [
+        rate_limited_response(0, reset_at=clock.now + 600, status_code=403),
+    ]
+    session, rate_limiter = rate_limited_session(
+        monkeypatch, "longwait.example.com", clock, responses
+    )
+
+    response = session.get("https://longwait.example.com/repos/org/repo/issues")
+    assert response.status_code == 403
+    assert clock.sleeps == []
+
+    # until the reset, requests fail without being sent
+    with pytest.raises(RateLimitExceeded):
+        session.get("https://longwait.example.com/repos/org/repo/issues")
+
+
+def test_rate_limited_requests_are_retried_after_reset_in_background(monkeypatch):
+    monkeypatch.setattr(runtime, "_collecting_in_background", True)
+    clock = FakeClock()
+    responses = [
+        rate_limited_response(0, reset_at=clock.now + 600, status_code=403),
+        rate_limited_response(4999, reset_at=clock.now + 3600),
+    ]
+    session, _ = rate_limited_session(
+        monkeypatch, "background.example.com", clock, responses
+    )
+
+    response = session.get("https://background.example.com/repos/org/repo/issues")
+
+    assert response.status_code == 200
+    assert clock.sleeps == [600]
+
+
+def test_limits_are_tracked_per_resource_and_token():
+    host = "resources.example.com"
+
+    assert get_rate_limiter(host, "token") is get_rate_limiter(host, "token")
+    assert get_rate_limiter(host, "token") is not get_rate_limiter(host, "other")
+    assert get_rate_limiter(host, "token") is not get_rate_limiter(
+        host, "token", "graphql"
+    )
@@ -0,0 +1,77 @@
+import copy
+
+from kubernetes.dynamic.resource import ResourceField, ResourceInstance
+
+from pelorus.utils import paginate_resource
+from pelorus.utils.raw import RawField
+from tests.openshift_mocks import RawGetResponse
+
+BUILD = {
+    "metadata": {
+        "name": "todolist-1",
+        "uid": "uid-1",
+        "labels": {"app.kubernetes.io/name": "todolist", "build": "todolist-1"},
+        "annotations": {"io.openshift.build.commit.id": "abc"},
+    },
+    "spec": {"revision": {"git": {"commit": "abc"}}, "output": {}},
+    "status": {"phase": "Complete", "stages": [{"name": "Build", "steps": []}]},
+}
+
+
+def deserialized(item: dict) -> ResourceField:
+    "The item as the dynamic client gives it in a list."
+    instance = {"kind": "BuildList", "apiVersion": "v1", "items": [item]}
+    return ResourceInstance(client=None, instance=copy.deepcopy(instance)).items[0]
+
+
+def test_raw_fields_read_as_resource_fields():
+    raw = RawField(copy.deepcopy(BUILD))
+    field = deserialized(BUILD)
+
+    assert raw.metadata.name == field.metadata.name
+    assert raw.spec.revision.git.commit == "abc"
+    assert raw.status.stages[0].name == "Build"
+    assert raw.metadata["labels"]["build"] == "todolist-1"
+    assert raw.metadata.get("annotations") == field.metadata.get("annotations")
+    assert raw.metadata.get("missing") is None
+    assert raw.missing is None
+    assert raw.spec.output.to is None
+    assert dict(raw.metadata.labels) == dict(field.metadata.labels)
+    assert list(raw.metadata.labels.items()) == list(field.metadata.labels.items())
+
+
+def test_raw_fields_are_converted_back():
+    build = dict(copy.deepcopy(BUILD), apiVersion="v1", kind="Build")
+    raw = RawField(build)
+    raw.metadata.labels  # read some fields first
+
+    assert raw.to_dict() == build
+    assert raw == deserialized(BUILD)
+    assert copy.deepcopy(raw).to_dict() == build
+
+
+def test_fields_are_wrapped_once():
+    raw = RawField(copy.deepcopy(BUILD))
+
+    assert raw.metadata is raw.metadata
+    assert raw.status.stages[0] is raw.status.stages[0]
+
+
+def test_raw_lists_are_paginated():
+    class Builds:
+        kind = "Build"
+
+        def get(self, limit, serialize, _continue=None):
+            if _continue:
+                return RawGetResponse.of("Build", {"metadata": {"uid": "2"}})
+            response = RawGetResponse.of("Build", {"metadata": {"uid": "1"}})
+            response.data = response.data.replace(
+                b'"metadata": {}', b'"metadata": {"continue": "next"}', 1
+            )
+            return response
+
+    items = list(paginate_resource(Builds(), raw=True))
+
+    assert all(isinstance(item, RawField) for item in items)
+    assert [item.metadata.uid for item in items] == ["1", "2"]
+    assert items[0].kind == "Build"
@@ -0,0 +1,92 @@
+import threading
+from typing import Optional
+
+from prometheus_client.core import GaugeMetricFamily
+
+from pelorus.runtime import BackgroundCollector
+
+
+class CountingCollector:
+    def __init__(
+        self,
+        fail: bool = False,
+        started: Optional[threading.Event] = None,
+        release: Optional[threading.Event] = None,
+    ):
+        self.calls = 0
+        self.fail = fail
+        self.started = started
+        self.release = release
+
+    def collect(self):
+        self.calls += 1
+        if self.started:
+            self.started.set()
+        if self.release:
+            self.release.wait(timeout=5)
+        if self.fail:
+            raise RuntimeError("provider is down")
+        metric = GaugeMetricFamily("deploy_timestamp", "Deployment timestamp")
+        metric.add_metric([], self.calls)
+        yield metric
+
+
+def metrics_by_name(collector: BackgroundCollector) -> dict:
+    return {metric.name: metric for metric in collector.collect()}
+
+
+def test_collect_serves_snapshot_without_collecting():
+    wrapped = CountingCollector()
+    collector = BackgroundCollector(collector=wrapped)
+
+    assert collector.refresh()
+    first = metrics_by_name(collector)
+    second = metrics_by_name(collector)
+
+    assert wrapped.calls == 1
+    assert first["deploy_timestamp"].samples[0].value == 1
+    assert second["deploy_timestamp"] is first["deploy_timestamp"]
+    assert first["pelorus_collection_age_seconds"].samples[0].value >= 0
+
+
+def test_collect_before_first_snapshot():
+    collector = BackgroundCollector(collector=CountingCollector())
+
+    metrics = metrics_by_name(collector)
+
+    assert "deploy_timestamp" not in metrics
+    assert metrics["pelorus_collection_age_seconds"].samples == []
+
+
+def test_failed_refresh_keeps_previous_snapshot():
+    wrapped = CountingCollector()
+    collector = BackgroundCollector(collector=wrapped)
+    collector.refresh()
+    snapshot = collector.snapshot
+
+    wrapped.fail = True
+    assert not collector.refresh()
+
+    assert collector.snapshot is snapshot
+    metrics = metrics_by_name(collector)
+    assert metrics["deploy_timestamp"].samples[0].value == 1
+    assert metrics["pelorus_collection_failures"].samples[0].value == 1
+
+
+def test_overlapping_refresh_is_skipped():
+    started, release = threading.Event(), threading.Event()
+    wrapped = CountingCollector(started=started, release=release)
+    collector = BackgroundCollector(collector=wrapped)
+
+    collector.start()
+    try:
+        assert started.wait(timeout=5)
+        assert not collector.refresh()
+    finally:
+        release.set()
+        collector.stop(timeout=5)
+
+    assert wrapped.calls == 1
+    assert collector.snapshot is not None
+    metrics = metrics_by_name(collector)
+    assert metrics["pelorus_collection_skipped"].samples[0].value == 1